@@ -0,0 +1,105 @@
+"""
+BotSpeak Back-Reference Module
+Opt-in document-local codes for repeated out-of-dictionary words
+
+The first occurrence of an unknown word of MIN_WORD_LENGTH or more
+characters is written as is and takes the next slot of a table kept by both
+sides; later occurrences are written as REF_PREFIX plus the slot number in
+base 36 ("@0" - "@zz"). Once all MAX_SLOTS slots are taken they are reused
+round-robin, so a table never holds more than MAX_SLOTS words whatever the
+document length. The decoder replays the same rule as it reads, so the
+table itself is never transmitted.
+
+"Kubernetes pods restart. Kubernetes pods scale." -> "kubernetes pods restart | @0 @1 scale"
+"""
+
+from phrase_matcher import is_literal
+
+REF_PREFIX = '@'
+MAX_SLOTS = 36 * 36
+# A reference is at most three characters, so shorter words are never worth a slot
+MIN_WORD_LENGTH = 4
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+_REFS = [REF_PREFIX + (_DIGITS[slot // 36] if slot >= 36 else '') + _DIGITS[slot % 36]
+         for slot in range(MAX_SLOTS)]
+_SLOT_BY_REF = {ref: slot for slot, ref in enumerate(_REFS)}
+
+
+class BackrefTable:
+    """Per-document table of unknown words, bounded to MAX_SLOTS entries"""
+
+    __slots__ = ('_words', '_refs', '_next')
+
+    def __init__(self):
+        self._words = []
+        self._refs = {}
+        self._next = 0
+
+    def _add(self, word):
+        slot = self._next
+        self._next = (slot + 1) % MAX_SLOTS
+        if slot < len(self._words):
+            # Table full: the oldest word gives up its slot
+            self._refs.pop(self._words[slot], None)
+            self._words[slot] = word
+        else:
+            self._words.append(word)
+        return slot
+
+    def encode_word(self, word, dictionary):
+        """Encoder side: the reference for a repeated unknown word, else the word itself
+
+        Words that the decoder would read as a dictionary code are never
+        given a slot, since the decoder would not register them.
+        """
+        ref = self._refs.get(word)
+        if ref is not None:
+            return ref
+        if len(word) >= MIN_WORD_LENGTH and word not in dictionary:
+            self._refs[word] = _REFS[self._add(word)]
+        return word
+
+    def resolve(self, token):
+        """Decoder side: the word for a reference, else token (taking a slot if it qualifies)
+
+        Call it for every token that is not a dictionary code, in order.
+        References to empty slots are kept as is, like unknown codes.
+        """
+        if token[0] == REF_PREFIX:
+            slot = _SLOT_BY_REF.get(token)
+            if slot is not None and slot < len(self._words):
+                return self._words[slot]
+            return token
+        if len(token) >= MIN_WORD_LENGTH:
+            self._add(token)
+        return token
+
+    def __len__(self):
+        return len(self._words)
+
+
+def encode_backrefs(encoder, sentences, mode, suffix_table=None):
+    """Encode lexed sentences to the classic format, replacing repeated unknown words with references
+
+    sentences are word lists as from iter_sentences(); typed pattern tokens
+    (see pattern_codecs) are referenced like any other unknown word. With a
+    suffix_table, inflected forms get suffix codes (see suffix_table) instead.
+    """
+    dictionary = encoder.dictionary
+    table = BackrefTable()
+    encoded_sentences = []
+
+    for words in sentences:
+        codes = []
+        tokens = encoder._tokenize_words(words, mode)
+        if suffix_table is not None:
+            tokens = suffix_table.encode(tokens)
+        for token in tokens:
+            if is_literal(token):
+                codes.append(table.encode_word(token[1], dictionary))
+            else:
+                codes.append(token[1])
+        encoded_sentences.append(' '.join(codes))
+
+    return ' | '.join(encoded_sentences)
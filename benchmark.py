@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+BotSpeak Benchmark Suite
+Measures codec throughput and output size on a reference corpus
+
+Usage:
+    python benchmark.py                  # run every benchmark
+    python benchmark.py segmentation     # run selected benchmarks by name
+"""
+
+import gzip
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter
+
+from encoder import BotSpeakEncoder
+from decoder import BotSpeakDecoder
+from result_cache import ResultCache
+from sentence_memo import SentenceMemo
+from phrase_matcher import PhraseMatcher, GREEDY, OPTIMAL, phrase_entries, compile_phrase_matcher
+from botspeak_dict import reverse_collisions
+from text_lexer import iter_sentences
+from entropy_coder import get_entropy_table
+from codec_snapshot import write_snapshot, static_fingerprint
+from fuzzy_index import FuzzyIndex
+from suffix_table import SuffixTable, SUFFIX_MARK
+
+# Representative chat, support and bot-prompt traffic
+REFERENCE_SENTENCES = [
+    "Hello, how are you today?",
+    "Good morning, I hope you had a good night.",
+    "I need help with my computer.",
+    "Thank you very much for your assistance.",
+    "What do you think about artificial intelligence?",
+    "The weather is beautiful today.",
+    "I would like to schedule a meeting tomorrow.",
+    "Please let me know if you have any questions.",
+    "I'm sorry, I don't understand what you mean.",
+    "Can you help me find the file I lost yesterday?",
+    "We need to start the project next week.",
+    "I think so, but I am not sure.",
+    "Of course, no problem at all.",
+    "I see what you mean, that makes sense.",
+    "What are you working on right now?",
+    "How are you feeling after the long trip?",
+    "Let me check the database and get back to you.",
+    "The server went down again this morning.",
+    "Could you send me the report before the end of the day?",
+    "I don't know why the internet is so slow today.",
+    "Thank you for your patience while we investigate.",
+    "When are you available for a quick call?",
+    "Where are you going for the holidays?",
+    "It's a good idea to back up your data every day.",
+    "The machine learning model needs more training data.",
+    "Please restart your computer and try again.",
+    "That's great news, congratulations!",
+    "I'll send you an email with the details.",
+    "We can't finish the work without more time.",
+    "Have a nice day and see you later.",
+    "Your order has been shipped and will arrive in three days.",
+    "The meeting has been moved to Friday afternoon.",
+    "Is there anything else I can help you with?",
+    "My password does not work on the new website.",
+    "Take it or leave it, the price is final.",
+    "At the end of the day we all want the same thing.",
+]
+
+
+def reference_corpus(documents=500, seed=2025):
+    """Deterministic list of documents built from REFERENCE_SENTENCES"""
+    rng = random.Random(seed)
+    return [
+        ' '.join(rng.choice(REFERENCE_SENTENCES) for _ in range(rng.randint(3, 8)))
+        for _ in range(documents)
+    ]
+
+
+def log_corpus(documents=500, seed=2025):
+    """Deterministic machine-generated log documents full of IDs, timestamps and URLs"""
+    rng = random.Random(seed)
+    services = ['auth', 'billing', 'search', 'storage']
+    users = [f"user{n}@example.com" for n in range(20)]
+
+    def line():
+        timestamp = (f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T"
+                     f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z")
+        request_id = '%08x-%04x-%04x-%04x-%012x' % tuple(rng.getrandbits(bits) for bits in (32, 16, 16, 16, 48))
+        return rng.choice([
+            f"{timestamp} request {request_id} from {rng.randint(1, 254)}.{rng.randint(0, 255)}.0.{rng.randint(1, 254)} "
+            f"took {rng.randint(1, 5000)} ms.",
+            f"{timestamp} GET https://api.example.com/{rng.choice(services)}/v1/items/{rng.randint(1, 10 ** 6)} "
+            f"returned {rng.choice([200, 404, 500])}.",
+            f"{timestamp} user {rng.choice(users)} updated order {rng.randint(10 ** 9, 10 ** 10)} "
+            f"total {rng.randint(1, 999)}.{rng.randint(0, 99):02d}.",
+            f"{timestamp} {rng.choice(REFERENCE_SENTENCES)}",
+        ])
+
+    return [' '.join(line() for _ in range(rng.randint(3, 8))) for _ in range(documents)]
+
+
+def typo_corpus(documents=500, seed=2025, rate=0.1):
+    """reference_corpus() with one-edit typos in about rate of the longer words
+
+    Returns (documents, typos) where typos maps each misspelling to the word it came from.
+    """
+    rng = random.Random(seed)
+    typos = {}
+
+    def misspell(word):
+        i = rng.randrange(len(word) - 1)
+        if word[i] == word[i + 1]:
+            # Transposing or replacing a doubled letter could leave the word unchanged
+            return word[:i] + word[i + 1:]
+        edit = rng.choice(('delete', 'transpose', 'replace', 'insert'))
+        if edit == 'delete':
+            return word[:i] + word[i + 1:]
+        if edit == 'transpose':
+            return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        letter = rng.choice([letter for letter in 'abcdefghijklmnopqrstuvwxyz' if letter != word[i]])
+        if edit == 'replace':
+            return word[:i] + letter + word[i + 1:]
+        return word[:i] + letter + word[i:]
+
+    corpus = []
+    for document in reference_corpus(documents, seed):
+        words = document.split()
+        for i, word in enumerate(words):
+            if word.isalpha() and len(word) >= 4 and rng.random() < rate:
+                typo = misspell(word)
+                typos.setdefault(typo.lower(), word.lower())
+                words[i] = typo
+        corpus.append(' '.join(words))
+    return corpus, typos
+
+
+def uncached_encoder():
+    """BotSpeakEncoder with result cache and sentence memo disabled"""
+    encoder = BotSpeakEncoder()
+    encoder.result_cache = ResultCache(max_entries=0)
+    encoder.sentence_memo = SentenceMemo(max_sentences=0)
+    return encoder
+
+
+def best_time(func, repeat=5):
+    """Best wall-clock time of func() over repeat runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def mb_per_second(chars, seconds):
+    return chars / seconds / 1e6 if seconds else 0.0
+
+
+def bench_segmentation():
+    """Greedy vs optimal segmentation: throughput cost and output savings"""
+    corpus = reference_corpus()
+    encoder = uncached_encoder()
+    input_chars = sum(len(document) for document in corpus)
+
+    results = {}
+    for mode in (GREEDY, OPTIMAL):
+        outputs = [encoder.encode_text(document, mode) for document in corpus]
+        seconds = best_time(lambda: [encoder.encode_text(document, mode) for document in corpus])
+        results[mode] = {
+            'seconds': seconds,
+            'chars': sum(len(output) for output in outputs),
+            'tokens': sum(len(output.split()) for output in outputs),
+        }
+
+    greedy = results[GREEDY]
+    print(f"Corpus: {len(corpus)} documents, {input_chars} chars")
+    print(f"{'mode':<10}{'MB/s':>10}{'output chars':>15}{'tokens':>10}{'saved vs greedy':>18}")
+    for mode, result in results.items():
+        saved = greedy['chars'] - result['chars']
+        print(f"{mode:<10}{mb_per_second(input_chars, result['seconds']):>10.2f}"
+              f"{result['chars']:>15}{result['tokens']:>10}"
+              f"{saved:>10} ({saved / greedy['chars'] * 100:.2f}%)")
+    print(f"Optimal throughput cost: {results[OPTIMAL]['seconds'] / greedy['seconds']:.2f}x greedy time")
+
+
+def bench_entropy():
+    """Output bytes/sentence and MB/s: text, binary, entropy-coded, zlib and gzip"""
+    corpus = reference_corpus()
+    encoder = uncached_encoder()
+    input_chars = sum(len(document) for document in corpus)
+    sentences = sum(1 for document in corpus for _ in iter_sentences(document))
+
+    # Stand-in for DictionaryEntry.frequency: code usage counted on the corpus
+    frequencies = Counter(code for document in corpus for code in encoder.encode_text(document).split())
+    trained = uncached_encoder()
+    trained._entropy_table = get_entropy_table(trained.dictionary, frequencies)
+
+    # Every document is compressed on its own, as API messages are
+    formats = {
+        'text': lambda document: encoder.encode_text(document).encode('utf-8'),
+        'binary': lambda document: encoder.encode_binary(document),
+        'entropy (prior)': lambda document: encoder.encode_binary(document, entropy=True),
+        'entropy (trained)': lambda document: trained.encode_binary(document, entropy=True),
+        'zlib(input)': lambda document: zlib.compress(document.encode('utf-8')),
+        'gzip(input)': lambda document: gzip.compress(document.encode('utf-8')),
+        'zlib(text)': lambda document: zlib.compress(encoder.encode_text(document).encode('utf-8')),
+    }
+
+    print(f"Corpus: {len(corpus)} documents, {sentences} sentences, {input_chars} chars")
+    print(f"{'format':<20}{'bytes/sentence':>16}{'total bytes':>14}{'MB/s':>10}")
+    for name, encode in formats.items():
+        total = sum(len(encode(document)) for document in corpus)
+        seconds = best_time(lambda: [encode(document) for document in corpus], repeat=3)
+        print(f"{name:<20}{total / sentences:>16.2f}{total:>14}{mb_per_second(input_chars, seconds):>10.2f}")
+
+
+def bench_patterns():
+    """Pattern codecs on log-like text: output size and encode/decode throughput"""
+    corpus = log_corpus()
+    encoder = uncached_encoder()
+    decoder = BotSpeakDecoder()
+    decoder.result_cache = ResultCache(max_entries=0)
+    input_chars = sum(len(document) for document in corpus)
+
+    variants = {
+        'words': {},
+        'patterns': {'patterns': True},
+        'patterns+backrefs': {'patterns': True, 'backrefs': True},
+    }
+
+    print(f"Corpus: {len(corpus)} log documents, {input_chars} chars")
+    print(f"{'variant':<20}{'output chars':>14}{'ratio':>8}{'encode MB/s':>13}{'decode MB/s':>13}")
+    for name, options in variants.items():
+        outputs = [encoder.encode_text(document, **options) for document in corpus]
+        encode_seconds = best_time(lambda: [encoder.encode_text(document, **options) for document in corpus], repeat=3)
+        decode_seconds = best_time(lambda: [decoder.decode_codes(output) for output in outputs], repeat=3)
+        chars = sum(len(output) for output in outputs)
+        print(f"{name:<20}{chars:>14}{chars / input_chars:>8.3f}"
+              f"{mb_per_second(input_chars, encode_seconds):>13.2f}{mb_per_second(input_chars, decode_seconds):>13.2f}")
+
+
+def bench_fuzzy():
+    """Fuzzy matching on text with typos: coverage, correction accuracy, index memory and lookup latency"""
+    clean = reference_corpus()
+    corpus, typos = typo_corpus()
+    encoder = uncached_encoder()
+    input_chars = sum(len(document) for document in corpus)
+
+    def literals(outputs):
+        return sum(1 for output in outputs for code in output.split() if code != '|' and code not in encoder.dictionary)
+
+    variants = {
+        'clean': (clean, False),
+        'typos': (corpus, False),
+        'typos+fuzzy': (corpus, True),
+    }
+
+    print(f"Corpus: {len(corpus)} documents, {len(typos)} distinct misspellings")
+    print(f"{'variant':<14}{'literals':>10}{'output chars':>14}{'encode MB/s':>13}")
+    for name, (documents, fuzzy) in variants.items():
+        outputs = [encoder.encode_text(document, fuzzy=fuzzy) for document in documents]
+        seconds = best_time(lambda: [encoder.encode_text(document, fuzzy=fuzzy) for document in documents], repeat=3)
+        print(f"{name:<14}{literals(outputs):>10}{sum(len(output) for output in outputs):>14}"
+              f"{mb_per_second(input_chars, seconds):>13.2f}")
+
+    corrections = []
+    for document in corpus:
+        encoder.encode_text(document, fuzzy=True, corrections=corrections)
+    right = sum(1 for correction in corrections if typos.get(correction['original']) == correction['corrected'])
+    false = sum(1 for correction in corrections if correction['original'] not in typos)
+    print(f"Corrections: {len(corrections)}, {right} back to the original word "
+          f"({right / len(corrections) * 100 if corrections else 0:.1f}%), {false} of correctly spelled words")
+
+    print(f"{'index':<14}{'words':>8}{'deletes':>10}{'memory KB':>11}{'build ms':>10}{'hit us':>8}{'miss us':>9}")
+    misses = [f"zq{word}" for word in typos]
+    for max_distance in (1, 2):
+        index = FuzzyIndex(encoder.phrase_matcher, max_distance)
+        info = index.get_info()
+        timings = []
+        for words in (list(typos), misses):
+            # Cold lookups: the memo would otherwise answer repeats
+            def run():
+                index._lookups.clear()
+                for word in words:
+                    index.lookup(word)
+            timings.append(best_time(run, repeat=3) / len(words) * 1e6)
+        print(f"{'distance ' + str(max_distance):<14}{info['words']:>8}{info['deletes']:>10}"
+              f"{info['memory_bytes'] / 1024:>11.0f}{info['build_ms']:>10.1f}{timings[0]:>8.1f}{timings[1]:>9.1f}")
+
+
+def bench_suffixes():
+    """Suffix coding of inflected forms: dictionary coverage, output size and throughput"""
+    encoder = uncached_encoder()
+    table = SuffixTable(encoder.dictionary)
+    info = table.get_info()
+    corpora = {
+        'reference': reference_corpus(),
+        'typos': typo_corpus()[0],
+        'logs': log_corpus(),
+    }
+
+    print(f"Suffix table: {info['forms']} forms, {info['memory_bytes'] / 1024:.0f} KB, built in {info['build_ms']:.1f} ms")
+    print(f"{'corpus':<12}{'suffixes':<10}{'words':>8}{'coded':>8}{'coverage':>10}{'output chars':>14}{'MB/s':>8}")
+    for name, corpus in corpora.items():
+        input_chars = sum(len(document) for document in corpus)
+        words = sum(len(sentence) for document in corpus for sentence in iter_sentences(document))
+        for suffixes in (False, True):
+            outputs = [encoder.encode_text(document, suffixes=suffixes) for document in corpus]
+            seconds = best_time(lambda: [encoder.encode_text(document, suffixes=suffixes) for document in corpus],
+                                repeat=3)
+            literals = sum(1 for output in outputs for code in output.split()
+                           if code != '|' and code not in encoder.dictionary and SUFFIX_MARK not in code)
+            print(f"{name:<12}{'on' if suffixes else 'off':<10}{words:>8}{words - literals:>8}"
+                  f"{(words - literals) / words * 100:>9.1f}%{sum(len(output) for output in outputs):>14}"
+                  f"{mb_per_second(input_chars, seconds):>8.2f}")
+
+
+def bench_normalization():
+    """Phrase trie keyed by raw dictionary text vs by normalize_phrase(): coverage and output size"""
+    encoder = uncached_encoder()
+    # Keys as built before normalization: multi-word phrases lower-cased, nothing else
+    raw = uncached_encoder()
+    raw.phrase_matcher = PhraseMatcher((text.lower() if ' ' in text else text, code)
+                                       for text, code in raw.reverse_dictionary.items())
+    entries, collisions = phrase_entries(encoder.reverse_dictionary)
+    changed = sum(1 for text in encoder.reverse_dictionary
+                  if (text.lower() if ' ' in text else text) not in entries)
+    corpora = {'reference': reference_corpus(), 'logs': log_corpus()}
+
+    print(f"Dictionary: {len(entries)} trie keys, {changed} texts re-keyed, {len(collisions)} collisions")
+    print(f"{'corpus':<12}{'keys':<12}{'words':>8}{'coded':>8}{'coverage':>10}{'output chars':>14}")
+    for name, corpus in corpora.items():
+        words = sum(len(sentence) for document in corpus for sentence in iter_sentences(document))
+        for keys, codec in (('raw', raw), ('normalized', encoder)):
+            outputs = [codec.encode_text(document) for document in corpus]
+            literals = sum(1 for output in outputs for code in output.split()
+                           if code != '|' and code not in codec.dictionary)
+            print(f"{name:<12}{keys:<12}{words:>8}{words - literals:>8}"
+                  f"{(words - literals) / words * 100:>9.1f}%{sum(len(output) for output in outputs):>14}")
+
+
+def bench_reverse_index():
+    """Reverse index where the last code of a text wins vs the shortest: output size"""
+    encoder = uncached_encoder()
+    last = uncached_encoder()
+    last.reverse_dictionary = {text: code for code, text in last.dictionary.items()}
+    last.phrase_matcher = compile_phrase_matcher(last.reverse_dictionary)
+    longer = sum(1 for collision in reverse_collisions
+                 if len(last.reverse_dictionary[collision['text']]) > len(collision['code']))
+
+    print(f"Texts under several codes: {len(reverse_collisions)}, {longer} of them indexed to a longer code by last-wins")
+    print(f"{'corpus':<12}{'index':<12}{'tokens':>8}{'output chars':>14}")
+    for name, corpus in (('reference', reference_corpus()), ('logs', log_corpus())):
+        for index, codec in (('last wins', last), ('shortest', encoder)):
+            outputs = [codec.encode_text(document) for document in corpus]
+            print(f"{name:<12}{index:<12}{sum(len(output.split()) for output in outputs):>8}"
+                  f"{sum(len(output) for output in outputs):>14}")
+
+
+def bench_bytes():
+    """encode_bytes()/decode_bytes() vs the str path on UTF-8 payloads: throughput"""
+    encoder = uncached_encoder()
+    decoder = BotSpeakDecoder()
+    decoder.result_cache = ResultCache(max_entries=0)
+    out = bytearray()
+
+    def encode_into(payloads):
+        for payload in payloads:
+            del out[:]
+            encoder.encode_bytes(payload, out=out)
+
+    def decode_into(payloads):
+        for payload in payloads:
+            del out[:]
+            decoder.decode_bytes(payload, out=out)
+
+    print(f"{'corpus':<12}{'direction':<11}{'path':<8}{'MB/s':>8}{'speedup':>9}")
+    for name, corpus in (('reference', reference_corpus()), ('logs', log_corpus())):
+        payloads = [document.encode('utf-8') for document in corpus]
+        codes = [encoder.encode_text(document).encode('utf-8') for document in corpus]
+        assert [bytes(encoder.encode_bytes(payload)) for payload in payloads] == codes
+        runs = (
+            ('encode', payloads,
+             lambda: [encoder.encode_text(payload.decode('utf-8')).encode('utf-8') for payload in payloads],
+             lambda: encode_into(payloads)),
+            ('decode', codes,
+             lambda: [decoder.decode_codes(payload.decode('utf-8')).encode('utf-8') for payload in codes],
+             lambda: decode_into(codes)),
+        )
+        for direction, inputs, str_path, bytes_path in runs:
+            size = sum(len(payload) for payload in inputs)
+            str_seconds = best_time(str_path, repeat=3)
+            bytes_seconds = best_time(bytes_path, repeat=3)
+            print(f"{name:<12}{direction:<11}{'str':<8}{mb_per_second(size, str_seconds):>8.2f}")
+            print(f"{name:<12}{direction:<11}{'bytes':<8}{mb_per_second(size, bytes_seconds):>8.2f}"
+                  f"{str_seconds / bytes_seconds:>8.2f}x")
+
+
+# Child process for bench_cold_start(): time from interpreter start to first encoded request
+_COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from encoder import BotSpeakEncoder
+from decoder import BotSpeakDecoder
+encoder = BotSpeakEncoder()
+decoder = BotSpeakDecoder()
+decoder.decode_codes(encoder.encode_text("Hello, how are you today?"))
+print(time.perf_counter() - start)
+"""
+
+
+def bench_cold_start(runs=5):
+    """Process cold start to first encoded request, with and without a codec snapshot"""
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'codec.snapshot')
+        # Build the codecs from scratch, then put the caller's setting back
+        previous = os.environ.get('BOTSPEAK_SNAPSHOT')
+        os.environ['BOTSPEAK_SNAPSHOT'] = ''
+        try:
+            write_snapshot(path, static_fingerprint(), BotSpeakEncoder(), BotSpeakDecoder())
+        finally:
+            if previous is None:
+                del os.environ['BOTSPEAK_SNAPSHOT']
+            else:
+                os.environ['BOTSPEAK_SNAPSHOT'] = previous
+
+        print(f"{'startup':<12}{'in-process ms':>15}{'wall ms':>10}")
+        for name, snapshot in (('rebuild', ''), ('snapshot', path)):
+            env = dict(os.environ, BOTSPEAK_SNAPSHOT=snapshot, PYTHONDONTWRITEBYTECODE='1')
+            inner = []
+            wall = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                output = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT], cwd=here, env=env,
+                                        capture_output=True, text=True, check=True).stdout
+                wall.append(time.perf_counter() - start)
+                inner.append(float(output.split()[-1]))
+            print(f"{name:<12}{min(inner) * 1000:>15.1f}{min(wall) * 1000:>10.1f}")
+
+
+BENCHMARKS = {
+    'segmentation': bench_segmentation,
+    'entropy': bench_entropy,
+    'cold_start': bench_cold_start,
+    'patterns': bench_patterns,
+    'fuzzy': bench_fuzzy,
+    'suffixes': bench_suffixes,
+    'normalization': bench_normalization,
+    'reverse_index': bench_reverse_index,
+    'bytes': bench_bytes,
+}
+
+
+def main(argv=None):
+    names = (sys.argv[1:] if argv is None else argv) or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}; available: {', '.join(BENCHMARKS)}")
+        return 2
+
+    for name in names:
+        print(f"=== {name}: {BENCHMARKS[name].__doc__} ===")
+        BENCHMARKS[name]()
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+BotSpeak Command-Line Interface
+Encodes or decodes files offline using a pool of worker processes
+
+Usage:
+    python botspeak_cli.py encode FILE... [-j N] [-o OUTPUT]
+    python botspeak_cli.py decode FILE... [-j N] [-o OUTPUT]
+    python botspeak_cli.py encode corpus.jsonl --field text --output-field codes
+
+Input files are memory-mapped and cut into shards at sentence boundaries
+(or line boundaries for JSONL). Shards are processed in parallel by worker
+processes that each build the dictionary once. Results are written in input
+order. Use '-' (the default) to read from stdin.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from encoder import BotSpeakEncoder
+from decoder import BotSpeakDecoder
+
+DEFAULT_SHARD_SIZE = 1 << 20  # 1 MiB of input per shard
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Shards must end right after one of these so that no sentence (or JSONL
+# record) is split. All are ASCII, so they never fall inside a UTF-8 sequence.
+_SHARD_BOUNDARY = {
+    'encode': re.compile(rb'[.!?]'),
+    'decode': re.compile(rb' \| '),
+    'jsonl': re.compile(rb'\n'),
+}
+
+# Separator used to rejoin the outputs of consecutive shards
+_SHARD_JOINER = {
+    'encode': ' | ',
+    'decode': ' ',
+    'jsonl': '\n',
+}
+
+# Per-process codec, built once by _init_worker()
+_codec = None
+
+
+def _init_worker(command):
+    """Build the codec for this process (runs once per worker)"""
+    global _codec
+    _codec = BotSpeakEncoder() if command == 'encode' else BotSpeakDecoder()
+
+
+def _read_shard(source, start, end):
+    """Return the text of a shard given as bytes or as a (path) byte range"""
+    if isinstance(source, bytes):
+        return source.decode('utf-8', errors='replace')
+
+    with open(source, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[start:end].decode('utf-8', errors='replace')
+
+
+def _process_text(command, text):
+    if command == 'encode':
+        return _codec.encode_text(text)
+    return _codec.decode_codes(text)
+
+
+def _process_jsonl(command, text, field, output_field):
+    lines = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        value = record.get(field)
+        if isinstance(value, str):
+            record[output_field] = _process_text(command, value)
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return '\n'.join(lines)
+
+
+def _run_shard(task):
+    """Worker entry point: process one shard and return its output text"""
+    command, jsonl, field, output_field, source, start, end = task
+    text = _read_shard(source, start, end)
+
+    if jsonl:
+        return _process_jsonl(command, text, field, output_field)
+    return _process_text(command, text)
+
+
+def iter_file_shards(path, boundary, shard_size):
+    """Yield (start, end) byte ranges of path that end on a boundary match"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                end = start + shard_size
+                if end >= size:
+                    end = size
+                else:
+                    match = boundary.search(mm, end)
+                    end = match.end() if match else size
+                yield start, end
+                start = end
+
+
+def iter_stream_shards(stream, boundary, shard_size):
+    """Yield shards of a binary stream as bytes that end on a boundary match"""
+    pending = b''
+
+    while True:
+        block = stream.read(shard_size)
+        if not block:
+            break
+        pending += block
+
+        # Cut after the last boundary; the tail waits for the next block
+        last = None
+        for last in boundary.finditer(pending):
+            pass
+        if last is not None:
+            yield pending[:last.end()]
+            pending = pending[last.end():]
+
+    if pending:
+        yield pending
+
+
+def _iter_tasks(args, source):
+    mode = 'jsonl' if args.field else args.command
+    boundary = _SHARD_BOUNDARY[mode]
+    task = (args.command, bool(args.field), args.field, args.output_field or args.field)
+
+    if source == '-':
+        for shard in iter_stream_shards(sys.stdin.buffer, boundary, args.shard_size):
+            yield task + (shard, 0, len(shard))
+    else:
+        for start, end in iter_file_shards(source, boundary, args.shard_size):
+            yield task + (source, start, end)
+
+
+def _iter_results(tasks, executor, window):
+    """Run tasks with at most window in flight, yielding results in order"""
+    if executor is None:
+        for task in tasks:
+            yield _run_shard(task)
+        return
+
+    in_flight = deque()
+    for task in tasks:
+        in_flight.append(executor.submit(_run_shard, task))
+        if len(in_flight) >= window:
+            yield in_flight.popleft().result()
+
+    while in_flight:
+        yield in_flight.popleft().result()
+
+
+def run(args):
+    """Process every input file and write the results in order"""
+    mode = 'jsonl' if args.field else args.command
+    joiner = _SHARD_JOINER[mode].encode('utf-8')
+
+    if args.jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=args.jobs,
+            initializer=_init_worker,
+            initargs=(args.command,)
+        )
+    else:
+        executor = None
+        _init_worker(args.command)
+
+    if args.output == '-':
+        output = sys.stdout.buffer
+    else:
+        output = open(args.output, 'wb', buffering=OUTPUT_BUFFER_SIZE)
+
+    try:
+        for source in args.files:
+            first = True
+            for result in _iter_results(_iter_tasks(args, source), executor, args.jobs * 2):
+                if not result:
+                    continue
+                if not first:
+                    output.write(joiner)
+                output.write(result.encode('utf-8'))
+                first = False
+            output.write(b'\n')
+        output.flush()
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        if executor is not None:
+            executor.shutdown()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='botspeak',
+        description='Encode text to BotSpeak codes or decode codes back to text'
+    )
+    parser.add_argument('command', choices=['encode', 'decode'],
+                        help='operation to run on the input')
+    parser.add_argument('files', nargs='*', default=['-'], metavar='FILE',
+                        help="input files ('-' for stdin, the default)")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('-o', '--output', default='-',
+                        help="output file ('-' for stdout, the default)")
+    parser.add_argument('--field',
+                        help='treat input as JSONL and process this field of each record')
+    parser.add_argument('--output-field',
+                        help='JSONL field to write results to (default: --field)')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help='approximate shard size in bytes (default: 1 MiB)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.jobs < 1:
+        print("botspeak: --jobs must be at least 1", file=sys.stderr)
+        return 2
+    if args.shard_size < 1:
+        print("botspeak: --shard-size must be at least 1", file=sys.stderr)
+        return 2
+    if args.output_field and not args.field:
+        print("botspeak: --output-field requires --field", file=sys.stderr)
+        return 2
+
+    try:
+        run(args)
+    except FileNotFoundError as e:
+        print(f"botspeak: {e}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        # Malformed JSONL record
+        print(f"botspeak: invalid input: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        # Output closed early (e.g. piped into head)
+        return 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
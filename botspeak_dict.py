@@ -621,33 +621,57 @@ def generate_botspeak_dictionary():
 botspeak_dict = generate_botspeak_dictionary()
 
 # Create reverse mapping for decoding
+def code_rank(code, frequencies=None):
+    """Sort key among codes sharing a text: shortest first, then most used, then lowest"""
+    frequency = (frequencies.get(code) or 0) if frequencies else 0
+    return (len(code), -frequency, code)
+
+def build_reverse_index(dictionary, frequencies=None):
+    """Build the text -> code mapping, choosing the best code_rank() for every text
+    
+    Returns (reverse, collisions): collisions lists every text found under
+    several codes as {'text', 'code' (the one chosen), 'codes'}.
+    """
+    reverse = {}
+    codes = {}
+    for code, text in dictionary.items():
+        codes.setdefault(text, []).append(code)
+        current = reverse.get(text)
+        if current is None or code_rank(code, frequencies) < code_rank(current, frequencies):
+            reverse[text] = code
+    
+    collisions = [
+        {'text': text, 'code': reverse[text], 'codes': text_codes}
+        for text, text_codes in codes.items() if len(text_codes) > 1
+    ]
+    return reverse, collisions
+
 def create_reverse_mapping(dictionary):
-    """Create reverse mapping for decoding codes back to text"""
-    return {value: key for key, value in dictionary.items()}
+    """Create reverse mapping for decoding codes back to text (shortest code wins)"""
+    return build_reverse_index(dictionary)[0]
 
-reverse_botspeak_dict = create_reverse_mapping(botspeak_dict)
+reverse_botspeak_dict, reverse_collisions = build_reverse_index(botspeak_dict)
 
 # Validation functions
 def validate_dictionary():
-    """Validate the dictionary for duplicates and completeness"""
+    """Validate the dictionary for duplicates and completeness
+    
+    Texts stored under several codes are valid: the encoders pick one by
+    code_rank(), and reverse_collisions lists them.
+    """
     codes = list(botspeak_dict.keys())
-    values = list(botspeak_dict.values())
     
     # Check for duplicate codes
     if len(codes) != len(set(codes)):
         print("WARNING: Duplicate codes found!")
         return False
     
-    # Check for duplicate values
-    if len(values) != len(set(values)):
-        print("WARNING: Duplicate values found!")
-        return False
-    
     print(f"Dictionary validation passed!")
     print(f"Total entries: {len(botspeak_dict)}")
     print(f"Numeric codes (100-999): {len(NUMERIC_MAPPINGS)}")
     print(f"Alphanumeric codes (A01-Z99): {len(ALPHANUMERIC_MAPPINGS)}")
     print(f"4-digit codes (0001-9999): {len(FOUR_DIGIT_MAPPINGS)}")
+    print(f"Texts under several codes: {len(reverse_collisions)}")
     
     return True
 
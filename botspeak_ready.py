@@ -923,6 +923,11 @@ def get_app():
     except Exception as e:
         return f"Download error: {str(e)}", 500
 
+@app.teardown_appcontext
+def close_db_session(error):
+    """Give the request thread's database session back after each request"""
+    db_manager.close_session()
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
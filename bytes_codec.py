@@ -0,0 +1,106 @@
+"""
+BotSpeak Bytes Codec Module
+encode_bytes() / decode_bytes(): the classic text format on UTF-8 buffers
+
+Ingestion reads bytes from sockets and files; going through encode_text()
+means decoding the whole payload to str and encoding the output back. For
+ASCII payloads this path lexes the bytes directly (bytes regex, translate()
+for lowering), tokenizes with a bytes-keyed copy of the phrase trie and
+writes the output into a bytearray, which callers may pass in to reuse.
+Output is byte-for-byte the UTF-8 encoding of the str path's output.
+
+Anything else takes the str path: non-ASCII input, and on decode, input
+with back-references, pattern or suffix codes, whose rules live there.
+"""
+
+from phrase_matcher import GREEDY
+from text_lexer import iter_sentences_bytes
+from backref_table import REF_PREFIX
+from pattern_codecs import PATTERN_PREFIX
+from suffix_table import SUFFIX_MARK
+
+SENTENCE_SEPARATOR = b' | '
+
+# Tokens that only the str decoder understands, and the separators
+# str.split() splits on but bytes.split() does not
+_STR_DECODE_MARKERS = tuple(marker.encode('ascii') for marker in (REF_PREFIX, PATTERN_PREFIX, SUFFIX_MARK)) + (
+    b'\x1c', b'\x1d', b'\x1e', b'\x1f')
+
+
+def _as_bytes(data):
+    # bytes.translate() and the regex scan want bytes; a memoryview or
+    # bytearray costs one copy here and none later
+    return data if isinstance(data, bytes) else bytes(data)
+
+
+def encode_bytes(encoder, matcher, data, mode=GREEDY, out=None):
+    """Append the encoding of UTF-8 data to out (a new bytearray by default) and return out
+
+    matcher is the encoder's phrase matcher as PhraseMatcher.to_bytes().
+    """
+    if out is None:
+        out = bytearray()
+    data = _as_bytes(data)
+
+    if not data.isascii():
+        out += encoder.encode_text(data.decode('utf-8'), mode).encode('utf-8')
+        return out
+
+    tokenize = matcher.tokenize
+    separator = b''
+    for words in iter_sentences_bytes(data):
+        out += separator
+        out += b' '.join([token[1] for token in tokenize(words, mode)])
+        separator = SENTENCE_SEPARATOR
+
+    return out
+
+
+def build_bytes_table(decoder, dictionary):
+    """code -> UTF-8 text for the ASCII codes the decoder looks up unchanged"""
+    return {
+        code.encode('ascii'): text.encode('utf-8')
+        for code, text in dictionary.items()
+        if code.isascii() and decoder._normalize_code(code) == code
+    }
+
+
+def decode_bytes(decoder, table, dictionary, data, out=None):
+    """Append the decoding of UTF-8 codes in data to out (a new bytearray by default) and return out
+
+    table is build_bytes_table() of dictionary.
+    """
+    if out is None:
+        out = bytearray()
+    data = _as_bytes(data)
+
+    if not data.isascii() or any(marker in data for marker in _STR_DECODE_MARKERS):
+        out += decoder.decode_codes(data.decode('utf-8')).encode('utf-8')
+        return out
+
+    sentences = []
+    for sentence in data.split(SENTENCE_SEPARATOR):
+        words = []
+        for code in sentence.split():
+            text = table.get(code)
+            if text is None:
+                # Codes in other spellings ("99", "a01"), or words kept as is
+                text = dictionary.get(decoder._normalize_code(code.decode('ascii')))
+                text = code if text is None else text.encode('utf-8')
+            words.append(text)
+
+        if words:
+            decoded = b' '.join(words)
+            if decoded[0] < 0x80:
+                decoded = decoded[:1].upper() + decoded[1:]
+            else:
+                # Capitalize like str.upper() does beyond ASCII
+                text = decoded.decode('utf-8')
+                decoded = (text[0].upper() + text[1:]).encode('utf-8')
+            sentences.append(decoded)
+
+    start = len(out)
+    out += b'. '.join(sentences)
+    if len(out) > start and not out.endswith(b'.'):
+        out += b'.'
+    return out
@@ -0,0 +1,187 @@
+"""
+BotSpeak Code ID Module
+Dense integer (uint16) representation of encoded text for ML and storage pipelines
+
+Every code maps to a fixed ID computed from the code itself, so numbering is
+stable no matter which entries a dictionary contains:
+
+    0               sentence break
+    1000 - 1999     3-digit numeric codes "000"-"999"
+    2000 - 4599     alphanumeric codes "A00"-"Z99"
+    5000 - 14999    4-digit codes "0000"-"9999"
+    16384 - 65535   literals (out-of-dictionary words), indexing a side table
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; array('H') buffers are always available
+    np = None
+
+from text_lexer import iter_sentences
+from phrase_matcher import is_literal
+
+SENTENCE_BREAK_ID = 0
+NUMERIC_BASE = 1000
+ALPHANUMERIC_BASE = 2000
+FOUR_DIGIT_BASE = 5000
+LITERAL_BASE = 16384
+MAX_ID = 65535
+
+# Decoded form of SENTENCE_BREAK_ID; cannot occur in dictionary text
+BREAK_MARK = '\x00'
+
+
+def code_to_id(code):
+    """Return the stable ID of a code, or None if it is not in a known code family"""
+    if len(code) == 3:
+        if code.isdigit():
+            return NUMERIC_BASE + int(code)
+        letter = code[0]
+        if 'A' <= letter <= 'Z' and code[1:].isdigit():
+            return ALPHANUMERIC_BASE + (ord(letter) - 65) * 100 + int(code[1:])
+    elif len(code) == 4 and code.isdigit():
+        return FOUR_DIGIT_BASE + int(code)
+    return None
+
+
+def id_to_code(code_id):
+    """Return the code string for an ID, or None for breaks, literals and unused IDs"""
+    if NUMERIC_BASE <= code_id < ALPHANUMERIC_BASE:
+        return f"{code_id - NUMERIC_BASE:03d}"
+    if ALPHANUMERIC_BASE <= code_id < ALPHANUMERIC_BASE + 2600:
+        letter, digits = divmod(code_id - ALPHANUMERIC_BASE, 100)
+        return f"{chr(65 + letter)}{digits:02d}"
+    if FOUR_DIGIT_BASE <= code_id < FOUR_DIGIT_BASE + 10000:
+        return f"{code_id - FOUR_DIGIT_BASE:04d}"
+    return None
+
+
+def build_code_id_map(dictionary):
+    """Map every code of a dictionary (code -> text) to its ID"""
+    code_ids = {}
+    for code in dictionary:
+        code_id = code_to_id(code)
+        if code_id is not None:
+            code_ids[code] = code_id
+    return code_ids
+
+
+def build_id_table(dictionary):
+    """String table indexed by ID (below LITERAL_BASE) for decode_ids()
+
+    Unused IDs decode to their code, as unknown codes do in decode_codes().
+    """
+    table = [id_to_code(code_id) or '' for code_id in range(LITERAL_BASE)]
+    table[SENTENCE_BREAK_ID] = BREAK_MARK
+    for code, text in dictionary.items():
+        code_id = code_to_id(code)
+        if code_id is not None:
+            table[code_id] = text
+    return table
+
+
+def _append_ids(encoder, text, mode, ids, literals, literal_ids):
+    code_ids = encoder.code_ids
+    first = True
+
+    for words in iter_sentences(text):
+        if not first:
+            ids.append(SENTENCE_BREAK_ID)
+        first = False
+
+        for token in encoder._tokenize_words(words, mode):
+            code_id = None if is_literal(token) else code_ids.get(token[1])
+            if code_id is None:
+                # Out-of-dictionary word: one side-table slot per distinct literal
+                literal = token[1]
+                code_id = literal_ids.get(literal)
+                if code_id is None:
+                    code_id = LITERAL_BASE + len(literals)
+                    if code_id > MAX_ID:
+                        raise OverflowError(
+                            f"More than {MAX_ID - LITERAL_BASE + 1} distinct unknown words; "
+                            "encode smaller batches"
+                        )
+                    literal_ids[literal] = code_id
+                    literals.append(literal)
+            ids.append(code_id)
+
+
+def _as_buffer(values, as_numpy):
+    if not as_numpy:
+        return values
+    if np is None:
+        raise ImportError("NumPy is required for as_numpy=True")
+    # Zero-copy view of the array's buffer
+    return np.frombuffer(values, dtype=np.uint16 if values.typecode == 'H' else np.uint64)
+
+
+def encode_ids(encoder, text, mode, as_numpy=False):
+    """Encode text to {'ids': uint16 buffer, 'literals': side table}"""
+    ids = array('H')
+    literals = []
+    _append_ids(encoder, text, mode, ids, literals, {})
+    return {'ids': _as_buffer(ids, as_numpy), 'literals': literals}
+
+
+def encode_many_ids(encoder, texts, mode, as_numpy=False):
+    """Encode texts to one flat ID buffer plus offsets and a shared side table
+
+    Document i occupies ids[offsets[i]:offsets[i + 1]].
+    """
+    ids = array('H')
+    offsets = array('Q', [0])
+    literals = []
+    literal_ids = {}
+
+    for text in texts:
+        _append_ids(encoder, text, mode, ids, literals, literal_ids)
+        offsets.append(len(ids))
+
+    return {
+        'ids': _as_buffer(ids, as_numpy),
+        'offsets': _as_buffer(offsets, as_numpy),
+        'literals': literals
+    }
+
+
+def decode_ids(id_table, ids, literals=()):
+    """Rebuild text from IDs by table lookup, formatted like decode_codes()"""
+    table = id_table + list(literals) if literals else id_table
+    if np is not None and isinstance(ids, np.ndarray):
+        ids = ids.tolist()
+
+    # One C-level pass maps every ID; Python work is per sentence, not per token
+    return join_decoded(map(table.__getitem__, ids))
+
+
+def join_decoded(parts):
+    """Format decoded words and sentence-break marks like decode_codes() output"""
+    text = ' '.join(parts)
+
+    decoded_sentences = []
+    for sentence in text.split(BREAK_MARK):
+        sentence = sentence.strip()
+        if sentence:
+            decoded_sentences.append(sentence[0].upper() + sentence[1:])
+
+    result = '. '.join(decoded_sentences)
+    if result and not result.endswith('.'):
+        result += '.'
+    return result
+
+
+def decode_many_ids(id_table, ids, offsets, literals=()):
+    """Decode a flat ID buffer with offsets back into a list of texts"""
+    table = id_table + list(literals) if literals else id_table
+    if np is not None and isinstance(ids, np.ndarray):
+        ids = ids.tolist()
+    if np is not None and isinstance(offsets, np.ndarray):
+        offsets = offsets.tolist()
+
+    return [
+        decode_ids(table, ids[offsets[i]:offsets[i + 1]])
+        for i in range(len(offsets) - 1)
+    ]
@@ -0,0 +1,271 @@
+"""
+BotSpeak Codec Pool Module
+Worker processes that take large encode/decode requests off the web server's threads
+
+Encoding a multi-megabyte paste holds the GIL for seconds, and every other
+request on a threaded server waits for it. Requests of at least
+OFFLOAD_CHARS characters run in a process pool instead; smaller ones stay
+inline, where the round trip to a worker would cost more than the work.
+
+Workers are spawned, not forked (forking a threaded server can copy locks
+held by other threads), and each builds its DatabaseEncoder and
+DatabaseDecoder once in the pool initializer, so no request pays for
+compiling the dictionary. Dictionary changes bump the pool's generation;
+a worker reloads its codecs when a task carries a newer one.
+
+Every task has a deadline. A request that times out cancels its task if
+it has not started, and a worker drops tasks whose deadline passed while
+they were queued. A task still running at its deadline is never
+interrupted inside the worker, where it could leave a cache or a database
+session half updated: its worker process is killed instead, and a fresh
+one takes its place. Each worker has an executor of its own, so only the
+tasks queued on that worker are affected; they are resubmitted.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from db_encoder import DatabaseEncoder
+from db_decoder import DatabaseDecoder
+
+# Requests at least this long (characters or bytes) run in a worker
+OFFLOAD_CHARS = int(os.getenv('BOTSPEAK_OFFLOAD_CHARS', 256 * 1024))
+# Seconds a pooled request may take, queueing included
+TIMEOUT_SECONDS = float(os.getenv('BOTSPEAK_POOL_TIMEOUT', 30))
+# 0 disables the pool: every request runs inline
+MAX_WORKERS = int(os.getenv('BOTSPEAK_POOL_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Operation name -> codec ('encoder' or 'decoder') it is a method of
+OPERATIONS = {
+    'encode_with_stats': 'encoder',
+    'encode_binary_with_stats': 'encoder',
+    'encode_many': 'encoder',
+    'decode_with_validation': 'decoder',
+    'decode_binary': 'decoder',
+}
+
+
+class CodecTimeout(Exception):
+    """A pooled or batched request ran past its deadline and was cancelled"""
+
+
+# Worker process state, set by _init_worker()
+_codecs = {}
+_generation = 0
+
+
+def _init_worker(generation):
+    global _generation
+    _codecs['encoder'] = DatabaseEncoder()
+    _codecs['decoder'] = DatabaseDecoder()
+    _generation = generation
+
+
+def _run_task(operation, args, kwargs, generation, deadline):
+    """Run one operation in a worker; returns (result, start time, execution seconds)"""
+    global _generation
+    started = time.time()
+
+    if generation != _generation:
+        _codecs['encoder'].refresh_dictionary()
+        _codecs['decoder'].refresh_dictionary()
+        _generation = generation
+
+    if deadline - time.time() <= 0:
+        raise CodecTimeout("Request timed out while queued for a worker")
+
+    result = getattr(_codecs[OPERATIONS[operation]], operation)(*args, **kwargs)
+    return result, started, time.time() - started
+
+
+class _Worker:
+    """One worker process behind an executor of its own, so it can be killed alone"""
+
+    def __init__(self, generation):
+        self.executor = ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(generation,))
+        self.in_flight = 0
+        self.killed = False
+
+    def kill(self):
+        """Stop the process mid-task; its queued tasks fail with BrokenProcessPool"""
+        self.killed = True
+        # ProcessPoolExecutor has no public way to stop a running task
+        for process in list((self.executor._processes or {}).values()):
+            process.kill()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CodecPool:
+    """Size-threshold dispatcher of codec operations to lazily started worker processes"""
+
+    def __init__(self, max_workers=MAX_WORKERS, offload_chars=OFFLOAD_CHARS, timeout=TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.offload_chars = offload_chars
+        self.timeout = timeout
+        self._workers = [None] * max(0, max_workers)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._cancelled = 0
+        self._killed = 0
+        self._execution_seconds = 0.0
+        self._max_execution_seconds = 0.0
+        self._queue_seconds = 0.0
+        self._max_queue_seconds = 0.0
+
+    def should_offload(self, size):
+        """True if a request of size characters (or bytes) should run in a worker"""
+        return self.max_workers > 0 and size >= self.offload_chars
+
+    def invalidate(self):
+        """Make workers reload their codecs before their next task (after a dictionary change)"""
+        with self._lock:
+            self._generation += 1
+
+    def _acquire_worker(self):
+        """Least busy worker, started if needed, with one more task counted against it"""
+        with self._lock:
+            index = min(range(len(self._workers)),
+                        key=lambda i: self._workers[i].in_flight if self._workers[i] else 0)
+            worker = self._workers[index]
+            if worker is None:
+                # Workers start with the current generation; later bumps reach them with each task
+                worker = self._workers[index] = _Worker(self._generation)
+            worker.in_flight += 1
+            return worker, self._generation
+
+    def _release_worker(self, worker):
+        with self._lock:
+            worker.in_flight -= 1
+
+    def _replace_worker(self, worker, kill=False):
+        """Drop a dead (or, with kill=True, stuck) worker; the next task starts a new one"""
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers[self._workers.index(worker)] = None
+            if kill:
+                self._killed += 1
+        if kill:
+            worker.kill()
+        else:
+            worker.executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, operation, *args, **kwargs):
+        """Call codec method operation(*args, **kwargs) in a worker and return its result
+
+        Raises CodecTimeout if no result arrives within the pool timeout; the
+        task is cancelled, or its worker killed and replaced if it is running.
+        """
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown codec operation: {operation}")
+
+        submitted = time.time()
+        deadline = submitted + self.timeout
+
+        with self._lock:
+            self._in_flight += 1
+            self._submitted += 1
+
+        try:
+            while True:
+                worker, generation = self._acquire_worker()
+                try:
+                    result, started, seconds = self._run_on(worker, operation, args, kwargs,
+                                                            generation, deadline)
+                    break
+                except BrokenProcessPool:
+                    # Queued behind a task whose worker was killed at its deadline: try a fresh worker
+                    if not worker.killed or time.time() >= deadline:
+                        raise
+                finally:
+                    self._release_worker(worker)
+        except CodecTimeout:
+            with self._lock:
+                self._timed_out += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        queued = max(0.0, started - submitted)
+        with self._lock:
+            self._completed += 1
+            self._execution_seconds += seconds
+            self._max_execution_seconds = max(self._max_execution_seconds, seconds)
+            self._queue_seconds += queued
+            self._max_queue_seconds = max(self._max_queue_seconds, queued)
+        return result
+
+    def _run_on(self, worker, operation, args, kwargs, generation, deadline):
+        try:
+            future = worker.executor.submit(_run_task, operation, args, kwargs, generation, deadline)
+        except (BrokenProcessPool, RuntimeError):
+            # Shut down by a kill that raced with this submit
+            self._replace_worker(worker)
+            raise BrokenProcessPool("Codec worker was stopped")
+
+        try:
+            return future.result(timeout=max(0.0, deadline - time.time()))
+        except FutureTimeout:
+            if future.cancel():
+                with self._lock:
+                    self._cancelled += 1
+            else:
+                # Running: stop the process rather than interrupt it mid-update
+                self._replace_worker(worker, kill=True)
+            raise CodecTimeout(f"Request did not finish within {self.timeout:g} seconds")
+        except BrokenProcessPool:
+            # The worker died (killed at a deadline, or e.g. for memory); the next task starts a new one
+            self._replace_worker(worker)
+            raise
+
+    def shutdown(self):
+        """Stop the workers, cancelling queued tasks"""
+        with self._lock:
+            workers = [worker for worker in self._workers if worker is not None]
+            self._workers = [None] * len(self._workers)
+        for worker in workers:
+            worker.executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self):
+        """Pool size, queue depth and execution-time metrics"""
+        with self._lock:
+            completed = self._completed
+            return {
+                'enabled': self.max_workers > 0,
+                'started': any(worker is not None for worker in self._workers),
+                'workers': self.max_workers,
+                'offload_chars': self.offload_chars,
+                'timeout_seconds': self.timeout,
+                'in_flight': self._in_flight,
+                # Tasks waiting for a free worker
+                'queue_depth': max(0, self._in_flight - self.max_workers),
+                'submitted': self._submitted,
+                'completed': completed,
+                'failed': self._failed,
+                'timed_out': self._timed_out,
+                'cancelled': self._cancelled,
+                # Workers killed because a running task passed its deadline
+                'killed': self._killed,
+                'avg_execution_ms': round(self._execution_seconds / completed * 1000, 2) if completed else 0.0,
+                'max_execution_ms': round(self._max_execution_seconds * 1000, 2),
+                'avg_queue_ms': round(self._queue_seconds / completed * 1000, 2) if completed else 0.0,
+                'max_queue_ms': round(self._max_queue_seconds * 1000, 2)
+            }
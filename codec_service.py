@@ -0,0 +1,207 @@
+"""
+BotSpeak Codec Service Module
+Request-coalescing encoder for asyncio code and threaded servers
+
+Each encode call on its own pays Python call overhead, a cache lookup and a
+history commit. CodecBatcher collects the calls that arrive on an event
+loop within a short window (WINDOW_MS, or until MAX_BATCH calls are
+waiting) and encodes them with one encode_many() pass per option set,
+which also logs them with one bulk history write, then resolves each
+caller's future:
+
+    codec = CodecBatcher(db_encoder)
+    encoded = await codec.encode("Hello, how are you?")
+
+encode_many() runs in an executor thread, so the event loop keeps
+accepting calls while a batch is encoded. By default that is a single
+thread of the batcher's own: batches and their history writes run one at
+a time, and calls arriving meanwhile form the next batch. That thread
+uses its own database session (DatabaseManager hands out one per thread),
+so it never shares one with the request threads. CodecService runs a batcher
+on its own loop thread for synchronous callers such as the Flask request
+threads, so concurrent web requests are coalesced too.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from phrase_matcher import GREEDY, validate_mode
+from codec_pool import CodecTimeout
+from codec_state import start_background
+
+# Longest a call waits for others to join its batch; 0 disables batching in the web layer
+WINDOW_MS = float(os.getenv('BOTSPEAK_BATCH_WINDOW_MS', 2))
+# A batch is encoded at once when this many calls are waiting
+MAX_BATCH = int(os.getenv('BOTSPEAK_BATCH_SIZE', 64))
+
+
+class CodecBatcher:
+    """Coalesces concurrent encode calls on one event loop into encode_many() passes
+
+    encoder is a DatabaseEncoder. The batcher is bound to the loop it is
+    first awaited on.
+    """
+
+    def __init__(self, encoder, window_ms=WINDOW_MS, max_batch=MAX_BATCH, track_usage=True, executor=None):
+        self.encoder = encoder
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.track_usage = track_usage
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='botspeak-codec-batch')
+        self._loop = None
+        # (text, options, future, arrival time) of the calls waiting for the open batch
+        self._pending = []
+        self._timer = None
+        # Batches being encoded; the loop itself only keeps weak references to tasks
+        self._running = set()
+        self._batches = 0
+        self._calls = 0
+        self._max_batch_seen = 0
+        self._full_flushes = 0
+        self._encode_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    async def encode_with_stats(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False,
+                                suffixes=False):
+        """encode_with_stats() of the encoder, batched with concurrent calls"""
+        # A bad mode fails this call alone, not the batch it would join
+        validate_mode(mode)
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop:
+            raise RuntimeError("CodecBatcher is bound to another event loop")
+
+        future = loop.create_future()
+        options = (mode, bool(backrefs), bool(patterns), bool(fuzzy), bool(suffixes))
+        self._pending.append((text, options, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch:
+            self._full_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    async def encode(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, suffixes=False):
+        """Encoded text for text, batched with concurrent calls"""
+        result = await self.encode_with_stats(text, mode, backrefs, patterns, fuzzy, suffixes)
+        return result['encoded_text']
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        # Callers cancelled while waiting (e.g. timed out) are not encoded at all
+        batch = [call for call in batch if not call[2].done()]
+        if not batch:
+            return
+        now = time.perf_counter()
+        self._batches += 1
+        self._calls += len(batch)
+        self._max_batch_seen = max(self._max_batch_seen, len(batch))
+        self._wait_seconds += sum(now - queued for _, _, _, queued in batch)
+
+        # encode_many() takes one option set; most batches have a single group
+        groups = {}
+        for call in batch:
+            groups.setdefault(call[1], []).append(call)
+
+        for (mode, backrefs, patterns, fuzzy, suffixes), calls in groups.items():
+            encode = functools.partial(self._encode_many, [call[0] for call in calls],
+                                       track_usage=self.track_usage, mode=mode, backrefs=backrefs,
+                                       patterns=patterns, fuzzy=fuzzy, suffixes=suffixes)
+            try:
+                results = await self._loop.run_in_executor(self.executor, encode)
+            except Exception as e:
+                for _, _, future, _ in calls:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, _, future, _), result in zip(calls, results):
+                # A caller may have been cancelled while its batch ran
+                if not future.done():
+                    future.set_result(result)
+
+    def _encode_many(self, texts, **options):
+        # Timed in the executor thread, so time spent queued behind other batches is not counted
+        start = time.perf_counter()
+        try:
+            return self.encoder.encode_many(texts, **options)
+        finally:
+            self._encode_seconds += time.perf_counter() - start
+
+    def get_stats(self):
+        """Batch count and size, wait and encode times"""
+        batches = self._batches
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch,
+            'pending': len(self._pending),
+            'batches': batches,
+            'calls': self._calls,
+            'avg_batch_size': round(self._calls / batches, 2) if batches else 0.0,
+            'max_batch_size': self._max_batch_seen,
+            'full_flushes': self._full_flushes,
+            'avg_wait_ms': round(self._wait_seconds / self._calls * 1000, 3) if self._calls else 0.0,
+            'avg_encode_ms': round(self._encode_seconds / batches * 1000, 3) if batches else 0.0
+        }
+
+
+class CodecService:
+    """CodecBatcher on its own event loop thread, for synchronous callers"""
+
+    def __init__(self, encoder, window_ms=WINDOW_MS, max_batch=MAX_BATCH, track_usage=True):
+        self.batcher = CodecBatcher(encoder, window_ms, max_batch, track_usage)
+        self._loop = None
+        self._lock = threading.Lock()
+        self._timed_out = 0
+
+    @property
+    def enabled(self):
+        return self.batcher.window > 0
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                start_background(loop.run_forever, 'botspeak-codec-service')
+                self._loop = loop
+            return self._loop
+
+    def encode_with_stats(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, suffixes=False,
+                          timeout=None):
+        """Blocking encode_with_stats() through the batcher; safe to call from any thread
+
+        Raises CodecTimeout if no result arrives within timeout seconds (a
+        batch stalled, e.g. on its history commit); the call is then
+        cancelled, so it is left out of its batch if that has not started.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.batcher.encode_with_stats(text, mode, backrefs, patterns, fuzzy, suffixes), self._get_loop())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise CodecTimeout(f"Batched request did not finish within {timeout:g} seconds")
+
+    def get_stats(self):
+        stats = self.batcher.get_stats()
+        stats['enabled'] = self.enabled
+        stats['timed_out'] = self._timed_out
+        return stats
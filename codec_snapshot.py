@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+BotSpeak Codec Snapshot Module
+Precompiled encoder/decoder lookup structures for fast process startup
+
+A snapshot holds the compiled dictionary, reverse index, phrase trie, code
+ID map and decode table of one dictionary source. Encoders and decoders load
+it with a single file read when its fingerprint (a checksum of the source
+dictionary and of the usage ranking that breaks its ties) matches, and
+rebuild from the source otherwise.
+
+Build step:
+    python codec_snapshot.py            # from the static dictionary
+    python codec_snapshot.py --db       # from the database (DATABASE_URL)
+
+File layout: MAGIC, version byte, the interpreter's bytecode magic number
+(marshal data is only portable within one Python version), the 32-byte
+source fingerprint, the 32-byte SHA-256 of the payload, then the payload.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import threading
+from pathlib import Path
+
+from botspeak_dict import code_rank
+from phrase_matcher import PhraseMatcher
+from text_lexer import normalize_phrase
+
+MAGIC = b'BSNP'
+# 2: phrase trie keyed by normalize_phrase(); 3: shortest code wins each text;
+# 4: trie keys break ties with code_rank() as well; 5: fingerprint covers tie ranking
+VERSION = 5
+_PREFIX = MAGIC + bytes([VERSION]) + importlib.util.MAGIC_NUMBER
+_HEADER_SIZE = len(_PREFIX) + 64
+
+# Next to the modules, so workers find it whatever their working directory.
+# An empty BOTSPEAK_SNAPSHOT disables snapshot loading.
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'codec.snapshot')
+
+_loaded = {}
+_load_lock = threading.Lock()
+_static_fingerprint = None
+
+
+class CodecSnapshot:
+    """Compiled lookup structures shared read-only by every codec in the process"""
+
+    def __init__(self, fingerprint, state):
+        self.fingerprint = fingerprint
+        self.dictionary = state['dictionary']
+        self.reverse_dictionary = state['reverse_dictionary']
+        self.phrase_matcher = PhraseMatcher.from_snapshot(state['phrase_matcher'])
+        self.code_ids = state['code_ids']
+        self.id_table = state['id_table']
+
+
+def snapshot_path():
+    return os.getenv('BOTSPEAK_SNAPSHOT', DEFAULT_SNAPSHOT_PATH)
+
+
+def dictionary_fingerprint(items, frequencies=None):
+    """SHA-256 of everything a compiled state is built from
+
+    items are (code, text) pairs in source order. Codes sharing a text or a
+    trie key are ranked by code_rank() with the usage counts in frequencies
+    (code -> count); that ranking is hashed too, rather than the counts, so
+    usage that does not reorder any tie keeps the snapshot valid.
+    """
+    digest = hashlib.sha256()
+    groups = {}
+    for code, text in items:
+        digest.update(f"{code}\x1f{text}\x1e".encode('utf-8'))
+        if frequencies:
+            groups.setdefault(normalize_phrase(text) or text, []).append(code)
+
+    digest.update(b'\x1d')
+    for key in sorted(groups):
+        codes = groups[key]
+        if len(codes) > 1:
+            codes.sort(key=lambda code: code_rank(code, frequencies))
+            digest.update(f"{key}\x1f{' '.join(codes)}\x1e".encode('utf-8'))
+    return digest.digest()
+
+
+def static_fingerprint():
+    """Fingerprint of botspeak_dict, computed once per process"""
+    global _static_fingerprint
+    if _static_fingerprint is None:
+        from botspeak_dict import botspeak_dict
+        _static_fingerprint = dictionary_fingerprint(botspeak_dict.items())
+    return _static_fingerprint
+
+
+def load_snapshot(fingerprint):
+    """Return the CodecSnapshot for a dictionary fingerprint, or None to rebuild
+
+    The file is read once per process; a missing, stale or corrupt snapshot
+    returns None.
+    """
+    path = snapshot_path()
+    if not path:
+        return None
+
+    with _load_lock:
+        key = (path, fingerprint)
+        if key not in _loaded:
+            _loaded[key] = _read_snapshot(path, fingerprint)
+        return _loaded[key]
+
+
+def _read_snapshot(path, fingerprint):
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        print(f"Warning: Could not read codec snapshot {path}: {e}")
+        return None
+
+    if data[:len(_PREFIX)] != _PREFIX:
+        print(f"Warning: Codec snapshot {path} was built by another version; rebuilding")
+        return None
+    offset = len(_PREFIX)
+    if data[offset:offset + 32] != fingerprint:
+        print(f"Warning: Codec snapshot {path} is stale (dictionary changed); rebuilding")
+        return None
+
+    payload = data[_HEADER_SIZE:]
+    if hashlib.sha256(payload).digest() != data[offset + 32:_HEADER_SIZE]:
+        print(f"Warning: Codec snapshot {path} is corrupt; rebuilding")
+        return None
+
+    return CodecSnapshot(fingerprint, marshal.loads(payload))
+
+
+def write_snapshot(path, fingerprint, encoder, decoder):
+    """Serialize the compiled structures of an encoder/decoder pair"""
+    payload = marshal.dumps({
+        'dictionary': encoder.dictionary,
+        'reverse_dictionary': encoder.reverse_dictionary,
+        'phrase_matcher': encoder.phrase_matcher.snapshot(),
+        'code_ids': encoder.code_ids,
+        'id_table': decoder.id_table,
+    })
+
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(_PREFIX + fingerprint + hashlib.sha256(payload).digest() + payload)
+    # Atomic replace, so running workers never read a half-written file
+    os.replace(temp_path, path)
+    return len(payload) + _HEADER_SIZE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precompiled BotSpeak codec snapshot")
+    parser.add_argument('--db', action='store_true', help="compile the database dictionary instead of botspeak_dict")
+    parser.add_argument('-o', '--output', default=None, help="snapshot path (default: $BOTSPEAK_SNAPSHOT or codec.snapshot next to this file)")
+    args = parser.parse_args(argv)
+
+    output = args.output or snapshot_path() or DEFAULT_SNAPSHOT_PATH
+    # Compile from the source, never from an existing snapshot
+    os.environ['BOTSPEAK_SNAPSHOT'] = ''
+
+    if args.db:
+        from db_manager import get_db_manager
+        from db_encoder import DatabaseEncoder
+        from db_decoder import DatabaseDecoder
+        # Taken first: if the dictionary changes meanwhile, workers see a stale snapshot
+        fingerprint = get_db_manager().get_dictionary_fingerprint()
+        encoder = DatabaseEncoder()
+        decoder = DatabaseDecoder()
+    else:
+        from encoder import BotSpeakEncoder
+        from decoder import BotSpeakDecoder
+        encoder = BotSpeakEncoder()
+        decoder = BotSpeakDecoder()
+        fingerprint = static_fingerprint()
+
+    size = write_snapshot(output, fingerprint, encoder, decoder)
+    print(f"Wrote {output}: {len(encoder.dictionary)} entries, {size} bytes, fingerprint {fingerprint.hex()[:16]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
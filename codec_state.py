@@ -0,0 +1,89 @@
+"""
+BotSpeak Codec State Module
+Immutable, versioned bundles of compiled dictionary structures for lock-free readers
+
+A database codec publishes its compiled state as one CodecState and replaces
+it with a single reference assignment (read-copy-update). A request reads
+the reference once and works on that version throughout, so it can never
+mix structures from two dictionary versions, and readers never lock.
+"""
+
+import itertools
+import threading
+from datetime import datetime
+
+from phrase_matcher import GREEDY
+from result_cache import ResultCache
+from sentence_memo import SentenceMemo
+
+_versions = itertools.count(1)
+
+
+class CodecState:
+    """One published version of a codec's dictionary and derived lookup structures
+
+    Attributes are fixed after construction. Result caches belong to the
+    version they were filled from, so a refresh can never leave stale
+    entries behind. lazy holds structures built on first use (the entropy
+    table), keyed by name. deltas counts the incremental changes applied
+    since the last full build; such a state has no fingerprint.
+    phrase_keys maps each trie key to the set of texts normalizing to it
+    (see phrase_matcher.phrase_keys()), so a delta only re-ranks the keys
+    it touches; None until built (states loaded from a snapshot build it
+    on their first delta). Its sets are never modified once published.
+    """
+
+    __slots__ = ('version', 'fingerprint', 'built_at', 'dictionary', 'reverse_dictionary',
+                 'phrase_matcher', 'code_ids', 'id_table', 'result_cache', 'sentence_memo', 'lazy',
+                 'deltas', 'phrase_keys')
+
+    def __init__(self, fingerprint, dictionary, reverse_dictionary=None, phrase_matcher=None,
+                 code_ids=None, id_table=None, sentence_memo=False, deltas=0, phrase_keys=None):
+        set_slot = object.__setattr__
+        set_slot(self, 'version', next(_versions))
+        set_slot(self, 'fingerprint', fingerprint)
+        set_slot(self, 'built_at', datetime.utcnow())
+        set_slot(self, 'dictionary', dictionary)
+        set_slot(self, 'reverse_dictionary', reverse_dictionary)
+        set_slot(self, 'phrase_matcher', phrase_matcher)
+        set_slot(self, 'code_ids', code_ids)
+        set_slot(self, 'id_table', id_table)
+        set_slot(self, 'result_cache', ResultCache())
+        set_slot(self, 'sentence_memo', SentenceMemo() if sentence_memo else None)
+        set_slot(self, 'lazy', {})
+        set_slot(self, 'deltas', deltas)
+        set_slot(self, 'phrase_keys', phrase_keys)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CodecState is immutable; build a new state and publish it")
+
+    def _tokenize_words(self, words, mode=GREEDY):
+        """Tokenize with this version's matcher
+
+        Lets the format helpers (code_ids, wire_format, entropy_coder,
+        compact_format) take a pinned state in place of an encoder.
+        """
+        return self.phrase_matcher.tokenize(words, mode)
+
+    def get_lazy(self, name, build):
+        """Structure built on first use for this version; concurrent builds are harmless"""
+        value = self.lazy.get(name)
+        if value is None:
+            value = self.lazy.setdefault(name, build())
+        return value
+
+    def get_info(self):
+        return {
+            'version': self.version,
+            'fingerprint': self.fingerprint.hex()[:16] if self.fingerprint else None,
+            'entries': len(self.dictionary),
+            'deltas': self.deltas,
+            'built_at': self.built_at.isoformat()
+        }
+
+
+def start_background(target, name):
+    """Run target in a daemon thread, off the request path"""
+    thread = threading.Thread(target=target, name=name, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,135 @@
+"""
+BotSpeak Compact Format Module
+Separator-free, ASCII-safe text output that a linear scanner can split unambiguously
+
+Every token announces its own length through its first character:
+
+    1-9         3-digit numeric code ("100"-"999"), 3 chars
+    A-Z         alphanumeric code ("A00"-"Z99"), 3 chars
+    0           4-digit code ("0000"-"0999"), 4 chars
+    #...#       any other dictionary code, percent-escaped
+    ~...~       literal (unknown) word, percent-escaped
+    |           sentence break
+
+"Hello, how are you today? Thank you." -> "237244190|242"
+"""
+
+import re
+from urllib.parse import unquote
+
+from code_ids import BREAK_MARK, join_decoded
+from phrase_matcher import is_literal
+from text_lexer import iter_sentences
+
+SENTENCE_BREAK = '|'
+LITERAL_QUOTE = '~'
+CODE_QUOTE = '#'
+
+_CANONICAL_CODE_RE = re.compile(r"(?:[1-9A-Z][0-9]{2}|0[0-9]{3})\Z")
+_PLAIN_RE = re.compile(r"[A-Za-z0-9']*\Z")
+_SAFE_BYTES = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'")
+
+
+def _escape(value):
+    """Percent-escape everything outside [A-Za-z0-9'] so delimiters cannot occur"""
+    if _PLAIN_RE.match(value):
+        return value
+    return ''.join(chr(byte) if byte in _SAFE_BYTES else f'%{byte:02X}'
+                   for byte in value.encode('utf-8'))
+
+
+def compact_token(token):
+    """Compact form of one (text, code) token"""
+    if is_literal(token):
+        return LITERAL_QUOTE + _escape(token[1]) + LITERAL_QUOTE
+    code = token[1]
+    if _CANONICAL_CODE_RE.match(code):
+        return code
+    return CODE_QUOTE + _escape(code) + CODE_QUOTE
+
+
+def encode_compact(encoder, text, mode):
+    """Encode text to the compact format"""
+    return SENTENCE_BREAK.join(
+        ''.join([compact_token(token) for token in encoder._tokenize_words(words, mode)])
+        for words in iter_sentences(text)
+    )
+
+
+def decode_compact(dictionary, encoded_text):
+    """Decode compact-format text with one left-to-right scan
+
+    Output is formatted like decode_codes(); unknown codes are kept as is.
+    Raises ValueError for malformed input.
+    """
+    parts = []
+    i = 0
+    end = len(encoded_text)
+
+    while i < end:
+        char = encoded_text[i]
+        if '1' <= char <= '9' or 'A' <= char <= 'Z':
+            size = 3
+        elif char == '0':
+            size = 4
+        elif char == SENTENCE_BREAK:
+            parts.append(BREAK_MARK)
+            i += 1
+            continue
+        elif char == LITERAL_QUOTE or char == CODE_QUOTE:
+            close = encoded_text.find(char, i + 1)
+            if close < 0:
+                raise ValueError(f"Unterminated {char!r} at position {i}")
+            value = unquote(encoded_text[i + 1:close])
+            parts.append(value if char == LITERAL_QUOTE else dictionary.get(value, value))
+            i = close + 1
+            continue
+        elif char.isspace():
+            i += 1
+            continue
+        else:
+            raise ValueError(f"Unexpected character {char!r} at position {i}")
+
+        code = encoded_text[i:i + size]
+        if len(code) < size or not code[1:].isdigit():
+            raise ValueError(f"Malformed code {code!r} at position {i}")
+        parts.append(dictionary.get(code, code))
+        i += size
+
+    return join_decoded(parts)
+
+
+# Round-trip check against the classic format
+if __name__ == "__main__":
+    from encoder import BotSpeakEncoder
+    from decoder import BotSpeakDecoder
+    from benchmark import REFERENCE_SENTENCES
+
+    encoder = BotSpeakEncoder()
+    decoder = BotSpeakDecoder()
+
+    test_texts = REFERENCE_SENTENCES + [
+        ' '.join(REFERENCE_SENTENCES),
+        "Zyxwvut qwerty! The café is naïve; sure_thing ~tilde# #hash|pipe.",
+        "",
+    ]
+
+    print("=== BotSpeak Compact Format Round Trip ===\n")
+
+    failures = 0
+    classic_chars = compact_chars = 0
+    for text in test_texts:
+        classic = encoder.encode_text(text)
+        compact = encoder.encode_compact(text)
+        classic_chars += len(classic)
+        compact_chars += len(compact)
+
+        expected = decoder.decode_codes(classic)
+        decoded = decoder.decode_compact(compact)
+        if decoded != expected or not compact.isascii():
+            failures += 1
+            print(f"MISMATCH: {text!r}\n  classic: {expected!r}\n  compact: {decoded!r}")
+
+    print(f"{len(test_texts) - failures}/{len(test_texts)} texts round-trip identically")
+    print(f"Classic: {classic_chars} chars, compact: {compact_chars} chars "
+          f"({(1 - compact_chars / classic_chars) * 100:.1f}% smaller)")
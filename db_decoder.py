@@ -4,18 +4,56 @@ Converts BotSpeak codes back to human-readable text using database
 """
 
 import re
+import sys
 from db_manager import get_db_manager
+from code_ids import build_id_table, code_to_id, decode_ids, decode_many_ids
+from wire_format import decode_binary
+from entropy_coder import get_entropy_table, decode_entropy, is_entropy_coded
+from compact_format import decode_compact
+from backref_table import BackrefTable
+from pattern_codecs import decode_pattern
+from suffix_table import decode_suffixed
+from bytes_codec import build_bytes_table, decode_bytes
+from codec_snapshot import load_snapshot
+from codec_state import CodecState, start_background
+import threading
 import time
 
 class DatabaseDecoder:
     def __init__(self):
         self.db_manager = get_db_manager()
-        self.dictionary = None
+        # Published CodecState (dictionary, ID table, result cache); it is
+        # replaced as a whole on refresh and never modified in place
+        self._state = None
+        self._refresh_lock = threading.Lock()
         self._load_dictionary()
     
+    @property
+    def dictionary(self):
+        return self._state.dictionary
+    
+    @property
+    def id_table(self):
+        return self._state.id_table
+    
+    @property
+    def result_cache(self):
+        """Cache of decoded output for repeated inputs (per dictionary version)"""
+        return self._state.result_cache
+    
     def _load_dictionary(self):
-        """Load dictionary from database"""
-        self.dictionary = self.db_manager.get_dictionary_as_dict()
+        """Load dictionary from database and publish it as a new CodecState"""
+        fingerprint = self.db_manager.get_dictionary_fingerprint()
+        snapshot = load_snapshot(fingerprint)
+        if snapshot is not None:
+            # Precompiled lookup structures (see codec_snapshot) skip the full-table query
+            state = CodecState(fingerprint, snapshot.dictionary, id_table=snapshot.id_table)
+        else:
+            dictionary = self.db_manager.get_dictionary_as_dict()
+            state = CodecState(fingerprint, dictionary, id_table=build_id_table(dictionary))
+        
+        # Single reference swap: readers see the old or the new version, never a mix
+        self._state = state
     
     def _is_valid_code(self, code):
         """Check if a code exists in the dictionary"""
@@ -48,9 +86,23 @@ class DatabaseDecoder:
         if not encoded_text.strip():
             return ""
         
+        # Work on one dictionary version throughout, even if a refresh lands meanwhile
+        state = self._state
+        dictionary = state.dictionary
+        
+        # Serve repeated inputs from the result cache
+        key = None
+        if state.result_cache.accepts(encoded_text):
+            key = ('codes', encoded_text)
+            cached = state.result_cache.get(key)
+            if cached is not None:
+                return cached
+        
         # Split by sentence separators first
         sentences = encoded_text.split(' | ')
         decoded_sentences = []
+        # Rebuilt while reading, for text encoded with backrefs=True
+        backrefs = BackrefTable()
         
         for sentence in sentences:
             if not sentence.strip():
@@ -66,11 +118,19 @@ class DatabaseDecoder:
                 
                 normalized_code = self._normalize_code(code)
                 
-                if self._is_valid_code(normalized_code):
-                    decoded_words.append(self.dictionary[normalized_code])
+                if normalized_code in dictionary:
+                    decoded_words.append(dictionary[normalized_code])
                 else:
+                    # Base code + suffix marker, from encode_text(suffixes=True)
+                    word = decode_suffixed(code, dictionary)
+                    if word is not None:
+                        decoded_words.append(word)
+                        continue
+                    
                     # Unknown code - keep as is (might be a word that wasn't encoded)
-                    decoded_words.append(code)
+                    code = backrefs.resolve(code)
+                    entity = decode_pattern(code)
+                    decoded_words.append(code if entity is None else entity)
             
             if decoded_words:
                 decoded_sentence = ' '.join(decoded_words)
@@ -83,6 +143,9 @@ class DatabaseDecoder:
         if result and not result.endswith('.'):
             result += '.'
         
+        if key is not None:
+            state.result_cache.put(key, result)
+        
         return result
     
     def decode_with_validation(self, encoded_text, track_usage=True):
@@ -98,9 +161,46 @@ class DatabaseDecoder:
         
         start_time = time.time()
         
+        state = self._state
+        
+        # Serve repeated inputs from the result cache
+        key = None
+        validation = None
+        if state.result_cache.accepts(encoded_text):
+            key = ('validate', encoded_text)
+            validation = state.result_cache.get(key)
+        
+        if validation is None:
+            validation = self._decode_validated(encoded_text, state.dictionary)
+            if key is not None:
+                state.result_cache.put(key, validation, size=_validation_size(encoded_text, validation))
+        
+        end_time = time.time()
+        processing_time = (end_time - start_time) * 1000  # Convert to milliseconds
+        
+        # Log operation to database if tracking is enabled
+        if track_usage:
+            try:
+                self.db_manager.log_decoding_operation(
+                    input_codes=encoded_text,
+                    output_text=validation['decoded_text'],
+                    recognition_rate=validation['recognition_rate'],
+                    processing_time=processing_time
+                )
+            except Exception as e:
+                print(f"Warning: Could not log decoding operation: {e}")
+        
+        # Callers may annotate the result, so never hand out the cached dict
+        result = dict(validation)
+        result['unknown_codes'] = list(validation['unknown_codes'])
+        return result
+    
+    def _decode_validated(self, encoded_text, dictionary):
+        """Decode and collect validation details (uncached)"""
         # Split by sentence separators
         sentences = encoded_text.split(' | ')
         decoded_sentences = []
+        backrefs = BackrefTable()
         unknown_codes = []
         total_codes = 0
         recognized_codes = 0
@@ -119,10 +219,26 @@ class DatabaseDecoder:
                 total_codes += 1
                 normalized_code = self._normalize_code(code)
                 
-                if self._is_valid_code(normalized_code):
-                    decoded_words.append(self.dictionary[normalized_code])
+                if normalized_code in dictionary:
+                    decoded_words.append(dictionary[normalized_code])
                     recognized_codes += 1
                 else:
+                    word = decode_suffixed(code, dictionary)
+                    if word is not None:
+                        # Inflected form of a dictionary word
+                        decoded_words.append(word)
+                        recognized_codes += 1
+                        continue
+                    
+                    # A back-reference stands for the word it repeats
+                    code = backrefs.resolve(code)
+                    entity = decode_pattern(code)
+                    if entity is not None:
+                        # Typed pattern code (number, timestamp, URL, ...)
+                        decoded_words.append(entity)
+                        recognized_codes += 1
+                        continue
+                    
                     # Unknown code
                     decoded_words.append(f"[{code}]")  # Mark unknown codes
                     unknown_codes.append(code)
@@ -138,21 +254,6 @@ class DatabaseDecoder:
         
         recognition_rate = (recognized_codes / total_codes * 100) if total_codes > 0 else 100
         
-        end_time = time.time()
-        processing_time = (end_time - start_time) * 1000  # Convert to milliseconds
-        
-        # Log operation to database if tracking is enabled
-        if track_usage:
-            try:
-                self.db_manager.log_decoding_operation(
-                    input_codes=encoded_text,
-                    output_text=result,
-                    recognition_rate=recognition_rate,
-                    processing_time=processing_time
-                )
-            except Exception as e:
-                print(f"Warning: Could not log decoding operation: {e}")
-        
         return {
             'decoded_text': result,
             'success': len(unknown_codes) == 0,
@@ -165,8 +266,9 @@ class DatabaseDecoder:
     def get_code_info(self, code):
         """Get information about a specific code"""
         normalized_code = self._normalize_code(code)
+        text = self.dictionary.get(normalized_code)
         
-        if not self._is_valid_code(normalized_code):
+        if text is None:
             return {
                 'code': code,
                 'valid': False,
@@ -187,10 +289,97 @@ class DatabaseDecoder:
         return {
             'code': normalized_code,
             'valid': True,
-            'text': self.dictionary[normalized_code],
+            'text': text,
             'code_type': code_type
         }
     
-    def refresh_dictionary(self):
-        """Reload dictionary from database (useful if dictionary is updated)"""
-        self._load_dictionary()
\ No newline at end of file
+    def decode_compact(self, encoded_text):
+        """Decode compact-format output (see compact_format) back to human text"""
+        return decode_compact(self.dictionary, encoded_text)
+    
+    def decode_ids(self, ids, literals=()):
+        """Decode integer code IDs from encode_to_ids() back to human text"""
+        return decode_ids(self.id_table, ids, literals)
+    
+    def decode_many_ids(self, ids, offsets, literals=()):
+        """Decode an encode_many_to_ids() buffer back into a list of texts"""
+        return decode_many_ids(self.id_table, ids, offsets, literals)
+    
+    def decode_bytes(self, data, out=None):
+        """Decode UTF-8 bytes (or a memoryview) of codes without decoding ASCII input to str (see bytes_codec)
+        
+        The output is appended to out, a new bytearray by default, which is returned.
+        """
+        state = self._state
+        # Built once per version, on the first bytes request
+        table = state.get_lazy('bytes_table', lambda: build_bytes_table(self, state.dictionary))
+        return decode_bytes(self, table, state.dictionary, data, out)
+    
+    def _get_entropy_table(self, state):
+        # Built once per version, only if no table in this process matches the payload
+        return state.get_lazy('entropy_table', lambda: get_entropy_table(
+            state.dictionary, self.db_manager.get_code_frequencies()))
+    
+    def decode_binary(self, data):
+        """Decode binary wire-format or entropy-coded data back to human text"""
+        state = self._state
+        if is_entropy_coded(data):
+            return decode_entropy(state.id_table, data, lambda: self._get_entropy_table(state))
+        return decode_binary(state.id_table, data)
+    
+    def get_version_info(self):
+        """Version, fingerprint and size of the dictionary currently in use"""
+        return self._state.get_info()
+    
+    def refresh_dictionary(self, background=False):
+        """Reload dictionary from database (useful if dictionary is updated)
+        
+        The new version is built while requests keep using the current one,
+        then published atomically with a fresh cache. With background=True
+        the rebuild runs in a thread and the thread is returned.
+        """
+        if background:
+            return start_background(self._refresh, 'botspeak-decoder-refresh')
+        self._refresh()
+    
+    def _refresh(self):
+        # Serializes rebuilds only; readers never take this lock
+        with self._refresh_lock:
+            try:
+                self._load_dictionary()
+            finally:
+                # Background refresh threads exit here; don't leave their session open
+                self.db_manager.close_session()
+    
+    def apply_dictionary_changes(self, changes):
+        """Apply added, updated or deactivated entries without a full rebuild
+        
+        changes are {'code', 'old_text', 'new_text'} dicts as returned by the
+        db_manager admin methods; the result is published as a new version.
+        The dictionary and ID table are copied whole (published states are
+        never mutated), so a call is O(entries) in C-level copies.
+        """
+        with self._refresh_lock:
+            state = self._state
+            dictionary = state.dictionary.copy()
+            id_table = list(state.id_table)
+            
+            for change in changes:
+                code = change['code']
+                if change['new_text'] is None:
+                    dictionary.pop(code, None)
+                else:
+                    dictionary[code] = change['new_text']
+                code_id = code_to_id(code)
+                if code_id is not None:
+                    # Unused IDs decode to their code, as in build_id_table()
+                    id_table[code_id] = dictionary.get(code, code)
+            
+            self._state = CodecState(None, dictionary, id_table=id_table,
+                                     deltas=state.deltas + len(changes))
+
+def _validation_size(encoded_text, validation):
+    """Approximate memory held by a cached decode_with_validation() result"""
+    return (sys.getsizeof(encoded_text) + sys.getsizeof(validation)
+            + sys.getsizeof(validation['decoded_text'])
+            + sum(sys.getsizeof(code) for code in validation['unknown_codes']))
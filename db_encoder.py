@@ -3,135 +3,188 @@ BotSpeak Database-Aware Encoder Module
 Converts human text into BotSpeak compressed codes using database
 """
 
-import re
 import string
 from db_manager import get_db_manager
+from botspeak_dict import build_reverse_index, code_rank
+from phrase_matcher import compile_phrase_matcher, phrase_keys, GREEDY, validate_mode
+from text_lexer import iter_sentences, normalize_words, normalize_phrase, cache_key
+from stream_encoder import StreamEncoder, iter_encoded
+from code_ids import build_code_id_map, code_to_id, encode_ids, encode_many_ids
+from wire_format import encode_binary
+from entropy_coder import get_entropy_table, encode_entropy
+from compact_format import encode_compact
+from backref_table import encode_backrefs
+from pattern_codecs import iter_pattern_sentences
+from fuzzy_index import FuzzyIndex
+from suffix_table import SuffixTable
+from bytes_codec import encode_bytes
+from codec_snapshot import load_snapshot
+from codec_state import CodecState, start_background
+import threading
 import time
 
 class DatabaseEncoder:
     def __init__(self):
         self.db_manager = get_db_manager()
-        self.dictionary = None
-        self.reverse_dictionary = None
-        self.phrase_mapping = None
+        # Published CodecState (dictionary, matcher, code IDs, caches); it is
+        # replaced as a whole on refresh and never modified in place
+        self._state = None
+        self._refresh_lock = threading.Lock()
         self._load_dictionary()
     
+    @property
+    def dictionary(self):
+        return self._state.dictionary
+    
+    @property
+    def reverse_dictionary(self):
+        return self._state.reverse_dictionary
+    
+    @property
+    def phrase_matcher(self):
+        return self._state.phrase_matcher
+    
+    @property
+    def code_ids(self):
+        return self._state.code_ids
+    
+    @property
+    def result_cache(self):
+        """Cache of encoded output for repeated inputs (per dictionary version)"""
+        return self._state.result_cache
+    
+    @property
+    def sentence_memo(self):
+        """Memo of encoded sentences, shared by every call on this encoder (per dictionary version)"""
+        return self._state.sentence_memo
+    
     def _load_dictionary(self):
-        """Load dictionary from database"""
-        self.dictionary = self.db_manager.get_dictionary_as_dict()
-        self.reverse_dictionary = self.db_manager.get_reverse_dictionary_as_dict()
-        self.phrase_mapping = self._create_phrase_mapping()
-    
-    def _create_phrase_mapping(self):
-        """Create mapping for multi-word phrases (optimized for performance)"""
-        phrases = {}
-        for text, code in self.reverse_dictionary.items():
-            if ' ' in text and len(text.split()) <= 4:  # Limit to 4 words max
-                phrases[text.lower()] = code
-        
-        # Sort by length (longest first) for greedy matching
-        return dict(sorted(phrases.items(), key=lambda x: len(x[0]), reverse=True))
-    
-    def _preprocess_text(self, text):
-        """Clean and preprocess input text"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Replace common contractions
-        contractions = {
-            "don't": "do not",
-            "won't": "will not", 
-            "can't": "cannot",
-            "n't": " not",
-            "'re": " are",
-            "'ve": " have",
-            "'ll": " will",
-            "'d": " would",
-            "'m": " am",
-            "'s": " is"
-        }
-        
-        for contraction, expansion in contractions.items():
-            text = text.replace(contraction, expansion)
-        
-        # Remove extra punctuation but keep sentence structure
-        text = re.sub(r'[^\w\s\.\!\?]', ' ', text)
+        """Load dictionary from database and publish it as a new CodecState"""
+        fingerprint = self.db_manager.get_dictionary_fingerprint()
+        snapshot = load_snapshot(fingerprint)
+        if snapshot is not None:
+            # Precompiled lookup structures (see codec_snapshot) skip the full-table queries
+            state = CodecState(fingerprint, snapshot.dictionary, snapshot.reverse_dictionary,
+                               snapshot.phrase_matcher, snapshot.code_ids, sentence_memo=True)
+        else:
+            # One read, so the reverse index and the trie break ties on the same counts
+            dictionary, frequencies = self.db_manager.get_dictionary_with_frequencies()
+            reverse_dictionary, _ = build_reverse_index(dictionary, frequencies)
+            keys = {}
+            state = CodecState(fingerprint, dictionary, reverse_dictionary,
+                               self._build_phrase_matcher(reverse_dictionary, frequencies, keys),
+                               build_code_id_map(dictionary), sentence_memo=True, phrase_keys=keys)
         
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        # Single reference swap: readers see the old or the new version, never a mix
+        self._state = state
     
-    def _tokenize_sentence(self, sentence):
-        """Tokenize sentence into words and phrases (optimized)"""
-        tokens = []
-        words = sentence.split()
-        i = 0
-        
-        while i < len(words):
-            matched = False
-            
-            # Try to match multi-word phrases (limit to 4 words max for performance)
-            max_phrase_len = min(4, len(words) - i)
-            for phrase_len in range(max_phrase_len, 0, -1):
-                candidate_phrase = ' '.join(words[i:i + phrase_len])
-                
-                if candidate_phrase in self.phrase_mapping:
-                    tokens.append((candidate_phrase, self.phrase_mapping[candidate_phrase]))
-                    i += phrase_len
-                    matched = True
-                    break
-            
-            if not matched:
-                # Single word lookup
-                word = words[i]
-                if word in self.reverse_dictionary:
-                    tokens.append((word, self.reverse_dictionary[word]))
-                else:
-                    # Unknown word - keep as is
-                    tokens.append((word, word))
-                i += 1
+    def _build_phrase_matcher(self, reverse_dictionary, frequencies=None, keys=None):
+        """Compile the dictionary into a word trie for longest-match lookup"""
+        return compile_phrase_matcher(reverse_dictionary, frequencies, keys)
+    
+    def _tokenize_words(self, words, mode=GREEDY):
+        """Tokenize normalized words into words and phrases
         
-        return tokens
+        mode is GREEDY (longest match first) or OPTIMAL (shortest output).
+        """
+        return self.phrase_matcher.tokenize(words, mode)
     
-    def encode_sentence(self, sentence):
+    def encode_sentence(self, sentence, mode=GREEDY):
         """Encode a single sentence to BotSpeak codes"""
+        validate_mode(mode)
         if not sentence.strip():
             return ""
         
-        # Preprocess the sentence
-        processed_sentence = self._preprocess_text(sentence)
-        
-        # Tokenize and encode
-        tokens = self._tokenize_sentence(processed_sentence)
+        # Normalize and tokenize the sentence
+        tokens = self._tokenize_words(normalize_words(sentence), mode)
         
         # Extract codes
         codes = [token[1] for token in tokens]
         
         return ' '.join(codes)
     
-    def encode_text(self, text):
-        """Encode full text (multiple sentences) to BotSpeak codes"""
+    def encode_text(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, corrections=None,
+                    suffixes=False):
+        """Encode full text (multiple sentences) to BotSpeak codes
+        
+        mode="optimal" picks the segmentation with the shortest output
+        instead of the longest phrase at each position. backrefs=True
+        replaces repeated unknown words with document-local references
+        (see backref_table). patterns=True keeps numbers, timestamps,
+        UUIDs, URLs and e-mail addresses whole as typed codes (see
+        pattern_codecs). The decoders always understand both.
+        fuzzy=True replaces misspelled unknown words with the closest
+        dictionary word (see fuzzy_index); if a corrections list is given,
+        each substitution is appended to it. suffixes=True writes inflected
+        forms of dictionary words as base code + suffix marker (see
+        suffix_table).
+        """
+        validate_mode(mode)
         if not text.strip():
             return ""
         
-        # Split into sentences
-        sentences = re.split(r'[.!?]+', text)
+        # Work on one dictionary version throughout, even if a refresh lands meanwhile
+        state = self._state
+        
+        # Serve repeated inputs from the result cache
+        key = None
+        if state.result_cache.accepts(text):
+            # Pattern payloads keep their case and spacing, so key on the raw text
+            key = text if patterns else cache_key(text)
+            if mode != GREEDY:
+                key = (mode, key)
+            if backrefs or patterns or fuzzy or suffixes:
+                key = (backrefs, patterns, fuzzy, suffixes, key)
+            # Substitutions are only collected on a full encode
+            cached = state.result_cache.get(key) if corrections is None or not fuzzy else None
+            if cached is not None:
+                return cached
+        
+        # Lex the whole document once into per-sentence word lists
+        sentences = iter_pattern_sentences(text) if patterns else iter_sentences(text)
+        if fuzzy:
+            sentences = self._get_fuzzy_index(state).correct_sentences(sentences, corrections)
+        suffix_table = self._get_suffix_table(state) if suffixes else None
+        
+        if backrefs:
+            # One table spans the document, so sentences cannot come from the memo
+            encoded = encode_backrefs(state, sentences, mode, suffix_table)
+            if key is not None:
+                state.result_cache.put(key, encoded)
+            return encoded
+        
         encoded_sentences = []
         
-        for sentence in sentences:
-            if sentence.strip():
-                encoded = self.encode_sentence(sentence)
-                if encoded:
-                    encoded_sentences.append(encoded)
+        memo = state.sentence_memo
+        
+        for words in sentences:
+            # Repeated sentences are tokenized once per encoder
+            sentence_key = memo.key(words, mode)
+            if sentence_key is not None and suffix_table is not None:
+                sentence_key = ('suffixes', sentence_key)
+            encoded = memo.get(sentence_key) if sentence_key is not None else None
+            if encoded is None:
+                tokens = state._tokenize_words(words, mode)
+                if suffix_table is not None:
+                    tokens = suffix_table.encode(tokens)
+                encoded = ' '.join([token[1] for token in tokens])
+                if sentence_key is not None:
+                    memo.put(sentence_key, encoded)
+            encoded_sentences.append(encoded)
+        
+        encoded = ' | '.join(encoded_sentences)  # Use | to separate sentences
+        
+        if key is not None:
+            state.result_cache.put(key, encoded)
         
-        return ' | '.join(encoded_sentences)  # Use | to separate sentences
+        return encoded
     
     def get_compression_stats(self, original_text, encoded_text):
         """Calculate compression statistics"""
-        original_chars = len(original_text)
-        encoded_chars = len(encoded_text)
-        
+        return self.get_length_stats(len(original_text), len(encoded_text))
+    
+    def get_length_stats(self, original_chars, encoded_chars):
+        """Calculate compression statistics from character counts"""
         if original_chars == 0:
             return {
                 'original_length': 0,
@@ -153,11 +206,25 @@ class DatabaseEncoder:
             'percentage_saved': round(percentage_saved, 2)
         }
     
-    def encode_with_stats(self, text, track_usage=True):
-        """Encode text and return both encoded text and statistics"""
+    def get_batch_stats(self, results):
+        """Calculate aggregate compression statistics for encode_many() results"""
+        original_chars = sum(result['statistics']['original_length'] for result in results)
+        encoded_chars = sum(result['statistics']['encoded_length'] for result in results)
+        
+        stats = self.get_length_stats(original_chars, encoded_chars)
+        stats['total_texts'] = len(results)
+        return stats
+    
+    def encode_with_stats(self, text, track_usage=True, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False,
+                          suffixes=False):
+        """Encode text and return both encoded text and statistics
+        
+        With fuzzy=True the result also lists the spelling corrections made.
+        """
         start_time = time.time()
         
-        encoded = self.encode_text(text)
+        corrections = [] if fuzzy else None
+        encoded = self.encode_text(text, mode, backrefs, patterns, fuzzy, corrections, suffixes)
         stats = self.get_compression_stats(text, encoded)
         
         end_time = time.time()
@@ -175,12 +242,273 @@ class DatabaseEncoder:
             except Exception as e:
                 print(f"Warning: Could not log encoding operation: {e}")
         
-        return {
+        result = {
             'original_text': text,
             'encoded_text': encoded,
             'statistics': stats
         }
+        if fuzzy:
+            result['corrections'] = corrections
+        return result
+    
+    def encode_many(self, texts, track_usage=True, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False,
+                    suffixes=False):
+        """Encode a batch of texts and log them to the database in a single write"""
+        results = []
+        operations = []
+        
+        for text in texts:
+            start_time = time.time()
+            
+            corrections = [] if fuzzy else None
+            encoded = self.encode_text(text, mode, backrefs, patterns, fuzzy, corrections, suffixes)
+            stats = self.get_compression_stats(text, encoded)
+            
+            processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+            
+            result = {
+                'original_text': text,
+                'encoded_text': encoded,
+                'statistics': stats
+            }
+            if fuzzy:
+                result['corrections'] = corrections
+            results.append(result)
+            operations.append({
+                'input_text': text,
+                'output_text': encoded,
+                'compression_ratio': stats['compression_ratio'],
+                'processing_time': processing_time
+            })
+        
+        # Log the whole batch with one insert if tracking is enabled
+        if track_usage and operations:
+            try:
+                self.db_manager.log_encoding_operations(operations)
+            except Exception as e:
+                print(f"Warning: Could not log batch encoding operation: {e}")
+        
+        return results
+    
+    def encode_compact(self, text, mode=GREEDY):
+        """Encode text to the separator-free compact format (see compact_format)"""
+        validate_mode(mode)
+        return encode_compact(self._state, text, mode)
+    
+    def encode_stream(self, chunks, stats=None):
+        """Encode an iterable of text chunks (e.g. a file object), yielding output incrementally
+        
+        Sentences and phrases may span chunk boundaries. If a stats dict is
+        given it is kept updated with running compression statistics. Streams
+        are not logged to the encoding history.
+        """
+        return iter_encoded(self, chunks, stats)
+    
+    def open_stream(self):
+        """Return a StreamEncoder to push text into as it arrives (e.g. model output tokens)
+        
+        feed() returns the codes each piece completes; finish() flushes the
+        rest. The joined output equals encode_text() of the joined input.
+        """
+        return StreamEncoder(self)
+    
+    def encode_to_ids(self, text, mode=GREEDY, as_numpy=False):
+        """Encode text to integer code IDs for ML and storage pipelines
+        
+        Returns {'ids': array('H') (or a NumPy uint16 array with as_numpy=True),
+        'literals': [unknown words]}; see code_ids for the ID layout.
+        """
+        validate_mode(mode)
+        return encode_ids(self._state, text, mode, as_numpy)
     
-    def refresh_dictionary(self):
-        """Reload dictionary from database (useful if dictionary is updated)"""
-        self._load_dictionary()
\ No newline at end of file
+    def encode_many_to_ids(self, texts, mode=GREEDY, as_numpy=False):
+        """Encode a batch of texts to one flat ID buffer with offsets and a shared literal table"""
+        validate_mode(mode)
+        return encode_many_ids(self._state, texts, mode, as_numpy)
+    
+    def _get_entropy_table(self, state):
+        # Trained on the usage counts logged with each encoding; built once per version
+        return state.get_lazy('entropy_table', lambda: get_entropy_table(
+            state.dictionary, self.db_manager.get_code_frequencies()))
+    
+    def _get_fuzzy_index(self, state):
+        # Built once per version, on the first fuzzy request
+        return state.get_lazy('fuzzy_index', lambda: FuzzyIndex(state.phrase_matcher))
+    
+    def get_fuzzy_index_info(self):
+        """Size, memory and build time of the current version's fuzzy index"""
+        return self._get_fuzzy_index(self._state).get_info()
+    
+    def _get_suffix_table(self, state):
+        # Built once per version, on the first request with suffixes
+        return state.get_lazy('suffix_table', lambda: SuffixTable(state.dictionary))
+    
+    def encode_bytes(self, data, mode=GREEDY, out=None):
+        """Encode UTF-8 bytes (or a memoryview) without decoding ASCII input to str (see bytes_codec)
+        
+        The output is appended to out, a new bytearray by default, which is returned.
+        """
+        validate_mode(mode)
+        state = self._state
+        # Built once per version, on the first bytes request
+        matcher = state.get_lazy('bytes_matcher', lambda: state.phrase_matcher.to_bytes())
+        return encode_bytes(self, matcher, data, mode, out)
+    
+    def encode_binary(self, text, mode=GREEDY, entropy=False):
+        """Encode text to the compact binary wire format (see wire_format)
+        
+        entropy=True adds a Huffman stage trained on code frequencies
+        (see entropy_coder); decode_binary() accepts either form.
+        """
+        validate_mode(mode)
+        state = self._state
+        if entropy:
+            return encode_entropy(state, self._get_entropy_table(state), text, mode)
+        return encode_binary(state, text, mode)
+    
+    def encode_binary_with_stats(self, text, track_usage=True, mode=GREEDY, entropy=False):
+        """Encode text to the binary wire format and return it with byte-size statistics"""
+        validate_mode(mode)
+        start_time = time.time()
+        
+        state = self._state
+        encoded_sentences = []
+        if entropy:
+            data = encode_entropy(state, self._get_entropy_table(state), text, mode, encoded_sentences)
+        else:
+            data = encode_binary(state, text, mode, encoded_sentences)
+        stats = self.get_length_stats(len(text.encode('utf-8')), len(data))
+        
+        processing_time = (time.time() - start_time) * 1000  # Convert to milliseconds
+        
+        # History keeps the text format so code frequency tracking still works
+        if track_usage:
+            try:
+                self.db_manager.log_encoding_operation(
+                    input_text=text,
+                    output_text=' | '.join(encoded_sentences),
+                    compression_ratio=stats['compression_ratio'],
+                    processing_time=processing_time
+                )
+            except Exception as e:
+                print(f"Warning: Could not log encoding operation: {e}")
+        
+        return {
+            'original_text': text,
+            'encoded_data': data,
+            'statistics': stats
+        }
+    
+    def get_version_info(self):
+        """Version, fingerprint and size of the dictionary currently in use"""
+        return self._state.get_info()
+    
+    def refresh_dictionary(self, background=False):
+        """Reload dictionary from database (useful if dictionary is updated)
+        
+        The new version is built while requests keep using the current one,
+        then published atomically with fresh caches. With background=True the
+        rebuild runs in a thread and the thread is returned.
+        """
+        if background:
+            return start_background(self._refresh, 'botspeak-encoder-refresh')
+        self._refresh()
+    
+    def _refresh(self):
+        # Serializes rebuilds only; readers never take this lock
+        with self._refresh_lock:
+            try:
+                self._load_dictionary()
+            finally:
+                # Background refresh threads exit here; don't leave their session open
+                self.db_manager.close_session()
+    
+    def apply_dictionary_changes(self, changes):
+        """Apply added, updated or deactivated entries without a full rebuild
+        
+        changes are {'code', 'old_text', 'new_text'} dicts as returned by the
+        db_manager admin methods. Only the texts they touch are looked up
+        again (another entry may own a text once its code is gone) and only
+        their trie paths are copied; the result is published as a new version.
+        
+        The flat maps (dictionary, code IDs, reverse index, phrase keys) are
+        still copied whole, since published states are never mutated: each
+        call is O(entries) in C-level dict copies, a few milliseconds for the
+        full dictionary, but no rule regeneration or trie build.
+        """
+        with self._refresh_lock:
+            state = self._state
+            # dict.copy() clones the hash table even after earlier deltas deleted
+            # keys, where dict() would re-insert every entry
+            dictionary = state.dictionary.copy()
+            code_ids = state.code_ids.copy()
+            texts = set()
+            
+            for change in changes:
+                code = change['code']
+                if change['old_text'] is not None:
+                    texts.add(change['old_text'])
+                    dictionary.pop(code, None)
+                    code_ids.pop(code, None)
+                if change['new_text'] is not None:
+                    texts.add(change['new_text'])
+                    dictionary[code] = change['new_text']
+                    code_id = code_to_id(code)
+                    if code_id is not None:
+                        code_ids[code] = code_id
+            
+            # Same precedence as a full build (see build_reverse_index())
+            owners = {}
+            frequencies = {}
+            for code, text, frequency in self.db_manager.get_active_entries_for_texts(texts):
+                frequencies[code] = frequency
+                current = owners.get(text)
+                if current is None or code_rank(code, frequencies) < code_rank(current, frequencies):
+                    owners[text] = code
+            
+            reverse_dictionary = state.reverse_dictionary.copy()
+            for text in texts:
+                if text in owners:
+                    reverse_dictionary[text] = owners[text]
+                else:
+                    reverse_dictionary.pop(text, None)
+            
+            # and, as in phrase_entries(), a trie key goes to the best code_rank()
+            # of the texts normalizing to it, even texts the change did not touch.
+            # Only the touched keys' text sets are replaced; the others are shared.
+            keys = (state.phrase_keys.copy() if state.phrase_keys is not None
+                    else phrase_keys(state.reverse_dictionary))
+            groups = {}
+            for text in texts:
+                key = normalize_phrase(text)
+                if not key:
+                    continue
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = set(keys.get(key, ()))
+                if text in reverse_dictionary:
+                    group.add(text)
+                else:
+                    group.discard(text)
+            
+            others = set()
+            for key, group in groups.items():
+                if group:
+                    keys[key] = group
+                    others |= group
+                else:
+                    keys.pop(key, None)
+            others -= texts
+            if others:
+                for code, text, frequency in self.db_manager.get_active_entries_for_texts(others):
+                    frequencies[code] = frequency
+            
+            phrase_changes = {}
+            for key, group in groups.items():
+                phrase_changes[key] = (key, min((reverse_dictionary[text] for text in group),
+                                                key=lambda code: code_rank(code, frequencies))) if group else None
+            
+            self._state = CodecState(None, dictionary, reverse_dictionary,
+                                     state.phrase_matcher.with_changes(phrase_changes), code_ids,
+                                     sentence_memo=True, deltas=state.deltas + len(changes),
+                                     phrase_keys=keys)
\ No newline at end of file
@@ -3,38 +3,58 @@ BotSpeak Database Manager
 Handles database operations for dictionary entries and usage tracking
 """
 
-from models import DictionaryEntry, EncodingHistory, SystemStats, get_database_session
-from sqlalchemy.orm import sessionmaker
+from models import DictionaryEntry, EncodingHistory, SystemStats, get_database_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy import func, desc
 from datetime import datetime, timedelta
+from collections import Counter
 import time
 from functools import lru_cache
 import threading
+from codec_snapshot import dictionary_fingerprint
+from botspeak_dict import build_reverse_index
+
+def get_code_type(code):
+    """Code family stored in DictionaryEntry.code_type"""
+    if code.isdigit():
+        if 100 <= int(code) <= 999:
+            return "numeric"
+        elif 1 <= int(code) <= 9999:
+            return "4-digit"
+    elif len(code) == 3 and code[0].isalpha():
+        return "alphanumeric"
+    return "unknown"
 
 class DatabaseManager:
     """Manages database operations for BotSpeak"""
     
     def __init__(self):
-        self.session = None
         self._search_cache = {}
         self._cache_lock = threading.Lock()
         self._cache_size_limit = 100  # Limit cache to 100 search results
         self._connection_pool = None
         self._session_factory = None
+        self._session_lock = threading.Lock()
         self._in_memory_dict = None  # For fast searching
         self._dict_loaded = False
     
     def get_session(self):
-        """Get database session"""
-        if not self.session:
-            self.session = get_database_session()
-        return self.session
+        """Get the calling thread's database session
+        
+        The manager is shared by Flask request threads, the codec service
+        thread and background refreshes, and a Session is not thread-safe,
+        so each thread gets its own from one engine and connection pool.
+        """
+        if self._session_factory is None:
+            with self._session_lock:
+                if self._session_factory is None:
+                    self._session_factory = scoped_session(sessionmaker(bind=get_database_engine()))
+        return self._session_factory()
     
     def close_session(self):
-        """Close database session"""
-        if self.session:
-            self.session.close()
-            self.session = None
+        """Close the calling thread's session and return its connection to the pool"""
+        if self._session_factory is not None:
+            self._session_factory.remove()
     
     # Dictionary operations
     def get_dictionary_entries(self, active_only=True):
@@ -45,17 +65,145 @@ class DatabaseManager:
         if active_only:
             query = query.filter(DictionaryEntry.is_active == True)
         
-        return query.all()
+        # A stable order: Postgres returns updated rows (every encode bumps a
+        # frequency) in a different physical order
+        return query.order_by(DictionaryEntry.id).all()
     
     def get_dictionary_as_dict(self):
         """Get dictionary entries as a Python dict (code -> text)"""
         entries = self.get_dictionary_entries()
         return {entry.code: entry.text for entry in entries}
     
+    def get_dictionary_fingerprint(self):
+        """Checksum of the active entries and their tie ranking, to validate a codec snapshot"""
+        session = self.get_session()
+        rows = session.query(DictionaryEntry.code, DictionaryEntry.text, DictionaryEntry.frequency).filter(
+            DictionaryEntry.is_active == True
+        ).order_by(DictionaryEntry.id).all()
+        return dictionary_fingerprint([(code, text) for code, text, _ in rows],
+                                      {code: frequency or 0 for code, _, frequency in rows})
+    
+    def get_code_frequencies(self):
+        """Get usage frequency of every active code as a Python dict (code -> frequency)"""
+        entries = self.get_dictionary_entries()
+        return {entry.code: entry.frequency or 0 for entry in entries}
+    
+    def get_dictionary_with_frequencies(self):
+        """Get (code -> text, code -> frequency) for the active entries from one query"""
+        entries = self.get_dictionary_entries()
+        return ({entry.code: entry.text for entry in entries},
+                {entry.code: entry.frequency or 0 for entry in entries})
+    
     def get_reverse_dictionary_as_dict(self):
-        """Get reverse dictionary entries as a Python dict (text -> code)"""
+        """Get reverse dictionary entries as a Python dict (text -> code)
+        
+        A text stored under several codes maps to the shortest one, ties
+        going to the most frequently used (see build_reverse_index()).
+        """
         entries = self.get_dictionary_entries()
-        return {entry.text: entry.code for entry in entries}
+        reverse, _ = build_reverse_index({entry.code: entry.text for entry in entries},
+                                         {entry.code: entry.frequency for entry in entries})
+        return reverse
+    
+    def get_active_entries_for_texts(self, texts):
+        """Active (code, text, frequency) rows whose text equals one of texts ignoring case, in table order"""
+        session = self.get_session()
+        lowered = {text.lower() for text in texts}
+        return session.query(DictionaryEntry.code, DictionaryEntry.text, DictionaryEntry.frequency).filter(
+            DictionaryEntry.is_active == True,
+            func.lower(DictionaryEntry.text).in_(lowered)
+        ).order_by(DictionaryEntry.id).all()
+    
+    # Dictionary administration
+    def add_dictionary_entry(self, code, text):
+        """Add an entry (or reactivate a deactivated code) and return the change"""
+        code, text = self._validate_entry(code, text)
+        session = self.get_session()
+        try:
+            entry = session.query(DictionaryEntry).filter_by(code=code).first()
+            if entry is not None and entry.is_active:
+                raise ValueError(f"Code {code} already exists")
+            if entry is None:
+                entry = DictionaryEntry(code=code, text=text, code_type=get_code_type(code),
+                                        word_count=len(text.split()))
+                session.add(entry)
+            else:
+                entry.text = text
+                entry.word_count = len(text.split())
+                entry.is_active = True
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        
+        return self._dictionary_changed(code, None, text)
+    
+    def update_dictionary_entry(self, code, text):
+        """Change the text of an active entry and return the change"""
+        code, text = self._validate_entry(code, text)
+        session = self.get_session()
+        try:
+            entry = session.query(DictionaryEntry).filter_by(code=code, is_active=True).first()
+            if entry is None:
+                raise KeyError(code)
+            old_text = entry.text
+            entry.text = text
+            entry.word_count = len(text.split())
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        
+        return self._dictionary_changed(code, old_text, text)
+    
+    def deactivate_dictionary_entry(self, code):
+        """Deactivate an entry (rows are kept for history) and return the change"""
+        session = self.get_session()
+        try:
+            entry = session.query(DictionaryEntry).filter_by(code=code, is_active=True).first()
+            if entry is None:
+                raise KeyError(code)
+            entry.is_active = False
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        
+        return self._dictionary_changed(code, entry.text, None)
+    
+    def _validate_entry(self, code, text):
+        code = (code or '').strip()
+        text = ' '.join((text or '').split())
+        if not code or len(code) > 10 or not code.isalnum():
+            raise ValueError("Code must be 1-10 letters or digits")
+        if not text:
+            raise ValueError("Text must not be empty")
+        return code, text
+    
+    def _dictionary_changed(self, code, old_text, new_text):
+        """Patch the in-memory search index for one changed code
+        
+        Returns the change as {'code', 'old_text', 'new_text'} (old_text is
+        None for an added entry, new_text None for a deactivated one), the
+        form taken by the codecs' apply_dictionary_changes().
+        """
+        with self._cache_lock:
+            if self._dict_loaded:
+                if new_text is None:
+                    self._in_memory_dict.pop(code, None)
+                else:
+                    previous = self._in_memory_dict.get(code)
+                    self._in_memory_dict[code] = {
+                        'code': code,
+                        'text': new_text,
+                        'code_type': get_code_type(code),
+                        'frequency': previous['frequency'] if previous else 0,
+                        'word_count': len(new_text.split())
+                    }
+            # Any cached search may list the changed entry
+            self._search_cache.clear()
+        
+        return {'code': code, 'old_text': old_text, 'new_text': new_text}
     
     def _load_dictionary_in_memory(self):
         """Load dictionary into memory for fast searching"""
@@ -63,29 +211,31 @@ class DatabaseManager:
             return
         
         try:
-            # Load from static dictionary for speed
-            from botspeak_dict import botspeak_dict
-            self._in_memory_dict = []
-            
-            for code, text in botspeak_dict.items():
-                # Determine code type
-                code_type = "unknown"
-                if code.isdigit():
-                    if 100 <= int(code) <= 999:
-                        code_type = "numeric"
-                    elif 1 <= int(code) <= 9999:
-                        code_type = "4-digit"
-                elif len(code) == 3 and code[0].isalpha():
-                    code_type = "alphanumeric"
-                
-                self._in_memory_dict.append({
-                    'code': code,
-                    'text': text,
-                    'code_type': code_type,
-                    'frequency': 0,  # Default frequency
-                    'word_count': len(text.split())
-                })
+            # Keyed by code so admin changes patch single entries
+            in_memory_dict = {}
+            try:
+                # Active database entries, so entries added by the admin API are found
+                for entry in self.get_dictionary_entries():
+                    in_memory_dict[entry.code] = {
+                        'code': entry.code,
+                        'text': entry.text,
+                        'code_type': entry.code_type,
+                        'frequency': entry.frequency or 0,
+                        'word_count': entry.word_count or len(entry.text.split())
+                    }
+            except Exception as e:
+                print(f"Warning: Could not load dictionary from database, using static dictionary: {e}")
+                from botspeak_dict import botspeak_dict
+                for code, text in botspeak_dict.items():
+                    in_memory_dict[code] = {
+                        'code': code,
+                        'text': text,
+                        'code_type': get_code_type(code),
+                        'frequency': 0,  # Default frequency
+                        'word_count': len(text.split())
+                    }
             
+            self._in_memory_dict = in_memory_dict
             self._dict_loaded = True
             print(f"Loaded {len(self._in_memory_dict)} dictionary entries into memory")
             
@@ -122,12 +272,15 @@ class DatabaseManager:
             # Fallback to empty results if memory loading failed
             return []
         
+        # Admin changes may patch the index meanwhile; scan a stable copy
+        entries = list(self._in_memory_dict.values())
+        
         # Perform in-memory search - much faster than database queries
         results = []
         seen_codes = set()
         
         # Priority 1: Exact matches
-        for entry in self._in_memory_dict:
+        for entry in entries:
             if len(results) >= limit:
                 break
             if entry['code'].lower() == search_term or entry['text'].lower() == search_term:
@@ -137,7 +290,7 @@ class DatabaseManager:
         
         # Priority 2: Prefix matches (if we need more results)
         if len(results) < limit:
-            for entry in self._in_memory_dict:
+            for entry in entries:
                 if len(results) >= limit:
                     break
                 if entry['code'] not in seen_codes:
@@ -149,7 +302,7 @@ class DatabaseManager:
         
         # Priority 3: Contains matches (if we still need more)
         if len(results) < limit:
-            for entry in self._in_memory_dict:
+            for entry in entries:
                 if len(results) >= limit:
                     break
                 if entry['code'] not in seen_codes:
@@ -211,7 +364,7 @@ class DatabaseManager:
         import random
         
         # Get random entries from in-memory dictionary
-        random_entries = random.sample(self._in_memory_dict, min(count, len(self._in_memory_dict)))
+        random_entries = random.sample(list(self._in_memory_dict.values()), min(count, len(self._in_memory_dict)))
         
         # Cache the result
         with self._cache_lock:
@@ -275,14 +428,67 @@ class DatabaseManager:
             session.add(operation)
             session.commit()
             
-            # Update code frequencies
-            codes = output_text.split()
-            self.batch_increment_frequencies([code for code in codes if code in self.get_dictionary_as_dict()])
+            # Update code frequencies with one lookup of the known codes and one update
+            known_codes = self.get_dictionary_as_dict()
+            self.increment_code_frequencies(Counter(code for code in output_text.split() if code in known_codes))
             
         except Exception as e:
             session.rollback()
             print(f"Error logging encoding operation: {e}")
     
+    def log_encoding_operations(self, operations, ip_address=None, user_agent=None):
+        """Log a batch of encoding operations with a single insert and commit
+        
+        Each operation is a dict with input_text, output_text, compression_ratio
+        and processing_time keys, as accepted by log_encoding_operation().
+        """
+        session = self.get_session()
+        try:
+            session.add_all([
+                EncodingHistory(
+                    operation_type='encode',
+                    input_text=operation['input_text'],
+                    output_text=operation['output_text'],
+                    compression_ratio=str(operation['compression_ratio']),
+                    processing_time=str(operation['processing_time']),
+                    ip_address=ip_address,
+                    user_agent=user_agent
+                )
+                for operation in operations
+            ])
+            session.commit()
+            
+            # Update code frequencies for the whole batch at once
+            known_codes = self.get_dictionary_as_dict()
+            code_counts = Counter(
+                code
+                for operation in operations
+                for code in operation['output_text'].split()
+                if code in known_codes
+            )
+            self.increment_code_frequencies(code_counts)
+            
+        except Exception as e:
+            session.rollback()
+            print(f"Error logging batch encoding operations: {e}")
+    
+    def increment_code_frequencies(self, code_counts):
+        """Add per-code usage counts (code -> count) with one query and commit"""
+        if not code_counts:
+            return
+        
+        session = self.get_session()
+        try:
+            entries = session.query(DictionaryEntry).filter(
+                DictionaryEntry.code.in_(list(code_counts))
+            ).all()
+            for entry in entries:
+                entry.frequency += code_counts[entry.code]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error updating frequencies: {e}")
+    
     def log_decoding_operation(self, input_codes, output_text, recognition_rate,
                              processing_time, ip_address=None, user_agent=None):
         """Log a decoding operation"""
@@ -300,9 +506,9 @@ class DatabaseManager:
             session.add(operation)
             session.commit()
             
-            # Update code frequencies
-            codes = input_codes.split()
-            self.batch_increment_frequencies([code for code in codes if code in self.get_dictionary_as_dict()])
+            # Update code frequencies with one lookup of the known codes and one update
+            known_codes = self.get_dictionary_as_dict()
+            self.increment_code_frequencies(Counter(code for code in input_codes.split() if code in known_codes))
             
         except Exception as e:
             session.rollback()
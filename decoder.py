@@ -4,11 +4,30 @@ Converts BotSpeak codes back to human-readable text
 """
 
 import re
+import sys
 from botspeak_dict import botspeak_dict
+from result_cache import ResultCache
+from code_ids import build_id_table, decode_ids, decode_many_ids
+from wire_format import decode_binary
+from entropy_coder import get_entropy_table, decode_entropy, is_entropy_coded
+from compact_format import decode_compact
+from backref_table import BackrefTable
+from pattern_codecs import decode_pattern
+from suffix_table import decode_suffixed
+from bytes_codec import build_bytes_table, decode_bytes
+from codec_snapshot import load_snapshot, static_fingerprint
 
 class BotSpeakDecoder:
     def __init__(self):
         self.dictionary = botspeak_dict
+        snapshot = load_snapshot(static_fingerprint())
+        # String table indexed by code ID for decode_ids()
+        self.id_table = snapshot.id_table if snapshot is not None else build_id_table(self.dictionary)
+        self._entropy_table = None
+        # Bytes code -> text table for decode_bytes(), built on first use
+        self._bytes_table = None
+        # Cache of decoded output for repeated inputs
+        self.result_cache = ResultCache()
     
     def _is_valid_code(self, code):
         """Check if a code exists in the dictionary"""
@@ -41,9 +60,19 @@ class BotSpeakDecoder:
         if not encoded_text.strip():
             return ""
         
+        # Serve repeated inputs from the result cache
+        key = None
+        if self.result_cache.accepts(encoded_text):
+            key = ('codes', encoded_text)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+        
         # Split by sentence separators first
         sentences = encoded_text.split(' | ')
         decoded_sentences = []
+        # Rebuilt while reading, for text encoded with backrefs=True
+        backrefs = BackrefTable()
         
         for sentence in sentences:
             if not sentence.strip():
@@ -62,8 +91,16 @@ class BotSpeakDecoder:
                 if self._is_valid_code(normalized_code):
                     decoded_words.append(self.dictionary[normalized_code])
                 else:
+                    # Base code + suffix marker, from encode_text(suffixes=True)
+                    word = decode_suffixed(code, self.dictionary)
+                    if word is not None:
+                        decoded_words.append(word)
+                        continue
+                    
                     # Unknown code - keep as is (might be a word that wasn't encoded)
-                    decoded_words.append(code)
+                    code = backrefs.resolve(code)
+                    entity = decode_pattern(code)
+                    decoded_words.append(code if entity is None else entity)
             
             if decoded_words:
                 decoded_sentence = ' '.join(decoded_words)
@@ -76,6 +113,9 @@ class BotSpeakDecoder:
         if result and not result.endswith('.'):
             result += '.'
         
+        if key is not None:
+            self.result_cache.put(key, result)
+        
         return result
     
     def decode_with_validation(self, encoded_text):
@@ -89,9 +129,29 @@ class BotSpeakDecoder:
                 'recognized_codes': 0
             }
         
+        # Serve repeated inputs from the result cache
+        key = None
+        validation = None
+        if self.result_cache.accepts(encoded_text):
+            key = ('validate', encoded_text)
+            validation = self.result_cache.get(key)
+        
+        if validation is None:
+            validation = self._decode_validated(encoded_text)
+            if key is not None:
+                self.result_cache.put(key, validation, size=_validation_size(encoded_text, validation))
+        
+        # Callers may annotate the result, so never hand out the cached dict
+        result = dict(validation)
+        result['unknown_codes'] = list(validation['unknown_codes'])
+        return result
+    
+    def _decode_validated(self, encoded_text):
+        """Decode and collect validation details (uncached)"""
         # Split by sentence separators
         sentences = encoded_text.split(' | ')
         decoded_sentences = []
+        backrefs = BackrefTable()
         unknown_codes = []
         total_codes = 0
         recognized_codes = 0
@@ -114,6 +174,22 @@ class BotSpeakDecoder:
                     decoded_words.append(self.dictionary[normalized_code])
                     recognized_codes += 1
                 else:
+                    word = decode_suffixed(code, self.dictionary)
+                    if word is not None:
+                        # Inflected form of a dictionary word
+                        decoded_words.append(word)
+                        recognized_codes += 1
+                        continue
+                    
+                    # A back-reference stands for the word it repeats
+                    code = backrefs.resolve(code)
+                    entity = decode_pattern(code)
+                    if entity is not None:
+                        # Typed pattern code (number, timestamp, URL, ...)
+                        decoded_words.append(entity)
+                        recognized_codes += 1
+                        continue
+                    
                     # Unknown code
                     decoded_words.append(f"[{code}]")  # Mark unknown codes
                     unknown_codes.append(code)
@@ -178,6 +254,44 @@ class BotSpeakDecoder:
             results.append(result)
         
         return results
+    
+    def decode_compact(self, encoded_text):
+        """Decode compact-format output (see compact_format) back to human text"""
+        return decode_compact(self.dictionary, encoded_text)
+    
+    def decode_ids(self, ids, literals=()):
+        """Decode integer code IDs from encode_to_ids() back to human text"""
+        return decode_ids(self.id_table, ids, literals)
+    
+    def decode_many_ids(self, ids, offsets, literals=()):
+        """Decode an encode_many_to_ids() buffer back into a list of texts"""
+        return decode_many_ids(self.id_table, ids, offsets, literals)
+    
+    def decode_bytes(self, data, out=None):
+        """Decode UTF-8 bytes (or a memoryview) of codes without decoding ASCII input to str (see bytes_codec)
+        
+        The output is appended to out, a new bytearray by default, which is returned.
+        """
+        if self._bytes_table is None:
+            self._bytes_table = build_bytes_table(self, self.dictionary)
+        return decode_bytes(self, self._bytes_table, self.dictionary, data, out)
+    
+    def _get_entropy_table(self):
+        if self._entropy_table is None:
+            self._entropy_table = get_entropy_table(self.dictionary)
+        return self._entropy_table
+    
+    def decode_binary(self, data):
+        """Decode binary wire-format or entropy-coded data back to human text"""
+        if is_entropy_coded(data):
+            return decode_entropy(self.id_table, data, self._get_entropy_table)
+        return decode_binary(self.id_table, data)
+
+def _validation_size(encoded_text, validation):
+    """Approximate memory held by a cached decode_with_validation() result"""
+    return (sys.getsizeof(encoded_text) + sys.getsizeof(validation)
+            + sys.getsizeof(validation['decoded_text'])
+            + sum(sys.getsizeof(code) for code in validation['unknown_codes']))
 
 # Example usage and testing
 if __name__ == "__main__":
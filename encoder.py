@@ -3,127 +3,155 @@ BotSpeak Encoder Module
 Converts human text into BotSpeak compressed codes
 """
 
-import re
 import string
 from botspeak_dict import botspeak_dict, reverse_botspeak_dict
+from phrase_matcher import compile_phrase_matcher, GREEDY, validate_mode
+from text_lexer import iter_sentences, normalize_words, cache_key
+from result_cache import ResultCache
+from sentence_memo import SentenceMemo
+from stream_encoder import StreamEncoder, iter_encoded
+from code_ids import build_code_id_map, encode_ids, encode_many_ids
+from wire_format import encode_binary
+from entropy_coder import get_entropy_table, encode_entropy
+from compact_format import encode_compact
+from backref_table import encode_backrefs
+from pattern_codecs import iter_pattern_sentences
+from fuzzy_index import FuzzyIndex
+from suffix_table import SuffixTable
+from bytes_codec import encode_bytes
+from codec_snapshot import load_snapshot, static_fingerprint
 
 class BotSpeakEncoder:
     def __init__(self):
         self.dictionary = botspeak_dict
         self.reverse_dictionary = reverse_botspeak_dict
-        # Create phrase-to-code mapping for multi-word phrases
-        self.phrase_mapping = self._create_phrase_mapping()
-    
-    def _create_phrase_mapping(self):
-        """Create mapping for multi-word phrases (optimized for performance)"""
-        phrases = {}
-        for code, text in self.dictionary.items():
-            if ' ' in text and len(text.split()) <= 4:  # Limit to 4 words max
-                phrases[text.lower()] = code
-        
-        # Sort by length (longest first) for greedy matching
-        return dict(sorted(phrases.items(), key=lambda x: len(x[0]), reverse=True))
-    
-    def _preprocess_text(self, text):
-        """Clean and preprocess input text"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Replace common contractions
-        contractions = {
-            "don't": "do not",
-            "won't": "will not", 
-            "can't": "cannot",
-            "n't": " not",
-            "'re": " are",
-            "'ve": " have",
-            "'ll": " will",
-            "'d": " would",
-            "'m": " am",
-            "'s": " is"
-        }
+        snapshot = load_snapshot(static_fingerprint())
+        if snapshot is not None:
+            # Precompiled lookup structures (see codec_snapshot)
+            self.phrase_matcher = snapshot.phrase_matcher
+            self.code_ids = snapshot.code_ids
+        else:
+            # Compile the word trie used for phrase matching
+            self.phrase_matcher = self._build_phrase_matcher()
+            # Stable code -> integer ID mapping for encode_to_ids()
+            self.code_ids = build_code_id_map(self.dictionary)
+        # Huffman table for encode_binary(entropy=True), built on first use
+        self._entropy_table = None
+        # Misspelling index for encode_text(fuzzy=True), built on first use
+        self._fuzzy_index = None
+        # Inflected forms for encode_text(suffixes=True), built on first use
+        self._suffix_table = None
+        # Bytes-keyed phrase matcher for encode_bytes(), built on first use
+        self._bytes_matcher = None
+        # Cache of encoded output for repeated inputs
+        self.result_cache = ResultCache()
+        # Memo of encoded sentences, shared by every call on this encoder
+        self.sentence_memo = SentenceMemo()
+    
+    def _build_phrase_matcher(self):
+        """Compile the dictionary into a word trie for longest-match lookup"""
+        return compile_phrase_matcher(self.reverse_dictionary)
+    
+    def _tokenize_words(self, words, mode=GREEDY):
+        """Tokenize normalized words into words and phrases
         
-        for contraction, expansion in contractions.items():
-            text = text.replace(contraction, expansion)
-        
-        # Remove extra punctuation but keep sentence structure
-        text = re.sub(r'[^\w\s\.\!\?]', ' ', text)
-        
-        # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
-    
-    def _tokenize_sentence(self, sentence):
-        """Tokenize sentence into words and phrases (optimized)"""
-        tokens = []
-        words = sentence.split()
-        i = 0
-        
-        while i < len(words):
-            matched = False
-            
-            # Try to match multi-word phrases (limit to 4 words max for performance)
-            max_phrase_len = min(4, len(words) - i)
-            for phrase_len in range(max_phrase_len, 0, -1):
-                candidate_phrase = ' '.join(words[i:i + phrase_len])
-                
-                if candidate_phrase in self.phrase_mapping:
-                    tokens.append((candidate_phrase, self.phrase_mapping[candidate_phrase]))
-                    i += phrase_len
-                    matched = True
-                    break
-            
-            if not matched:
-                # Single word lookup
-                word = words[i]
-                if word in self.reverse_dictionary:
-                    tokens.append((word, self.reverse_dictionary[word]))
-                else:
-                    # Unknown word - keep as is
-                    tokens.append((word, word))
-                i += 1
-        
-        return tokens
-    
-    def encode_sentence(self, sentence):
+        mode is GREEDY (longest match first) or OPTIMAL (shortest output).
+        """
+        return self.phrase_matcher.tokenize(words, mode)
+    
+    def encode_sentence(self, sentence, mode=GREEDY):
         """Encode a single sentence to BotSpeak codes"""
+        validate_mode(mode)
         if not sentence.strip():
             return ""
         
-        # Preprocess the sentence
-        processed_sentence = self._preprocess_text(sentence)
-        
-        # Tokenize and encode
-        tokens = self._tokenize_sentence(processed_sentence)
+        # Normalize and tokenize the sentence
+        tokens = self._tokenize_words(normalize_words(sentence), mode)
         
         # Extract codes
         codes = [token[1] for token in tokens]
         
         return ' '.join(codes)
     
-    def encode_text(self, text):
-        """Encode full text (multiple sentences) to BotSpeak codes"""
+    def encode_text(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, corrections=None,
+                    suffixes=False):
+        """Encode full text (multiple sentences) to BotSpeak codes
+        
+        mode="optimal" picks the segmentation with the shortest output
+        instead of the longest phrase at each position. backrefs=True
+        replaces repeated unknown words with document-local references
+        (see backref_table). patterns=True keeps numbers, timestamps,
+        UUIDs, URLs and e-mail addresses whole as typed codes (see
+        pattern_codecs). The decoders always understand both.
+        fuzzy=True replaces misspelled unknown words with the closest
+        dictionary word (see fuzzy_index); if a corrections list is given,
+        each substitution is appended to it. suffixes=True writes inflected
+        forms of dictionary words as base code + suffix marker (see
+        suffix_table).
+        """
+        validate_mode(mode)
         if not text.strip():
             return ""
         
-        # Split into sentences
-        sentences = re.split(r'[.!?]+', text)
+        # Serve repeated inputs from the result cache
+        key = None
+        if self.result_cache.accepts(text):
+            # Pattern payloads keep their case and spacing, so key on the raw text
+            key = text if patterns else cache_key(text)
+            if mode != GREEDY:
+                key = (mode, key)
+            if backrefs or patterns or fuzzy or suffixes:
+                key = (backrefs, patterns, fuzzy, suffixes, key)
+            # Substitutions are only collected on a full encode
+            cached = self.result_cache.get(key) if corrections is None or not fuzzy else None
+            if cached is not None:
+                return cached
+        
+        # Lex the whole document once into per-sentence word lists
+        sentences = iter_pattern_sentences(text) if patterns else iter_sentences(text)
+        if fuzzy:
+            sentences = self._get_fuzzy_index().correct_sentences(sentences, corrections)
+        suffix_table = self._get_suffix_table() if suffixes else None
+        
+        if backrefs:
+            # One table spans the document, so sentences cannot come from the memo
+            encoded = encode_backrefs(self, sentences, mode, suffix_table)
+            if key is not None:
+                self.result_cache.put(key, encoded)
+            return encoded
+        
         encoded_sentences = []
         
-        for sentence in sentences:
-            if sentence.strip():
-                encoded = self.encode_sentence(sentence)
-                if encoded:
-                    encoded_sentences.append(encoded)
+        memo = self.sentence_memo
+        
+        for words in sentences:
+            # Repeated sentences are tokenized once per encoder
+            sentence_key = memo.key(words, mode)
+            if sentence_key is not None and suffix_table is not None:
+                sentence_key = ('suffixes', sentence_key)
+            encoded = memo.get(sentence_key) if sentence_key is not None else None
+            if encoded is None:
+                tokens = self._tokenize_words(words, mode)
+                if suffix_table is not None:
+                    tokens = suffix_table.encode(tokens)
+                encoded = ' '.join([token[1] for token in tokens])
+                if sentence_key is not None:
+                    memo.put(sentence_key, encoded)
+            encoded_sentences.append(encoded)
         
-        return ' | '.join(encoded_sentences)  # Use | to separate sentences
+        encoded = ' | '.join(encoded_sentences)  # Use | to separate sentences
+        
+        if key is not None:
+            self.result_cache.put(key, encoded)
+        
+        return encoded
     
     def get_compression_stats(self, original_text, encoded_text):
         """Calculate compression statistics"""
-        original_chars = len(original_text)
-        encoded_chars = len(encoded_text)
-        
+        return self.get_length_stats(len(original_text), len(encoded_text))
+    
+    def get_length_stats(self, original_chars, encoded_chars):
+        """Calculate compression statistics from character counts"""
         if original_chars == 0:
             return {
                 'original_length': 0,
@@ -145,16 +173,121 @@ class BotSpeakEncoder:
             'percentage_saved': round(percentage_saved, 2)
         }
     
-    def encode_with_stats(self, text):
-        """Encode text and return both encoded text and statistics"""
-        encoded = self.encode_text(text)
+    def get_batch_stats(self, results):
+        """Calculate aggregate compression statistics for encode_many() results"""
+        original_chars = sum(result['statistics']['original_length'] for result in results)
+        encoded_chars = sum(result['statistics']['encoded_length'] for result in results)
+        
+        stats = self.get_length_stats(original_chars, encoded_chars)
+        stats['total_texts'] = len(results)
+        return stats
+    
+    def encode_with_stats(self, text, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, suffixes=False):
+        """Encode text and return both encoded text and statistics
+        
+        With fuzzy=True the result also lists the spelling corrections made.
+        """
+        corrections = [] if fuzzy else None
+        encoded = self.encode_text(text, mode, backrefs, patterns, fuzzy, corrections, suffixes)
         stats = self.get_compression_stats(text, encoded)
         
-        return {
+        result = {
             'original_text': text,
             'encoded_text': encoded,
             'statistics': stats
         }
+        if fuzzy:
+            result['corrections'] = corrections
+        return result
+    
+    def encode_many(self, texts, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False, suffixes=False):
+        """Encode a batch of texts, returning one encode_with_stats() result per text"""
+        return [self.encode_with_stats(text, mode, backrefs, patterns, fuzzy, suffixes) for text in texts]
+    
+    def encode_compact(self, text, mode=GREEDY):
+        """Encode text to the separator-free compact format (see compact_format)"""
+        validate_mode(mode)
+        return encode_compact(self, text, mode)
+    
+    def encode_stream(self, chunks, stats=None):
+        """Encode an iterable of text chunks (e.g. a file object), yielding output incrementally
+        
+        Sentences and phrases may span chunk boundaries. If a stats dict is
+        given it is kept updated with running compression statistics.
+        """
+        return iter_encoded(self, chunks, stats)
+    
+    def open_stream(self):
+        """Return a StreamEncoder to push text into as it arrives (e.g. model output tokens)
+        
+        feed() returns the codes each piece completes; finish() flushes the
+        rest. The joined output equals encode_text() of the joined input.
+        """
+        return StreamEncoder(self)
+    
+    def encode_to_ids(self, text, mode=GREEDY, as_numpy=False):
+        """Encode text to integer code IDs for ML and storage pipelines
+        
+        Returns {'ids': array('H') (or a NumPy uint16 array with as_numpy=True),
+        'literals': [unknown words]}; see code_ids for the ID layout.
+        """
+        validate_mode(mode)
+        return encode_ids(self, text, mode, as_numpy)
+    
+    def encode_many_to_ids(self, texts, mode=GREEDY, as_numpy=False):
+        """Encode a batch of texts to one flat ID buffer with offsets and a shared literal table"""
+        validate_mode(mode)
+        return encode_many_ids(self, texts, mode, as_numpy)
+    
+    def _get_entropy_table(self):
+        if self._entropy_table is None:
+            self._entropy_table = get_entropy_table(self.dictionary)
+        return self._entropy_table
+    
+    def _get_fuzzy_index(self):
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyIndex(self.phrase_matcher)
+        return self._fuzzy_index
+    
+    def get_fuzzy_index_info(self):
+        """Size, memory and build time of the fuzzy index"""
+        return self._get_fuzzy_index().get_info()
+    
+    def _get_suffix_table(self):
+        if self._suffix_table is None:
+            self._suffix_table = SuffixTable(self.dictionary)
+        return self._suffix_table
+    
+    def encode_bytes(self, data, mode=GREEDY, out=None):
+        """Encode UTF-8 bytes (or a memoryview) without decoding ASCII input to str (see bytes_codec)
+        
+        The output is appended to out, a new bytearray by default, which is returned.
+        """
+        validate_mode(mode)
+        if self._bytes_matcher is None:
+            self._bytes_matcher = self.phrase_matcher.to_bytes()
+        return encode_bytes(self, self._bytes_matcher, data, mode, out)
+    
+    def encode_binary(self, text, mode=GREEDY, entropy=False):
+        """Encode text to the compact binary wire format (see wire_format)
+        
+        entropy=True adds a Huffman stage trained on code frequencies
+        (see entropy_coder); decode_binary() accepts either form.
+        """
+        validate_mode(mode)
+        if entropy:
+            return encode_entropy(self, self._get_entropy_table(), text, mode)
+        return encode_binary(self, text, mode)
+    
+    def encode_binary_with_stats(self, text, mode=GREEDY, entropy=False):
+        """Encode text to the binary wire format and return it with byte-size statistics"""
+        data = self.encode_binary(text, mode, entropy)
+        
+        return {
+            'original_text': text,
+            'encoded_data': data,
+            'statistics': self.get_length_stats(len(text.encode('utf-8')), len(data))
+        }
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+"""
+BotSpeak Entropy Coder Module
+Optional Huffman stage over the code stream, trained on code frequencies
+
+Payload layout (version 1):
+
+    b'BH' + version byte + 4-byte table ID, then a Huffman bitstream of symbols:
+        0               sentence break
+        1               literal start/end; the literal's UTF-8 bytes lie between
+        2               end of stream
+        1000 - 14999    code IDs as assigned by code_ids
+        16384 + b       byte b of a literal
+
+The table ID is a checksum of the code table, so a payload can only be
+decoded with the exact table that produced it. Trained tables change as
+usage counts grow, so every table is also saved under its ID (the same
+symbol/length signature the ID is computed from); any worker process, or
+the same process after a restart, can then decode older payloads.
+"""
+
+import heapq
+import os
+import threading
+import zlib
+from pathlib import Path
+
+from code_ids import SENTENCE_BREAK_ID, LITERAL_BASE, code_to_id, join_decoded
+from phrase_matcher import is_literal
+from text_lexer import iter_sentences
+
+MAGIC = b'BH'
+VERSION = 1
+HEADER_SIZE = 7
+
+# Longest Huffman code; bounds the decoder lookup table to 2**MAX_CODE_BITS entries
+MAX_CODE_BITS = 16
+
+_ESCAPE = 1
+_END = 2
+_BYTE_BASE = LITERAL_BASE
+
+# Tables used in this process, by table ID, so decoders find encoders' tables
+MAX_TABLES = 8
+_tables = {}
+_tables_lock = threading.Lock()
+
+# Saved tables, one <table ID>.bht file each, next to the modules so workers
+# find them whatever their working directory. An empty BOTSPEAK_ENTROPY_TABLES
+# disables saving. The oldest files beyond MAX_STORED_TABLES are removed.
+DEFAULT_TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'entropy_tables')
+MAX_STORED_TABLES = 256
+_SIGNATURE_ENTRY_SIZE = 3
+
+
+def _code_weight(code, frequency):
+    """Prior from the code family (numeric codes hold the commonest words) plus usage"""
+    if code.isdigit() and len(code) == 3:
+        prior = 8
+    elif code.isdigit():
+        prior = 1
+    else:
+        prior = 2
+    weight = prior + frequency
+    # Round to a power of two so small frequency changes keep the same table
+    return 1 << (weight.bit_length() - 1)
+
+
+def build_weights(dictionary, frequencies=None):
+    """Symbol weights for a dictionary (code -> text) and optional code usage counts"""
+    frequencies = frequencies or {}
+    weights = {}
+    for code in dictionary:
+        code_id = code_to_id(code)
+        if code_id is not None:
+            weights[code_id] = _code_weight(code, frequencies.get(code, 0))
+
+    total = sum(weights.values()) or 1
+    # Roughly one break per 8 tokens and one literal per 16
+    weights[SENTENCE_BREAK_ID] = max(total // 8, 1)
+    weights[_ESCAPE] = escape = max(total // 16, 1)
+    weights[_END] = 1
+    for byte in range(256):
+        if 97 <= byte <= 122:
+            weight = escape * 6 // 26
+        elif 48 <= byte <= 57 or byte == 39:
+            weight = escape // 16
+        else:
+            weight = 0
+        weights[_BYTE_BASE + byte] = max(weight, 1)
+    return weights
+
+
+def _code_lengths(weights):
+    """Huffman code length per symbol, limited to MAX_CODE_BITS"""
+    while True:
+        heap = [(weight, i, (symbol,)) for i, (symbol, weight) in enumerate(weights.items())]
+        heapq.heapify(heap)
+        lengths = dict.fromkeys(weights, 0)
+        counter = len(heap)
+
+        while len(heap) > 1:
+            weight_a, _, symbols_a = heapq.heappop(heap)
+            weight_b, _, symbols_b = heapq.heappop(heap)
+            merged = symbols_a + symbols_b
+            for symbol in merged:
+                lengths[symbol] += 1
+            heapq.heappush(heap, (weight_a + weight_b, counter, merged))
+            counter += 1
+
+        if max(lengths.values()) <= MAX_CODE_BITS:
+            return lengths
+        # Flatten the distribution and retry until the deepest code fits
+        weights = {symbol: (weight >> 1) | 1 for symbol, weight in weights.items()}
+
+
+class EntropyTable:
+    """Canonical Huffman code over BotSpeak symbols"""
+
+    def __init__(self, lengths):
+        """Build the canonical code from each symbol's code length"""
+        self.codes = {}
+        code = 0
+        previous_length = 0
+        for symbol, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+            code <<= length - previous_length
+            self.codes[symbol] = (code, length)
+            code += 1
+            previous_length = length
+
+        self.signature = b''.join(
+            symbol.to_bytes(2, 'big') + bytes([length])
+            for symbol, (_, length) in sorted(self.codes.items())
+        )
+        self.table_id = zlib.crc32(self.signature)
+        self.header = MAGIC + bytes([VERSION]) + self.table_id.to_bytes(4, 'big')
+        self._decode_table = None
+
+    @classmethod
+    def from_weights(cls, weights):
+        return cls(_code_lengths(weights))
+
+    @classmethod
+    def from_signature(cls, signature):
+        """Rebuild a saved table; None if the bytes are not a valid signature"""
+        if not signature or len(signature) % _SIGNATURE_ENTRY_SIZE:
+            return None
+        lengths = {}
+        for offset in range(0, len(signature), _SIGNATURE_ENTRY_SIZE):
+            length = signature[offset + 2]
+            if not 1 <= length <= MAX_CODE_BITS:
+                return None
+            lengths[int.from_bytes(signature[offset:offset + 2], 'big')] = length
+        return cls(lengths)
+
+    @property
+    def decode_table(self):
+        """(symbol, length) for every MAX_CODE_BITS-bit prefix, built on first use"""
+        if self._decode_table is None:
+            table = [None] * (1 << MAX_CODE_BITS)
+            for symbol, (code, length) in self.codes.items():
+                shift = MAX_CODE_BITS - length
+                start = code << shift
+                table[start:start + (1 << shift)] = [(symbol, length)] * (1 << shift)
+            self._decode_table = table
+        return self._decode_table
+
+
+def table_dir():
+    return os.getenv('BOTSPEAK_ENTROPY_TABLES', DEFAULT_TABLE_DIR)
+
+
+def _table_path(directory, table_id):
+    return Path(directory) / f"{table_id:08x}.bht"
+
+
+def _register(table):
+    with _tables_lock:
+        table = _tables.setdefault(table.table_id, table)
+        while len(_tables) > MAX_TABLES:
+            _tables.pop(next(iter(_tables)))
+        return table
+
+
+def _save_table(table):
+    directory = table_dir()
+    if not directory:
+        return
+    path = _table_path(directory, table.table_id)
+    if path.exists():
+        return
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_bytes(table.signature)
+        # Atomic replace, so other workers never read a half-written table
+        os.replace(temp_path, path)
+
+        stored = sorted(path.parent.glob('*.bht'), key=lambda p: p.stat().st_mtime)
+        for old_path in stored[:-MAX_STORED_TABLES]:
+            old_path.unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Warning: Could not save entropy table {path}: {e}")
+
+
+def _load_table(table_id):
+    directory = table_dir()
+    if not directory:
+        return None
+    try:
+        signature = _table_path(directory, table_id).read_bytes()
+    except OSError:
+        return None
+    # The ID is the signature's checksum, so this also rejects corrupt files
+    if zlib.crc32(signature) != table_id:
+        return None
+    return EntropyTable.from_signature(signature)
+
+
+def get_entropy_table(dictionary, frequencies=None):
+    """Build (or reuse) the table for a dictionary and save it for decoding"""
+    table = EntropyTable.from_weights(build_weights(dictionary, frequencies))
+    with _tables_lock:
+        known = table.table_id in _tables
+    if not known:
+        _save_table(table)
+    return _register(table)
+
+
+def lookup_table(table_id):
+    """Table with this ID from this process or from the saved tables, else None"""
+    table = _tables.get(table_id)
+    if table is None:
+        table = _load_table(table_id)
+        if table is not None:
+            table = _register(table)
+    return table
+
+
+def is_entropy_coded(data):
+    return data[:2] == MAGIC
+
+
+def _iter_symbols(encoder, text, mode, encoded_sentences):
+    code_ids = encoder.code_ids
+    first = True
+
+    for words in iter_sentences(text):
+        if not first:
+            yield SENTENCE_BREAK_ID
+        first = False
+
+        tokens = encoder._tokenize_words(words, mode)
+        for token in tokens:
+            code_id = None if is_literal(token) else code_ids.get(token[1])
+            if code_id is None:
+                yield _ESCAPE
+                for byte in token[1].encode('utf-8'):
+                    yield _BYTE_BASE + byte
+                yield _ESCAPE
+            else:
+                yield code_id
+
+        if encoded_sentences is not None:
+            encoded_sentences.append(' '.join([token[1] for token in tokens]))
+
+    yield _END
+
+
+def encode_entropy(encoder, table, text, mode, encoded_sentences=None):
+    """Encode text to an entropy-coded payload using table
+
+    encoded_sentences collects the text-format sentences, as in
+    wire_format.encode_binary().
+    """
+    codes = table.codes
+    out = bytearray(table.header)
+    acc = 0
+    bits = 0
+
+    for symbol in _iter_symbols(encoder, text, mode, encoded_sentences):
+        code, length = codes[symbol]
+        acc = (acc << length) | code
+        bits += length
+        while bits >= 8:
+            bits -= 8
+            out.append((acc >> bits) & 0xFF)
+        acc &= (1 << bits) - 1
+
+    if bits:
+        out.append((acc << (8 - bits)) & 0xFF)
+    return bytes(out)
+
+
+def decode_entropy(id_table, data, fallback=None):
+    """Decode an entropy-coded payload to text, formatted like decode_codes()
+
+    The table is found by the header's table ID among tables built in this
+    process or saved by any process, else fallback() is called to build one. Raises ValueError for
+    invalid payloads or an unknown table.
+    """
+    if len(data) < HEADER_SIZE or data[:2] != MAGIC:
+        raise ValueError("Not entropy-coded BotSpeak data (bad header)")
+    if data[2] != VERSION:
+        raise ValueError(f"Unsupported entropy coding version; expected {VERSION}")
+
+    table_id = int.from_bytes(data[3:HEADER_SIZE], 'big')
+    table = lookup_table(table_id)
+    if table is None and fallback is not None:
+        table = fallback()
+    if table is None or table.table_id != table_id:
+        raise ValueError(f"Unknown entropy table {table_id:08x}; the dictionary has changed")
+
+    decode_table = table.decode_table
+    mask = (1 << MAX_CODE_BITS) - 1
+    parts = []
+    literal = None
+    acc = 0
+    bits = 0
+    pos = HEADER_SIZE
+    end = len(data)
+
+    while True:
+        while bits < MAX_CODE_BITS:
+            # Past the end, pad with zeros; a valid stream ends with _END first
+            acc = (acc << 8) | (data[pos] if pos < end else 0)
+            bits += 8
+            pos += 1
+        if pos > end + 2 + MAX_CODE_BITS // 8:
+            raise ValueError("Truncated entropy-coded data")
+
+        symbol, length = decode_table[(acc >> (bits - MAX_CODE_BITS)) & mask]
+        bits -= length
+        acc &= (1 << bits) - 1
+
+        if symbol == _END:
+            break
+        if literal is not None:
+            if symbol == _ESCAPE:
+                parts.append(literal.decode('utf-8', errors='replace'))
+                literal = None
+            elif symbol >= _BYTE_BASE:
+                literal.append(symbol - _BYTE_BASE)
+            else:
+                raise ValueError("Invalid symbol inside literal")
+        elif symbol == _ESCAPE:
+            literal = bytearray()
+        elif symbol < _BYTE_BASE:
+            parts.append(id_table[symbol])
+        else:
+            raise ValueError("Literal byte outside literal")
+
+    return join_decoded(parts)
@@ -0,0 +1,215 @@
+"""
+BotSpeak Fuzzy Index Module
+Misspelling-tolerant word lookup over a precomputed symmetric-delete index
+
+Every dictionary word is indexed under itself and each string obtained by
+deleting up to max_distance of its characters (SymSpell). A misspelled word
+is looked up by probing the index with its own deletions, so a lookup is a
+few dozen hash probes plus an edit-distance check of the candidates found,
+never a scan of the vocabulary:
+
+    "teh" -> "the", "thnak you" -> "thank you", "meetign" -> "meeting"
+
+Words that start a phrase are indexed too, so a typo inside a phrase can
+still complete it. Every word of a phrase, the COMMON_WORDS below and
+inflected forms of dictionary words ("days", "needed") are real words and
+never corrected, since the dictionary alone cannot tell them from typos.
+Candidates at the same distance are ranked by code, which
+the dictionary assigns roughly in order of word frequency. Words shorter than
+3 characters are never corrected, and words of 3 to 5 characters at most by
+one edit, so short words are not rewritten wholesale.
+"""
+
+import sys
+import time
+
+MAX_DISTANCE = 1
+MIN_WORD_LENGTH = 3
+# Per-index memo of lookups; cleared when full
+MAX_LOOKUPS = 1 << 16
+
+# Frequent English words the dictionary lacks: function words and irregular
+# verb forms that are one edit away from a dictionary word ("any" / "and")
+COMMON_WORDS = frozenset("""
+    people only its also even any every each own both another something
+    anything someone anyone everyone nobody still already ever yet though
+    although whether either neither among between through around across
+    along behind men women children others ones
+    made went gone got came took seen knew told found gave felt become
+    became began shown brought wrote sat stood lost paid met set led
+    understood spoke spent grew won bought fell cut sold sent built
+""".split())
+# Endings that make an inflected form of a dictionary word, not a typo of it
+INFLECTIONS = ('s', 'es', 'd', 'ed', 'ing', 'er', 'ly')
+
+_MISSING = object()
+# Rank of a candidate word with no code of its own, after every coded word
+_NO_CODE = (1, 0, '')
+
+
+def _deletes(word, distance):
+    """word and every string made by deleting up to distance of its characters"""
+    found = {word}
+    level = [word]
+    for _ in range(distance):
+        next_level = []
+        for text in level:
+            for i in range(len(text)):
+                delete = text[:i] + text[i + 1:]
+                if delete not in found:
+                    found.add(delete)
+                    next_level.append(delete)
+        level = next_level
+    return found
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent transpositions count as one), or None above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return None
+
+    # A shared prefix or suffix never changes the distance, and candidates
+    # usually differ from the word in one short stretch only
+    start = 0
+    shortest = min(len(a), len(b))
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end_a = len(a)
+    end_b = len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a = a[start:end_a]
+    b = b[start:end_b]
+    if not a or not b:
+        return len(a) + len(b)
+
+    previous = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, row = previous, row, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            value = min(previous[j] + 1, row[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            row[j] = value
+        if min(row) > limit:
+            return None
+
+    return row[-1] if row[-1] <= limit else None
+
+
+class FuzzyIndex:
+    """Symmetric-delete index of the words a phrase matcher can start a match with"""
+
+    def __init__(self, matcher, max_distance=MAX_DISTANCE, known_words=COMMON_WORDS):
+        start = time.perf_counter()
+        self.max_distance = max_distance
+        # Real words that are never corrected
+        self._known = matcher.vocabulary()
+        self._known.update(known_words)
+        self._ranks = {}
+        # Deletion -> word, or tuple of words where several share it
+        self._deletes = {}
+
+        for word, code in matcher.iter_first_words():
+            if len(word) < MIN_WORD_LENGTH or not word.isalpha():
+                continue
+            self._ranks[word] = _NO_CODE if code is None else (0, len(code), code)
+            for delete in _deletes(word, max_distance):
+                words = self._deletes.get(delete)
+                if words is None:
+                    self._deletes[delete] = word
+                elif isinstance(words, tuple):
+                    self._deletes[delete] = words + (word,)
+                else:
+                    self._deletes[delete] = (words, word)
+
+        self._lookups = {}
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def lookup(self, word):
+        """(dictionary word, distance) closest to a misspelled word, or None
+
+        Ties go to the word with the shorter, then lower code.
+        """
+        match = self._lookups.get(word, _MISSING)
+        if match is not _MISSING:
+            return match
+
+        limit = min(self.max_distance, len(word) // MIN_WORD_LENGTH)
+        best = None
+        if limit:
+            candidates = set()
+            index = self._deletes
+            for delete in _deletes(word, limit):
+                words = index.get(delete)
+                if words is None:
+                    continue
+                if isinstance(words, tuple):
+                    candidates.update(words)
+                else:
+                    candidates.add(words)
+
+            ranks = self._ranks
+            for candidate in candidates:
+                if word.startswith(candidate) and word[len(candidate):] in INFLECTIONS:
+                    # "days" is day + s, not a misspelling of it
+                    best = None
+                    break
+                distance = edit_distance(word, candidate, limit)
+                if distance is None:
+                    continue
+                rank = (distance, ranks[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+
+        match = (best[2], best[0]) if best is not None else None
+        if len(self._lookups) >= MAX_LOOKUPS:
+            self._lookups.clear()
+        self._lookups[word] = match
+        return match
+
+    def correct(self, words, corrections=None):
+        """Return words with unknown, misspelled words replaced by their dictionary word
+
+        If a corrections list is given, each substitution is appended to it
+        as {'original', 'corrected', 'distance'}. words itself is not modified.
+        """
+        corrected = None
+        known = self._known
+
+        for i, word in enumerate(words):
+            if word in known or not word.isalpha():
+                continue
+            match = self.lookup(word)
+            if match is None:
+                continue
+            if corrected is None:
+                corrected = list(words)
+            corrected[i] = match[0]
+            if corrections is not None:
+                corrections.append({'original': word, 'corrected': match[0], 'distance': match[1]})
+
+        return words if corrected is None else corrected
+
+    def correct_sentences(self, sentences, corrections=None):
+        """correct() applied to each word list of an iter_sentences()-style iterable"""
+        for words in sentences:
+            yield self.correct(words, corrections)
+
+    def get_info(self):
+        """Size, approximate memory and build time of the index"""
+        memory = sys.getsizeof(self._deletes) + sys.getsizeof(self._ranks) + sys.getsizeof(self._known)
+        # Word strings are shared with the matcher; deletions and tuples are the index's own
+        memory += sum(sys.getsizeof(delete) for delete, words in self._deletes.items() if delete is not words)
+        memory += sum(sys.getsizeof(words) for words in self._deletes.values() if isinstance(words, tuple))
+        memory += sum(sys.getsizeof(rank) for rank in self._ranks.values() if rank is not _NO_CODE)
+        return {
+            'words': len(self._ranks),
+            'deletes': len(self._deletes),
+            'max_distance': self.max_distance,
+            'memory_bytes': memory,
+            'build_ms': round(self.build_ms, 2)
+        }
@@ -3,7 +3,7 @@ BotSpeak Database Models
 SQLAlchemy models for storing dictionary entries and user interactions
 """
 
-from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, create_engine
+from sqlalchemy import Column, String, Integer, DateTime, Text, Boolean, Index, create_engine, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -24,6 +24,9 @@ class DictionaryEntry(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    
+    # Dictionary deltas look up the entries of the changed texts ignoring case
+    __table_args__ = (Index('ix_dictionary_entries_text_lower', func.lower(text)),)
 
 class EncodingHistory(Base):
     """Model for storing encoding/decoding operations"""
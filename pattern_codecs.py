@@ -0,0 +1,319 @@
+"""
+BotSpeak Pattern Codec Module
+Typed codes for numbers, timestamps, UUIDs, URLs and e-mail addresses
+
+The word lexer tears such entities apart (and drops their punctuation; the
+dots of a URL even end sentences). With patterns enabled, one compiled
+scanner finds them ahead of tokenization and each becomes a single token,
+PATTERN_PREFIX + codec letter + packed payload, which the decoders expand
+back to the original text:
+
+    2024-01-15T10:30:00Z                    ^ttbta560Z
+    2024-01-15                              ^dfu50
+    550e8400-e29b-41d4-a716-446655440000    ^uVQ6EAOKbQdSnFkRmVUQAAA
+    https://www.example.com/docs            ^hSexample.com/docs
+    192.168.0.1                             ^i1hge0w1
+    1234567890                              ^nkf12oi
+
+More entity classes can be added with register_pattern_codec().
+"""
+
+import base64
+import re
+from datetime import date, datetime
+
+from text_lexer import iter_sentences, iter_tokens, SENTENCE_BREAK
+
+PATTERN_PREFIX = '^'
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+_DECIMAL_DIGITS = _DIGITS[:10]
+_BASE36_RE = re.compile(r'[0-9a-z]+')
+
+
+class PatternCodec:
+    """One entity class: a regular expression and its payload encoder/decoder
+
+    encode(text) returns the payload for a match, or None to leave the text
+    to the word lexer; decode(payload) must give the matched text back
+    exactly. Matches never start right after a word character. hint lists
+    characters of which every match contains at least one, so texts with
+    none of them skip the pattern.
+    """
+
+    def __init__(self, name, letter, pattern, encode, decode, hint=None):
+        self.name = name
+        self.letter = letter
+        self.pattern = pattern
+        self.encode = encode
+        self.decode = decode
+        self.hint = hint
+
+
+_codecs = {}
+# Compiled scanners by the letters of the codecs they cover
+_scanners = {}
+
+
+def register_pattern_codec(codec):
+    """Add an entity class; earlier registrations win where patterns overlap"""
+    if len(codec.letter) != 1 or codec.letter in _codecs:
+        raise ValueError(f"Pattern codec letter {codec.letter!r} is invalid or taken")
+    _codecs[codec.letter] = codec
+    _scanners.clear()
+
+
+def _get_scanner(text):
+    """One alternation over the patterns that may occur in text, or None if none can"""
+    present = {}
+    letters = ''.join(
+        letter for letter, codec in _codecs.items()
+        if codec.hint is None or present.setdefault(
+            codec.hint, any(char in text for char in codec.hint))
+    )
+    if not letters:
+        return None
+
+    scanner = _scanners.get(letters)
+    if scanner is None:
+        # The shared left boundary lets positions inside words fail at once
+        scanner = _scanners[letters] = re.compile(r'(?<!\w)(?:' + '|'.join(
+            f'(?P<_{letter}>{_codecs[letter].pattern})' for letter in letters
+        ) + ')')
+    return scanner
+
+
+def iter_pattern_sentences(text):
+    """iter_sentences() with pattern entities kept whole as typed tokens"""
+    scanner = _get_scanner(text)
+    if scanner is None:
+        yield from iter_sentences(text)
+        return
+
+    words = []
+    position = 0
+
+    for match in scanner.finditer(text):
+        codec = _codecs[match.lastgroup[1]]
+        payload = codec.encode(match.group())
+        if payload is None:
+            continue
+
+        for token in iter_tokens(text[position:match.start()]):
+            if token is SENTENCE_BREAK:
+                if words:
+                    yield words
+                    words = []
+            else:
+                words.append(token)
+        words.append(PATTERN_PREFIX + codec.letter + payload)
+        position = match.end()
+
+    for token in iter_tokens(text[position:]):
+        if token is SENTENCE_BREAK:
+            if words:
+                yield words
+                words = []
+        else:
+            words.append(token)
+
+    if words:
+        yield words
+
+
+def decode_pattern(token):
+    """Original text of a typed pattern token, or None if token is not a valid one"""
+    if len(token) < 3 or token[0] != PATTERN_PREFIX:
+        return None
+    codec = _codecs.get(token[1])
+    if codec is None:
+        return None
+    try:
+        return codec.decode(token[2:])
+    except (ValueError, OverflowError):
+        return None
+
+
+def _to_base36(value):
+    digits = []
+    while True:
+        value, remainder = divmod(value, 36)
+        digits.append(_DIGITS[remainder])
+        if not value:
+            return ''.join(reversed(digits))
+
+
+def _from_base36(payload):
+    if not _BASE36_RE.fullmatch(payload):
+        raise ValueError(f"Invalid base-36 payload {payload!r}")
+    return int(payload, 36)
+
+
+def _split_base36(payload):
+    """Leading base-36 number of payload and the rest"""
+    match = _BASE36_RE.match(payload)
+    if match is None:
+        raise ValueError(f"Invalid payload {payload!r}")
+    return int(match.group(), 36), payload[match.end():]
+
+
+# URLs: scheme (and www.) folded into one flag character
+_URL_PREFIXES = (('S', 'https://www.'), ('P', 'http://www.'), ('s', 'https://'), ('p', 'http://'))
+
+
+def _encode_url(text):
+    for flag, prefix in _URL_PREFIXES:
+        if text.startswith(prefix):
+            return flag + text[len(prefix):]
+    return None
+
+
+def _decode_url(payload):
+    for flag, prefix in _URL_PREFIXES:
+        if payload[0] == flag:
+            return prefix + payload[1:]
+    raise ValueError(f"Unknown URL scheme flag {payload[0]!r}")
+
+
+# E-mail addresses are kept verbatim; the win is keeping them whole
+def _encode_email(text):
+    return text
+
+
+def _decode_email(payload):
+    if '@' not in payload:
+        raise ValueError("Not an e-mail address")
+    return payload
+
+
+# UUIDs: 128 bits as 22 base64url characters; a trailing '+' marks upper-case hex
+def _encode_uuid(text):
+    if text == text.lower():
+        suffix = ''
+    elif text == text.upper():
+        suffix = '+'
+    else:
+        return None
+    raw = bytes.fromhex(text.replace('-', ''))
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii') + suffix
+
+
+def _decode_uuid(payload):
+    upper = payload.endswith('+')
+    raw = base64.urlsafe_b64decode(payload.rstrip('+') + '==')
+    if len(raw) != 16:
+        raise ValueError("UUID payload is not 128 bits")
+    hex_text = raw.hex()
+    text = f"{hex_text[:8]}-{hex_text[8:12]}-{hex_text[12:16]}-{hex_text[16:20]}-{hex_text[20:]}"
+    return text.upper() if upper else text
+
+
+# ISO timestamps: seconds since 0001-01-01 in base 36, then fraction and zone
+# verbatim; a leading '_' marks a space instead of 'T' between date and time
+def _encode_timestamp(text):
+    try:
+        moment = datetime(int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                          int(text[11:13]), int(text[14:16]), int(text[17:19]))
+    except ValueError:
+        return None
+    seconds = (moment.toordinal() * 86400 + moment.hour * 3600
+               + moment.minute * 60 + moment.second)
+    payload = _to_base36(seconds) + text[19:]
+    return '_' + payload if text[10] == ' ' else payload
+
+
+def _decode_timestamp(payload):
+    separator = 'T'
+    if payload.startswith('_'):
+        separator = ' '
+        payload = payload[1:]
+    seconds, rest = _split_base36(payload)
+    days, seconds = divmod(seconds, 86400)
+    day = date.fromordinal(days)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return (f"{day.year:04d}-{day.month:02d}-{day.day:02d}{separator}"
+            f"{hours:02d}:{minutes:02d}:{seconds:02d}{rest}")
+
+
+# ISO dates: day ordinal in base 36
+def _encode_date(text):
+    try:
+        return _to_base36(date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal())
+    except ValueError:
+        return None
+
+
+def _decode_date(payload):
+    day = date.fromordinal(_from_base36(payload))
+    return f"{day.year:04d}-{day.month:02d}-{day.day:02d}"
+
+
+# IPv4 addresses: the 32-bit address in base 36
+def _encode_ipv4(text):
+    parts = text.split('.')
+    if any(int(part) > 255 or str(int(part)) != part for part in parts):
+        return None
+    value = 0
+    for part in parts:
+        value = (value << 8) | int(part)
+    return _to_base36(value)
+
+
+def _decode_ipv4(payload):
+    value = _from_base36(payload)
+    if value >> 32:
+        raise ValueError("IPv4 payload out of range")
+    return '.'.join(str((value >> shift) & 0xFF) for shift in (24, 16, 8, 0))
+
+
+# Numbers: all digits as one base-36 integer, then '.' and the count of
+# fraction digits; '_' + the digits verbatim where leading zeros would be lost.
+# One- and two-digit integers are left to the lexer: as words they are
+# shorter than a typed code and cannot be mistaken for a dictionary code.
+def _encode_number(text):
+    int_part, _, fraction = text.partition('.')
+    if not fraction and len(text) < 3:
+        return None
+    payload = _to_base36(int(int_part + fraction))
+    if fraction:
+        payload += '.' + _to_base36(len(fraction))
+    if _decode_number(payload) != text:
+        payload = '_' + text
+    return payload
+
+
+def _decode_number(payload):
+    if payload.startswith('_'):
+        text = payload[1:]
+        if not text.replace('.', '', 1).isdigit():
+            raise ValueError(f"Invalid number payload {payload!r}")
+        return text
+    value, _, scale = payload.partition('.')
+    digits = str(_from_base36(value))
+    if not scale:
+        return digits
+    scale = _from_base36(scale)
+    if not 0 < scale <= 40:
+        raise ValueError(f"Invalid number scale {scale}")
+    digits = digits.zfill(scale + 1)
+    return digits[:-scale] + '.' + digits[-scale:]
+
+
+for _codec in (
+    PatternCodec('url', 'h', r"(?<![\w@])https?://[^\s<>\"']*[^\s<>\"'.,;:!?)\]}]",
+                 _encode_url, _decode_url, hint=':'),
+    PatternCodec('email', 'e', r"(?<![\w.+-])[\w.+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)+(?![\w-])",
+                 _encode_email, _decode_email, hint='@'),
+    PatternCodec('uuid', 'u', r"(?<![\w-])[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}(?![\w-])",
+                 _encode_uuid, _decode_uuid, hint=_DECIMAL_DIGITS),
+    PatternCodec('timestamp', 't', r"(?<![\w-])\d{4}-\d\d-\d\d[T ]\d\d:\d\d:\d\d(?:\.\d{1,9})?(?:Z|[+-]\d\d:?\d\d)?(?![\w:])",
+                 _encode_timestamp, _decode_timestamp, hint=_DECIMAL_DIGITS),
+    PatternCodec('date', 'd', r"(?<![\w-])\d{4}-\d\d-\d\d(?![\w-])",
+                 _encode_date, _decode_date, hint=_DECIMAL_DIGITS),
+    PatternCodec('ipv4', 'i', r"(?<![\w.])\d{1,3}(?:\.\d{1,3}){3}(?!\w|\.\d)",
+                 _encode_ipv4, _decode_ipv4, hint=_DECIMAL_DIGITS),
+    PatternCodec('number', 'n', r"(?<![\w.])\d{1,40}(?:\.\d{1,40})?(?!\w|\.\d)",
+                 _encode_number, _decode_number, hint=_DECIMAL_DIGITS),
+):
+    register_pattern_codec(_codec)
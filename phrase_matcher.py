@@ -0,0 +1,442 @@
+"""
+BotSpeak Phrase Matcher Module
+Word-level trie for longest-match phrase lookup shared by the encoders
+"""
+
+from botspeak_dict import code_rank
+from text_lexer import normalize_phrase
+
+# Key under which a trie node stores its (text, code) entry. Words produced
+# by the tokenizer are never None, so it cannot collide with a child word.
+_ENTRY = None
+
+# Segmentation modes: longest match first, or minimum encoded length
+GREEDY = 'greedy'
+OPTIMAL = 'optimal'
+SEGMENTATION_MODES = (GREEDY, OPTIMAL)
+
+
+def validate_mode(mode):
+    """Raise ValueError for an unknown segmentation mode"""
+    if mode not in SEGMENTATION_MODES:
+        raise ValueError(f"Unknown encoding mode {mode!r}; expected one of {', '.join(SEGMENTATION_MODES)}")
+
+
+def is_literal(token):
+    """True for an unknown word kept as is, as opposed to a dictionary entry
+
+    Tokenizers emit unknown words as (word, word) with the same string
+    object twice, so a literal that happens to look like a code is told apart.
+    """
+    return token[0] is token[1]
+
+
+def phrase_entries(reverse_dictionary, frequencies=None, keys=None):
+    """Trie entries for a text -> code mapping, keyed by normalize_phrase()
+
+    Input is lexed before lookup (lower case, contractions expanded), so
+    dictionary texts are keyed the same way or entries like "I'm fine"
+    could never match. Returns ({key: code}, collisions), where collisions
+    lists each key that texts with different codes share as
+    {'key', 'code', 'texts': [(text, code), ...]}; the best code_rank() wins
+    (shortest, then most used by frequencies, then lowest), as in
+    build_reverse_index(). If a keys dict is given, it receives
+    phrase_keys() of the same texts.
+    """
+    entries = {}
+    texts = {}
+    for text, code in reverse_dictionary.items():
+        key = normalize_phrase(text)
+        if not key:
+            continue
+        current = entries.get(key)
+        if current is None or code_rank(code, frequencies) < code_rank(current, frequencies):
+            entries[key] = code
+        texts.setdefault(key, []).append((text, code))
+        if keys is not None:
+            keys.setdefault(key, set()).add(text)
+
+    collisions = [
+        {'key': key, 'code': entries[key], 'texts': variants}
+        for key, variants in texts.items()
+        if len({code for _, code in variants}) > 1
+    ]
+    return entries, collisions
+
+
+def phrase_keys(reverse_dictionary):
+    """Index of the texts under each trie key: {normalize_phrase(text): {text, ...}}"""
+    keys = {}
+    for text in reverse_dictionary:
+        key = normalize_phrase(text)
+        if key:
+            keys.setdefault(key, set()).add(text)
+    return keys
+
+
+def compile_phrase_matcher(reverse_dictionary, frequencies=None, keys=None):
+    """PhraseMatcher over phrase_entries(), warning about normalization collisions"""
+    entries, collisions = phrase_entries(reverse_dictionary, frequencies, keys)
+    if collisions:
+        examples = ', '.join(f"{collision['key']!r} ({len(collision['texts'])} texts)"
+                             for collision in collisions[:5])
+        print(f"Warning: {len(collisions)} dictionary phrase(s) collide after normalization: {examples}")
+    return PhraseMatcher(entries.items())
+
+
+class PhraseMatcher:
+    """Compiled word trie mapping word sequences to BotSpeak codes"""
+
+    def __init__(self, entries=()):
+        self._root = {}
+        self.max_phrase_words = 0
+        self.size = 0
+        for text, code in entries:
+            self.add(text, code)
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """Rebuild a matcher from snapshot() output without re-inserting phrases"""
+        matcher = cls()
+        matcher._root = state['root']
+        matcher.max_phrase_words = state['max_phrase_words']
+        matcher.size = state['size']
+        return matcher
+
+    def snapshot(self):
+        """Compiled trie as plain dicts/tuples, suitable for marshal"""
+        return {'root': self._root, 'max_phrase_words': self.max_phrase_words, 'size': self.size}
+
+    def add(self, text, code):
+        """Add (or replace) a phrase; later additions win over earlier ones"""
+        words = text.split()
+        if not words:
+            return
+
+        node = self._root
+        for word in words:
+            child = node.get(word)
+            if child is None:
+                child = node[word] = {}
+            node = child
+
+        if _ENTRY not in node:
+            self.size += 1
+        node[_ENTRY] = (' '.join(words), code)
+
+        if len(words) > self.max_phrase_words:
+            self.max_phrase_words = len(words)
+
+    def with_changes(self, changes):
+        """Return a new matcher with phrases replaced, added or (entry None) removed
+
+        changes maps a phrase to its new (text, code) entry. Only the trie
+        nodes on the changed paths are copied; everything else is shared
+        with this matcher, which is left unchanged for its current readers.
+        """
+        matcher = PhraseMatcher()
+        root = matcher._root = dict(self._root)
+        matcher.max_phrase_words = self.max_phrase_words
+        matcher.size = self.size
+        copied = {id(root)}
+
+        for phrase, entry in changes.items():
+            words = phrase.split()
+            if not words:
+                continue
+
+            node = root
+            for word in words:
+                child = node.get(word)
+                if child is None:
+                    if entry is None:
+                        break
+                    child = {}
+                elif id(child) not in copied:
+                    child = dict(child)
+                else:
+                    node = child
+                    continue
+                copied.add(id(child))
+                node[word] = child
+                node = child
+            else:
+                if entry is None:
+                    # Emptied branches stay in place; they never match
+                    if node.pop(_ENTRY, None) is not None:
+                        matcher.size -= 1
+                    continue
+                if _ENTRY not in node:
+                    matcher.size += 1
+                node[_ENTRY] = entry
+                if len(words) > matcher.max_phrase_words:
+                    matcher.max_phrase_words = len(words)
+
+        return matcher
+
+    def to_bytes(self):
+        """Copy of this matcher with ASCII bytes words and codes, for bytes input
+
+        Phrases with non-ASCII words or codes are left out: only ASCII
+        input is tokenized as bytes, so they could never match.
+        """
+        matcher = PhraseMatcher()
+
+        def copy(node, depth):
+            copied = {}
+            for word, child in node.items():
+                if word is _ENTRY:
+                    text, code = child
+                    if code.isascii():
+                        copied[_ENTRY] = (text.encode('ascii'), code.encode('ascii'))
+                        matcher.size += 1
+                        matcher.max_phrase_words = max(matcher.max_phrase_words, depth)
+                elif word.isascii():
+                    child = copy(child, depth + 1)
+                    if child:
+                        copied[word.encode('ascii')] = child
+            return copied
+
+        matcher._root = copy(self._root, 0)
+        return matcher
+
+    def longest_match(self, words, start=0):
+        """Return (word_count, entry) for the longest phrase at words[start]"""
+        node = self._root
+        best_len = 0
+        best_entry = None
+        i = start
+        end = len(words)
+
+        while i < end:
+            node = node.get(words[i])
+            if node is None:
+                break
+            i += 1
+            entry = node.get(_ENTRY)
+            if entry is not None:
+                best_len = i - start
+                best_entry = entry
+
+        return best_len, best_entry
+
+    def tokenize(self, words, mode=GREEDY):
+        """Tokenize a word list into (text, code) pairs
+
+        GREEDY takes the longest match at each position; OPTIMAL minimizes
+        the encoded length (see tokenize_optimal()).
+        """
+        if mode == OPTIMAL:
+            return self.tokenize_optimal(words)
+        return self._tokenize(words, len(words))[0]
+
+    def tokenize_optimal(self, words):
+        """Tokenization minimizing encoded length rather than taking the longest match
+
+        Every token costs its code length plus one separator. A dynamic
+        program over the phrase lattice picks the cheapest segmentation in
+        O(len(words) * max_phrase_words); on equal cost the longer phrase
+        wins. Words with no dictionary entry of their own are kept as literals.
+        """
+        root = self._root
+        end = len(words)
+        cost = [0] * (end + 1)
+        choice = [None] * (end + 1)
+
+        for i in range(end - 1, -1, -1):
+            # Collect every phrase starting here, shortest first
+            matches = []
+            node = root
+            j = i
+            while j < end:
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                entry = node.get(_ENTRY)
+                if entry is not None:
+                    matches.append((j - i, entry))
+
+            best_cost = None
+            best_choice = None
+            for length, entry in reversed(matches):
+                candidate = len(entry[1]) + 1 + cost[i + length]
+                if best_cost is None or candidate < best_cost:
+                    best_cost = candidate
+                    best_choice = (length, entry)
+
+            if not matches or matches[0][0] != 1:
+                # Unknown word - keep as is
+                word = words[i]
+                candidate = len(word) + 1 + cost[i + 1]
+                if best_cost is None or candidate < best_cost:
+                    best_cost = candidate
+                    best_choice = (1, (word, word))
+
+            cost[i] = best_cost
+            choice[i] = best_choice
+
+        tokens = []
+        i = 0
+        while i < end:
+            length, entry = choice[i]
+            tokens.append(entry)
+            i += length
+
+        return tokens
+
+    def tokenize_partial(self, words):
+        """Tokenize only the prefix of words that later words can no longer change
+
+        A position is settled once max_phrase_words words are visible from it.
+        Returns (tokens, consumed); words[consumed:] must be carried over and
+        tokenized again once more words (or the end of the sentence) arrive.
+        """
+        return self._tokenize(words, len(words) - self.max_phrase_words + 1)
+
+    def _tokenize(self, words, stop):
+        """Tokenize from the start of words, deciding positions before stop"""
+        tokens = []
+        root = self._root
+        i = 0
+        end = len(words)
+        if stop > end:
+            stop = end
+
+        while i < stop:
+            # Inlined longest_match: this loop is the hot path of every encode
+            node = root
+            best_len = 0
+            best_entry = None
+            j = i
+            while j < end:
+                node = node.get(words[j])
+                if node is None:
+                    break
+                j += 1
+                entry = node.get(_ENTRY)
+                if entry is not None:
+                    best_len = j - i
+                    best_entry = entry
+
+            if best_entry is None:
+                # Unknown word - keep as is
+                word = words[i]
+                tokens.append((word, word))
+                i += 1
+            else:
+                tokens.append(best_entry)
+                i += best_len
+
+        return tokens, i
+
+    def iter_first_words(self):
+        """Yield (word, code) for every word that starts a phrase
+
+        code is None unless the word is a phrase on its own.
+        """
+        for word, node in self._root.items():
+            entry = node.get(_ENTRY)
+            yield word, entry[1] if entry is not None else None
+
+    def vocabulary(self):
+        """Set of every word that occurs in some phrase"""
+        words = set()
+        nodes = [self._root]
+        while nodes:
+            for word, child in nodes.pop().items():
+                if word is not _ENTRY:
+                    words.add(word)
+                    nodes.append(child)
+        return words
+
+    def __contains__(self, text):
+        node = self._root
+        for word in text.split():
+            node = node.get(word)
+            if node is None:
+                return False
+        return _ENTRY in node
+
+    def __len__(self):
+        return self.size
+
+
+class IncrementalTokenizer:
+    """Greedy tokenizer fed one word at a time, as used by stream encoders
+
+    A position is decided as soon as no longer phrase can start there, so
+    only the words of one still-open phrase are held back. The trie walk
+    over held words is kept between calls, so each pushed word costs one
+    trie step unless a decision makes the remaining held words be walked
+    again. Tokens are exactly those tokenize() gives for the whole sentence.
+    """
+
+    __slots__ = ('_matcher', '_words', '_node', '_depth', '_best_len', '_best_entry')
+
+    def __init__(self, matcher):
+        self._matcher = matcher
+        self._words = []
+        self._reset_walk()
+
+    def _reset_walk(self):
+        self._node = self._matcher._root
+        self._depth = 0
+        self._best_len = 0
+        self._best_entry = None
+
+    def push(self, word, tokens):
+        """Add the next word of the sentence, appending newly decided tokens to tokens"""
+        words = self._words
+        words.append(word)
+        node = self._node
+        depth = self._depth
+
+        while True:
+            end = len(words)
+            while depth < end:
+                node = node.get(words[depth])
+                depth += 1
+                if node is None:
+                    break
+                entry = node.get(_ENTRY)
+                if entry is not None:
+                    self._best_len = depth
+                    self._best_entry = entry
+
+            # Still open while the walk has reached the last word at a node
+            # that longer phrases continue from
+            if node is not None and len(node) > (_ENTRY in node):
+                self._node = node
+                self._depth = depth
+                return
+
+            entry = self._best_entry
+            if entry is None:
+                # Unknown word - keep as is
+                word = words[0]
+                tokens.append((word, word))
+                del words[0]
+            else:
+                tokens.append(entry)
+                del words[:self._best_len]
+                self._best_entry = None
+            self._best_len = 0
+
+            node = self._matcher._root
+            depth = 0
+            if not words:
+                self._node = node
+                self._depth = 0
+                return
+
+    def flush(self, tokens):
+        """End the sentence, appending the tokens of every held word"""
+        if self._words:
+            tokens.extend(self._matcher.tokenize(self._words))
+            self._words = []
+            self._reset_walk()
+
+    def __len__(self):
+        """Number of words held back"""
+        return len(self._words)
@@ -0,0 +1,170 @@
+"""
+BotSpeak Result Cache Module
+Thread-safe, size-bounded LRU cache with frequency-aware admission
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # 32 MiB
+
+# Counters are 4-bit style saturating counts; halving all of them every
+# SKETCH_SAMPLE_FACTOR * max_entries increments lets old popularity fade.
+_COUNTER_MAX = 15
+_SKETCH_SAMPLE_FACTOR = 10
+_SKETCH_ROWS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+_HALVE = bytes(value >> 1 for value in range(256))
+_MASK64 = (1 << 64) - 1
+
+
+class _FrequencySketch:
+    """Count-min sketch estimating how often each key has been requested"""
+
+    def __init__(self, max_entries):
+        width = 64
+        while width < max_entries * 4:
+            width <<= 1
+        self._mask = width - 1
+        self._width = width
+        self._table = bytearray(width * len(_SKETCH_ROWS))
+        self._additions = 0
+        self._sample_size = max(1, max_entries * _SKETCH_SAMPLE_FACTOR)
+
+    def _indexes(self, key):
+        h = hash(key)
+        for row, seed in enumerate(_SKETCH_ROWS):
+            yield row * self._width + ((((h * seed) & _MASK64) >> 32) & self._mask)
+
+    def increment(self, key):
+        table = self._table
+        for index in self._indexes(key):
+            if table[index] < _COUNTER_MAX:
+                table[index] += 1
+
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            # Age every counter at C speed
+            self._table = bytearray(self._table.translate(_HALVE))
+            self._additions //= 2
+
+    def estimate(self, key):
+        table = self._table
+        return min(table[index] for index in self._indexes(key))
+
+    def clear(self):
+        self._table = bytearray(len(self._table))
+        self._additions = 0
+
+
+class ResultCache:
+    """LRU cache bounded by entry count and approximate memory
+
+    New entries are only admitted over an eviction victim when they have
+    been requested more often than it (TinyLFU), so a burst of one-off
+    inputs cannot flush the hot entries. Entries larger than
+    max_entry_bytes are never cached.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 max_entry_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 64
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._sketch = _FrequencySketch(max(1, max_entries))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def accepts(self, text):
+        """Whether an input of this size is worth looking up at all"""
+        return self.enabled and sys.getsizeof(text) <= self.max_entry_bytes
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        with self._lock:
+            self._sketch.increment(key)
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size=None):
+        """Offer a value to the cache; it may be refused by the admission policy"""
+        if size is None:
+            size = _sizeof(key) + sys.getsizeof(value)
+        if not self.enabled or size > self.max_entry_bytes:
+            return False
+
+        with self._lock:
+            entries = self._entries
+            old = entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            else:
+                # Make room, but only at the expense of less popular entries
+                candidate_frequency = self._sketch.estimate(key)
+                while entries and (len(entries) >= self.max_entries
+                                   or self._bytes + size > self.max_bytes):
+                    victim_key = next(iter(entries))
+                    if candidate_frequency <= self._sketch.estimate(victim_key):
+                        self.rejections += 1
+                        return False
+                    self._bytes -= entries.pop(victim_key)[1]
+                    self.evictions += 1
+
+            entries[key] = (value, size)
+            self._bytes += size
+            return True
+
+    def clear(self):
+        """Drop every entry (e.g. after the dictionary changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._sketch.clear()
+            self.invalidations += 1
+
+    def get_stats(self):
+        """Hit/miss/eviction counters and current occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'evictions': self.evictions,
+                'rejections': self.rejections,
+                'invalidations': self.invalidations
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _sizeof(key):
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(sys.getsizeof(part) for part in key)
+    return sys.getsizeof(key)
@@ -0,0 +1,79 @@
+"""
+BotSpeak Sentence Memo Module
+Bounded per-encoder memo of encoded sentences for repetitive corpora
+"""
+
+import threading
+
+from phrase_matcher import GREEDY
+
+DEFAULT_MAX_SENTENCES = 16384
+# Longer sentences rarely repeat verbatim and would crowd out the short ones
+DEFAULT_MAX_SENTENCE_WORDS = 48
+
+
+class SentenceMemo:
+    """Memo table mapping a normalized sentence to its encoded form
+
+    Lookups are plain dict reads with no locking, so consulting the memo costs
+    less than tokenizing even a short sentence. When full, the oldest entries
+    are evicted first. Hit and miss counters are approximate under threads.
+    """
+
+    def __init__(self, max_sentences=DEFAULT_MAX_SENTENCES,
+                 max_sentence_words=DEFAULT_MAX_SENTENCE_WORDS):
+        self.max_sentences = max_sentences
+        self.max_sentence_words = max_sentence_words
+        self._table = {}
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, words, mode=GREEDY):
+        """Memo key for a sentence's normalized words, or None if not memoizable"""
+        if self.max_sentences <= 0 or len(words) > self.max_sentence_words:
+            return None
+        if mode == GREEDY:
+            return ' '.join(words)
+        return (mode, ' '.join(words))
+
+    def get(self, key):
+        encoded = self._table.get(key)
+        if encoded is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return encoded
+
+    def put(self, key, encoded):
+        table = self._table
+        if len(table) >= self.max_sentences:
+            with self._evict_lock:
+                # Drop the oldest eighth in one go to amortize eviction cost
+                excess = len(table) - self.max_sentences + 1
+                count = max(excess, self.max_sentences // 8)
+                victims = list(table)[:count]
+                for old_key in victims:
+                    table.pop(old_key, None)
+                self.evictions += len(victims)
+        table[key] = encoded
+
+    def clear(self):
+        """Drop every memoized sentence (e.g. after the dictionary changes)"""
+        with self._evict_lock:
+            self._table = {}
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._table),
+            'max_entries': self.max_sentences,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+            'evictions': self.evictions
+        }
+
+    def __len__(self):
+        return len(self._table)
@@ -0,0 +1,111 @@
+"""
+BotSpeak Stream Encoder Module
+Incremental encoding of text that arrives in chunks, in constant memory
+"""
+
+from phrase_matcher import IncrementalTokenizer
+from text_lexer import ChunkLexer, SENTENCE_BREAK
+
+
+class StreamEncoder:
+    """Incremental BotSpeak encoder for text arriving in chunks
+
+    Concatenating everything returned by feed() and finish() gives exactly
+    encode_text() of the concatenated input. Only the unfinished word and the
+    words of a phrase that may still grow are held between calls, so codes
+    are emitted as soon as no longer dictionary phrase can match.
+
+    feed() may be called with single tokens of a model's output stream; each
+    call costs time proportional to the chunk, and an idle stream holds a
+    few small objects, so one can be kept per open connection.
+    """
+
+    __slots__ = ('_tokenizer', '_get_length_stats', '_lexer', '_output_started',
+                 '_sentence_started', 'original_length', 'encoded_length')
+
+    def __init__(self, encoder):
+        self._tokenizer = IncrementalTokenizer(encoder.phrase_matcher)
+        self._get_length_stats = encoder.get_length_stats
+        self._lexer = ChunkLexer()
+        self._output_started = False
+        self._sentence_started = False
+        self.original_length = 0
+        self.encoded_length = 0
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the encoded output it completes"""
+        self.original_length += len(chunk)
+        pieces = []
+
+        self._consume(self._lexer.feed(chunk), pieces)
+        return self._output(pieces)
+
+    def finish(self):
+        """Flush held-back text and return the remaining encoded output"""
+        pieces = []
+        self._consume(self._lexer.flush(), pieces)
+        self._end_sentence(pieces)
+        return self._output(pieces)
+
+    def get_stats(self):
+        """Compression statistics for everything fed so far"""
+        return self._get_length_stats(self.original_length, self.encoded_length)
+
+    def _consume(self, words, pieces):
+        push = self._tokenizer.push
+        tokens = []
+        for word in words:
+            if word is SENTENCE_BREAK:
+                if tokens:
+                    self._emit(tokens, pieces)
+                    tokens.clear()
+                self._end_sentence(pieces)
+            else:
+                # Emits the words whose longest match can no longer change
+                push(word, tokens)
+        if tokens:
+            self._emit(tokens, pieces)
+
+    def _end_sentence(self, pieces):
+        tokens = []
+        self._tokenizer.flush(tokens)
+        self._emit(tokens, pieces)
+        self._sentence_started = False
+
+    def _emit(self, tokens, pieces):
+        for token in tokens:
+            if self._sentence_started:
+                pieces.append(' ')
+            else:
+                if self._output_started:
+                    pieces.append(' | ')  # Use | to separate sentences
+                self._output_started = True
+                self._sentence_started = True
+            pieces.append(token[1])
+
+    def _output(self, pieces):
+        encoded = ''.join(pieces)
+        self.encoded_length += len(encoded)
+        return encoded
+
+
+def iter_encoded(encoder, chunks, stats=None):
+    """Encode an iterable of text chunks, yielding encoded output as it is ready
+
+    If a stats dict is given it is kept up to date with the running
+    compression statistics of the stream.
+    """
+    stream = StreamEncoder(encoder)
+
+    for chunk in chunks:
+        encoded = stream.feed(chunk)
+        if stats is not None:
+            stats.update(stream.get_stats())
+        if encoded:
+            yield encoded
+
+    encoded = stream.finish()
+    if stats is not None:
+        stats.update(stream.get_stats())
+    if encoded:
+        yield encoded
@@ -0,0 +1,169 @@
+"""
+BotSpeak Suffix Table Module
+Opt-in codes for inflected forms of dictionary words: base code + suffix marker
+
+The dictionary holds base forms ("help", "work", "decide"), so "helped",
+"working" and "decides" would pass through as literals. With suffixes
+enabled, such a word is written as its base code, SUFFIX_MARK and a
+one-letter marker naming the inflection, and the decoder applies the same
+spelling rule to the base text:
+
+    helped -> 159~d     working -> 183~g     decides -> 497~s
+
+Every inflected form of every single-word entry is generated once per
+dictionary, so encoding a word is one dict lookup and never a regular
+expression or stemming pass. A form is only coded when that is no longer
+than the word itself.
+"""
+
+import sys
+import time
+
+SUFFIX_MARK = '~'
+
+_VOWELS = frozenset('aeiou')
+_SIBILANTS = ('s', 'x', 'z', 'ch', 'sh')
+
+
+def _consonant_y(base):
+    return len(base) > 1 and base[-1] == 'y' and base[-2] not in _VOWELS
+
+
+def _doubles(base):
+    """True if base doubles its final consonant before a vowel suffix (stop -> stopped)"""
+    return (len(base) > 2 and base[-1] not in _VOWELS and base[-1] not in 'wxy'
+            and base[-2] in _VOWELS and base[-3] not in _VOWELS)
+
+
+def _plural(base):
+    if base.endswith(_SIBILANTS):
+        return base + 'es'
+    if _consonant_y(base):
+        return base[:-1] + 'ies'
+    return base + 's'
+
+
+def _past(base):
+    if base.endswith('e'):
+        return base + 'd'
+    if _consonant_y(base):
+        return base[:-1] + 'ied'
+    return base + 'ed'
+
+
+def _progressive(base):
+    if base.endswith('ie'):
+        return base[:-2] + 'ying'
+    if base.endswith('e') and not base.endswith(('ee', 'ye', 'oe')):
+        return base[:-1] + 'ing'
+    return base + 'ing'
+
+
+def _comparative(base, ending):
+    if base.endswith('e'):
+        return base + ending[1:]
+    if _consonant_y(base):
+        return base[:-1] + 'i' + ending
+    return base + ending
+
+
+def _adverb(base):
+    if base.endswith('le') and len(base) > 2 and base[-3] not in _VOWELS:
+        return base[:-1] + 'y'
+    if _consonant_y(base):
+        return base[:-1] + 'ily'
+    return base + 'ly'
+
+
+def _doubled(ending):
+    return lambda base: base + base[-1] + ending if _doubles(base) else None
+
+
+# Marker -> spelling rule; a rule returns None where it does not apply.
+# Upper-case markers double the final consonant first.
+SUFFIX_RULES = {
+    's': _plural,
+    'd': _past,
+    'D': _doubled('ed'),
+    'g': _progressive,
+    'G': _doubled('ing'),
+    'r': lambda base: _comparative(base, 'er'),
+    'R': _doubled('er'),
+    't': lambda base: _comparative(base, 'est'),
+    'T': _doubled('est'),
+    'l': _adverb,
+}
+
+
+def _is_base(text):
+    return text is not None and len(text) > 1 and text.isalpha() and text.islower()
+
+
+def decode_suffixed(token, dictionary):
+    """Inflected word for a base code + suffix marker token, or None if token is not one"""
+    base_code, mark, marker = token.rpartition(SUFFIX_MARK)
+    if not mark:
+        return None
+    rule = SUFFIX_RULES.get(marker)
+    base = dictionary.get(base_code)
+    if rule is None or not _is_base(base):
+        return None
+    return rule(base)
+
+
+class SuffixTable:
+    """Precomputed inflected form -> base code + marker, for one dictionary version"""
+
+    def __init__(self, dictionary):
+        start = time.perf_counter()
+        self._tokens = {}
+
+        for code, base in dictionary.items():
+            if not _is_base(base) or SUFFIX_MARK in code:
+                continue
+            for marker, rule in SUFFIX_RULES.items():
+                form = rule(base)
+                if form is None:
+                    continue
+                token = code + SUFFIX_MARK + marker
+                if len(token) > len(form):
+                    continue
+                current = self._tokens.get(form)
+                # Several bases may spell the same form: keep the shortest, then lowest code
+                if current is None or (len(token), token) < (len(current), current):
+                    self._tokens[form] = token
+
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def encode(self, tokens):
+        """Return tokenizer output with inflected literal words replaced by suffix codes"""
+        lookup = self._tokens.get
+        encoded = None
+
+        for i, (text, code) in enumerate(tokens):
+            if text is not code:
+                continue
+            token = lookup(text)
+            if token is None:
+                continue
+            if encoded is None:
+                encoded = list(tokens)
+            encoded[i] = (text, token)
+
+        return tokens if encoded is None else encoded
+
+    def __contains__(self, word):
+        return word in self._tokens
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def get_info(self):
+        """Number of forms, approximate memory and build time of the table"""
+        memory = sys.getsizeof(self._tokens) + sum(
+            sys.getsizeof(form) + sys.getsizeof(token) for form, token in self._tokens.items())
+        return {
+            'forms': len(self._tokens),
+            'memory_bytes': memory,
+            'build_ms': round(self.build_ms, 2)
+        }
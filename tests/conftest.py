@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.fixture(scope='session')
+def database(tmp_path_factory):
+    """SQLite database populated from the static dictionary; codecs compile from it, not a snapshot"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATABASE_URL', f"sqlite:///{tmp_path_factory.mktemp('db') / 'botspeak.db'}")
+        patch.setenv('BOTSPEAK_SNAPSHOT', '')
+
+        from models import init_database, populate_dictionary_from_static
+        from db_manager import get_db_manager
+        init_database()
+        populate_dictionary_from_static()
+
+        manager = get_db_manager()
+        yield manager
+        manager.close_session()
+
+
+@pytest.fixture(scope='session')
+def codecs():
+    """Encoder and decoder over the static dictionary"""
+    from encoder import BotSpeakEncoder
+    from decoder import BotSpeakDecoder
+    return BotSpeakEncoder(), BotSpeakDecoder()
@@ -0,0 +1,67 @@
+"""Back-references shorten repeated unknown words and decode like the plain encoding"""
+
+import itertools
+import string
+
+import pytest
+
+from backref_table import MAX_SLOTS, MIN_WORD_LENGTH, REF_PREFIX
+
+TEXTS = [
+    "Kubernetes pods restart. Kubernetes pods scale.",
+    "Zyxwvut qwerty zyxwvut qwerty zyxwvut, and the help with zyxwvut!",
+    "Café résumé café résumé.",
+    "No unknown words here, thank you.",
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip_matches_plain_encoding(codecs, text):
+    encoder, decoder = codecs
+    encoded = encoder.encode_text(text, backrefs=True)
+
+    assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
+    assert len(encoded) <= len(encoder.encode_text(text))
+
+
+def test_repeats_become_references(codecs):
+    encoder, _ = codecs
+    assert encoder.encode_text(TEXTS[0], backrefs=True) == 'kubernetes pods restart | @0 @1 scale'
+
+
+def test_short_words_take_no_slot(codecs):
+    encoder, _ = codecs
+    word = 'qzx'[:MIN_WORD_LENGTH - 1]
+    assert REF_PREFIX not in encoder.encode_text(f"{word} {word} {word}", backrefs=True)
+
+
+def test_slots_are_reused_past_max_slots(codecs):
+    encoder, decoder = codecs
+    words = [f"qz{''.join(letters)}" for letters in itertools.product(string.ascii_lowercase, repeat=3)]
+    words = words[:MAX_SLOTS + 50]
+    # Fill every slot, overwrite the first 50, then refer to old and new words
+    text = ' '.join(words + words[:60] + words[MAX_SLOTS:])
+
+    encoded = encoder.encode_text(text, backrefs=True)
+
+    assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
+    assert max(len(token) for token in encoded.split() if token.startswith(REF_PREFIX)) == 3
+
+
+def test_cached_plain_output_is_not_reused(codecs):
+    encoder, _ = codecs
+    text = "Qwertzu asdfgh qwertzu asdfgh."
+    plain = encoder.encode_text(text)
+
+    assert encoder.encode_text(text, backrefs=True) != plain
+    assert encoder.encode_text(text) == plain
+
+
+def test_database_codecs_round_trip(database):
+    from db_encoder import DatabaseEncoder
+    from db_decoder import DatabaseDecoder
+    encoder, decoder = DatabaseEncoder(), DatabaseDecoder()
+
+    for text in TEXTS:
+        encoded = encoder.encode_text(text, backrefs=True)
+        assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
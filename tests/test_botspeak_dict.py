@@ -0,0 +1,40 @@
+"""Texts under several codes are indexed to the shortest, then most used, then lowest code"""
+
+from botspeak_dict import botspeak_dict, build_reverse_index, code_rank, reverse_botspeak_dict, \
+    validate_dictionary
+
+
+def best(codes, frequencies=None):
+    return min(codes, key=lambda code: code_rank(code, frequencies))
+
+
+def test_lowest_code_wins_equal_lengths():
+    assert best(['322', '306']) == '306'
+    assert best(['322', '306'], {'322': 0, '306': 0}) == '306'
+
+
+def test_most_used_code_wins_equal_lengths():
+    assert best(['306', '322'], {'322': 5, '306': 1}) == '322'
+
+
+def test_shorter_code_wins_whatever_the_usage():
+    assert best(['0004', '410'], {'0004': 1000}) == '410'
+    assert best(['A01', '1001']) == 'A01'
+
+
+def test_static_index_uses_the_shortest_codes():
+    assert botspeak_dict['306'] == botspeak_dict['322'] == 'start'
+    assert reverse_botspeak_dict['start'] == '306'
+    assert reverse_botspeak_dict['computer'] == '410'
+
+
+def test_build_reverse_index_reports_collisions():
+    reverse, collisions = build_reverse_index({'0004': 'computer', '800': 'computer', '410': 'computer',
+                                               '101': 'hello'}, {'800': 3})
+
+    assert reverse == {'computer': '800', 'hello': '101'}
+    assert collisions == [{'text': 'computer', 'code': '800', 'codes': ['0004', '800', '410']}]
+
+
+def test_validate_dictionary_returns_a_bool():
+    assert validate_dictionary() is True
@@ -0,0 +1,79 @@
+"""encode_bytes() / decode_bytes() match the str path byte for byte"""
+
+import pytest
+
+from phrase_matcher import GREEDY, OPTIMAL
+
+TEXTS = [
+    "Hello, how are you? Thank you very much for the help.",
+    "Thank you very much. Thank you very much! He was running and jumping.",
+    "Call 555-123-4567 on 2024-01-05; it's   really   important...",
+    "",
+    "   ",
+    "Café au lait, thank you. Naïve résumé!",
+]
+
+
+@pytest.fixture(scope='module', params=['static', 'database'])
+def codecs(request):
+    if request.param == 'database':
+        request.getfixturevalue('database')
+        from db_encoder import DatabaseEncoder
+        from db_decoder import DatabaseDecoder
+        return DatabaseEncoder(), DatabaseDecoder()
+    from encoder import BotSpeakEncoder
+    from decoder import BotSpeakDecoder
+    return BotSpeakEncoder(), BotSpeakDecoder()
+
+
+@pytest.mark.parametrize('mode', [GREEDY, OPTIMAL])
+@pytest.mark.parametrize('text', TEXTS)
+def test_encode_bytes_matches_str_path(codecs, text, mode):
+    encoder, _ = codecs
+    expected = encoder.encode_text(text, mode).encode('utf-8')
+    data = text.encode('utf-8')
+
+    assert encoder.encode_bytes(data, mode) == expected
+    assert encoder.encode_bytes(bytearray(data), mode) == expected
+    assert encoder.encode_bytes(memoryview(data), mode) == expected
+
+
+@pytest.mark.parametrize('options', [{}, {'backrefs': True}, {'patterns': True}, {'suffixes': True}])
+@pytest.mark.parametrize('text', TEXTS)
+def test_decode_bytes_matches_str_path(codecs, text, options):
+    encoder, decoder = codecs
+    encoded = encoder.encode_text(text, **options)
+    expected = decoder.decode_codes(encoded).encode('utf-8')
+    data = encoded.encode('utf-8')
+
+    assert decoder.decode_bytes(data) == expected
+    assert decoder.decode_bytes(bytearray(data)) == expected
+    assert decoder.decode_bytes(memoryview(data)) == expected
+
+
+@pytest.mark.parametrize('data', [
+    '101\x1c102', '101\x1d102', '101\x1e102', '101\x1f 102 | 103',
+    '242 @0', '415 ^nff', '154~G', '99 a01 | word 101', '101  102 |  | 103',
+])
+def test_decode_bytes_fallbacks_match_str_path(codecs, data):
+    _, decoder = codecs
+    assert decoder.decode_bytes(data.encode('utf-8')) == decoder.decode_codes(data).encode('utf-8')
+
+
+def test_out_buffer_is_appended_to_and_reused(codecs):
+    encoder, decoder = codecs
+    text = TEXTS[0]
+    encoded = encoder.encode_text(text).encode('utf-8')
+    decoded = decoder.decode_codes(encoded.decode('utf-8')).encode('utf-8')
+
+    out = bytearray(b'prefix:')
+    assert encoder.encode_bytes(text.encode('utf-8'), out=out) is out
+    assert out == b'prefix:' + encoded
+
+    out.clear()
+    assert encoder.encode_bytes(TEXTS[-1].encode('utf-8'), out=out) is out
+    assert out == encoder.encode_text(TEXTS[-1]).encode('utf-8')
+
+    out.clear()
+    assert decoder.decode_bytes(encoded, out=out) is out
+    assert decoder.decode_bytes(encoded, out=out) == decoded + decoded
@@ -0,0 +1,90 @@
+"""Code IDs are stable per code, and ID buffers decode like the wire format"""
+
+import itertools
+import string
+
+import pytest
+
+from code_ids import LITERAL_BASE, SENTENCE_BREAK_ID, code_to_id, id_to_code
+from phrase_matcher import GREEDY, OPTIMAL
+
+TEXTS = [
+    "Hello, how are you? Thank you very much for the help.",
+    "Zyxwvut qwerty zyxwvut. Call 555-123-4567!",
+    "Café au lait, thank you.",
+    "",
+]
+
+
+@pytest.mark.parametrize('code, code_id', [
+    ('000', 1000), ('999', 1999), ('A00', 2000), ('Z99', 4599), ('0000', 5000), ('9999', 14999),
+])
+def test_code_families_map_to_fixed_ids(code, code_id):
+    assert code_to_id(code) == code_id
+    assert id_to_code(code_id) == code
+
+
+@pytest.mark.parametrize('code', ['12', 'a01', 'AB1', '12345', 'A0B'])
+def test_other_codes_have_no_id(code):
+    assert code_to_id(code) is None
+
+
+@pytest.mark.parametrize('mode', [GREEDY, OPTIMAL])
+@pytest.mark.parametrize('text', TEXTS)
+def test_ids_round_trip_like_wire_format(codecs, text, mode):
+    encoder, decoder = codecs
+    expected = decoder.decode_binary(encoder.encode_binary(text, mode))
+
+    result = encoder.encode_to_ids(text, mode)
+
+    assert result['ids'].typecode == 'H'
+    assert decoder.decode_ids(result['ids'], result['literals']) == expected
+
+
+def test_literals_share_one_slot(codecs):
+    encoder, _ = codecs
+    result = encoder.encode_to_ids("Zyxwvut qwerty zyxwvut. Qwerty!")
+
+    assert result['literals'] == ['zyxwvut', 'qwerty']
+    assert list(result['ids']) == [LITERAL_BASE, LITERAL_BASE + 1, LITERAL_BASE, SENTENCE_BREAK_ID,
+                                   LITERAL_BASE + 1]
+
+
+def test_many_round_trip_with_shared_literals(codecs):
+    encoder, decoder = codecs
+    result = encoder.encode_many_to_ids(TEXTS)
+
+    assert list(result['offsets'])[0] == 0 and len(result['offsets']) == len(TEXTS) + 1
+    assert len(result['literals']) == len(set(result['literals']))
+    assert decoder.decode_many_ids(result['ids'], result['offsets'], result['literals']) == [
+        decoder.decode_binary(encoder.encode_binary(text)) for text in TEXTS]
+
+
+def test_numpy_buffers(codecs):
+    np = pytest.importorskip('numpy')
+    encoder, decoder = codecs
+
+    single = encoder.encode_to_ids(TEXTS[1], as_numpy=True)
+    many = encoder.encode_many_to_ids(TEXTS, as_numpy=True)
+
+    assert single['ids'].dtype == np.uint16
+    assert decoder.decode_ids(single['ids'], single['literals']) == decoder.decode_binary(
+        encoder.encode_binary(TEXTS[1]))
+    assert many['ids'].dtype == np.uint16 and many['offsets'].dtype == np.uint64
+    assert decoder.decode_many_ids(many['ids'], many['offsets'], many['literals']) == decoder.decode_many_ids(
+        *encoder.encode_many_to_ids(TEXTS).values())
+
+
+def test_too_many_literals_overflow(codecs):
+    encoder, _ = codecs
+    words = ('qz' + ''.join(letters) for letters in itertools.product(string.ascii_lowercase, repeat=4))
+    text = ' '.join(itertools.islice(words, 65536 - LITERAL_BASE + 1))
+
+    with pytest.raises(OverflowError):
+        encoder.encode_many_to_ids([text])
+
+
+def test_bad_mode_raises(codecs):
+    encoder, _ = codecs
+    with pytest.raises(ValueError):
+        encoder.encode_to_ids("hello", mode='fastest')
@@ -0,0 +1,86 @@
+"""CodecPool deadlines, worker replacement and dictionary reloads, with spawned workers"""
+
+import os
+import time
+
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+import codec_pool
+from codec_pool import CodecPool, CodecTimeout
+
+# Big enough to keep a worker busy well past a short deadline
+LARGE_TEXT = "Thank you very much for the help with the project today. " * 40000
+
+
+@pytest.fixture
+def pool(database):
+    pool = CodecPool(max_workers=1, offload_chars=1, timeout=60)
+    # Start the worker, so timings below do not include spawning it
+    pool.run('encode_with_stats', "warm up", track_usage=False)
+    yield pool
+    pool.shutdown()
+
+
+def worker_processes(pool):
+    return [process for worker in pool._workers if worker is not None
+            for process in worker.executor._processes.values()]
+
+
+def test_run_encodes_in_worker(pool, database):
+    from db_encoder import DatabaseEncoder
+    result = pool.run('encode_with_stats', "Thank you very much!", track_usage=False)
+    assert result['encoded_text'] == DatabaseEncoder().encode_text("Thank you very much!")
+    assert pool.get_stats()['completed'] == 2
+
+
+def test_unknown_operation(pool):
+    with pytest.raises(ValueError):
+        pool.run('refresh_dictionary')
+
+
+def test_task_queued_past_its_deadline_is_dropped(database):
+    codec_pool._codecs.clear()
+    with pytest.raises(CodecTimeout, match="queued"):
+        codec_pool._run_task('encode_with_stats', ("hello",), {}, codec_pool._generation, time.time() - 1)
+
+
+def test_running_task_past_deadline_kills_and_replaces_worker(pool):
+    [process] = worker_processes(pool)
+    pool.timeout = 0.2
+    with pytest.raises(CodecTimeout):
+        pool.run('encode_with_stats', LARGE_TEXT, track_usage=False)
+
+    process.join(5)
+    assert not process.is_alive()
+    stats = pool.get_stats()
+    assert stats['timed_out'] == 1 and stats['killed'] == 1
+
+    # The next task runs on a fresh worker
+    pool.timeout = 60
+    assert pool.run('encode_with_stats', "Thank you", track_usage=False)['encoded_text']
+    assert worker_processes(pool)[0].pid != process.pid
+
+
+def test_dead_worker_is_replaced(pool):
+    [process] = worker_processes(pool)
+    process.kill()
+    process.join(5)
+
+    with pytest.raises(BrokenProcessPool):
+        pool.run('encode_with_stats', "Thank you", track_usage=False)
+    assert pool.run('encode_with_stats', "Thank you", track_usage=False)['encoded_text']
+
+
+def test_generation_bump_reloads_worker_codecs(pool, database):
+    text = "Quixotic zeppelin"
+    assert pool.run('encode_with_stats', text, track_usage=False)['encoded_text'] == 'quixotic zeppelin'
+
+    database.add_dictionary_entry('QZP', 'quixotic zeppelin')
+    try:
+        # Workers keep their codecs until told the dictionary changed
+        assert pool.run('encode_with_stats', text, track_usage=False)['encoded_text'] == 'quixotic zeppelin'
+        pool.invalidate()
+        assert pool.run('encode_with_stats', text, track_usage=False)['encoded_text'] == 'QZP'
+    finally:
+        database.deactivate_dictionary_entry('QZP')
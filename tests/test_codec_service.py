@@ -0,0 +1,137 @@
+"""CodecBatcher coalesces concurrent calls; CodecService gives up on stalled batches"""
+
+import asyncio
+import threading
+
+import pytest
+
+from codec_pool import CodecTimeout
+from codec_service import CodecBatcher, CodecService
+from phrase_matcher import GREEDY, OPTIMAL
+
+
+class StubEncoder:
+    """Records each encode_many() batch; blocks while release is clear"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def encode_many(self, texts, track_usage=True, mode=GREEDY, backrefs=False, patterns=False, fuzzy=False,
+                    suffixes=False):
+        self.release.wait(10)
+        self.batches.append((list(texts), mode, backrefs))
+        return [{'encoded_text': f"{mode}:{text}"} for text in texts]
+
+
+def run_calls(batcher, calls):
+    """Results (or exceptions) of concurrent encode_with_stats() calls given as (text, options) pairs"""
+    async def main():
+        return await asyncio.gather(*(batcher.encode_with_stats(text, **options) for text, options in calls),
+                                    return_exceptions=True)
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_share_one_encode_many():
+    encoder = StubEncoder()
+    batcher = CodecBatcher(encoder, window_ms=20)
+
+    results = run_calls(batcher, [(f"text {i}", {}) for i in range(5)])
+
+    assert [result['encoded_text'] for result in results] == [f"greedy:text {i}" for i in range(5)]
+    assert encoder.batches == [([f"text {i}" for i in range(5)], GREEDY, False)]
+    stats = batcher.get_stats()
+    assert stats['batches'] == 1
+    assert stats['calls'] == stats['max_batch_size'] == 5
+
+
+def test_full_batch_is_encoded_without_waiting():
+    encoder = StubEncoder()
+    batcher = CodecBatcher(encoder, window_ms=10000, max_batch=2)
+
+    run_calls(batcher, [(f"text {i}", {}) for i in range(4)])
+
+    assert [texts for texts, _, _ in encoder.batches] == [['text 0', 'text 1'], ['text 2', 'text 3']]
+    assert batcher.get_stats()['full_flushes'] == 2
+
+
+def test_calls_are_grouped_by_options():
+    encoder = StubEncoder()
+    batcher = CodecBatcher(encoder, window_ms=20)
+
+    results = run_calls(batcher, [('a', {}), ('b', {'mode': OPTIMAL}), ('c', {}),
+                                  ('d', {'backrefs': True})])
+
+    assert [result['encoded_text'] for result in results] == ['greedy:a', 'optimal:b', 'greedy:c', 'greedy:d']
+    assert sorted(encoder.batches) == [(['a', 'c'], GREEDY, False), (['b'], OPTIMAL, False),
+                                       (['d'], GREEDY, True)]
+    assert batcher.get_stats()['batches'] == 1
+
+
+def test_bad_mode_fails_only_its_own_call():
+    encoder = StubEncoder()
+    batcher = CodecBatcher(encoder, window_ms=20)
+
+    results = run_calls(batcher, [('a', {}), ('b', {'mode': 'fastest'}), ('c', {})])
+
+    assert isinstance(results[1], ValueError)
+    assert [results[0]['encoded_text'], results[2]['encoded_text']] == ['greedy:a', 'greedy:c']
+    assert encoder.batches == [(['a', 'c'], GREEDY, False)]
+
+
+def test_cancelled_caller_is_left_out_of_its_batch():
+    encoder = StubEncoder()
+    batcher = CodecBatcher(encoder, window_ms=50)
+
+    async def main():
+        calls = [asyncio.ensure_future(batcher.encode(text)) for text in ('a', 'b', 'c')]
+        await asyncio.sleep(0)
+        calls[1].cancel()
+        return await asyncio.gather(*calls, return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert results[0] == 'greedy:a' and results[2] == 'greedy:c'
+    assert isinstance(results[1], asyncio.CancelledError)
+    assert encoder.batches == [(['a', 'c'], GREEDY, False)]
+
+
+def test_encode_many_error_fails_its_group():
+    class FailingEncoder(StubEncoder):
+        def encode_many(self, texts, **options):
+            if options['mode'] == OPTIMAL:
+                raise RuntimeError("database is down")
+            return super().encode_many(texts, **options)
+
+    batcher = CodecBatcher(FailingEncoder(), window_ms=20)
+
+    results = run_calls(batcher, [('a', {}), ('b', {'mode': OPTIMAL})])
+
+    assert results[0]['encoded_text'] == 'greedy:a'
+    assert isinstance(results[1], RuntimeError)
+
+
+def test_service_times_out_a_stalled_batch():
+    encoder = StubEncoder()
+    encoder.release.clear()
+    service = CodecService(encoder, window_ms=1)
+    try:
+        with pytest.raises(CodecTimeout):
+            service.encode_with_stats('stalled', timeout=0.2)
+        assert service.get_stats()['timed_out'] == 1
+    finally:
+        encoder.release.set()
+
+    assert service.encode_with_stats('next', timeout=5)['encoded_text'] == 'greedy:next'
+
+
+def test_service_timeout_drops_a_call_still_waiting_for_its_batch():
+    encoder = StubEncoder()
+    service = CodecService(encoder, window_ms=300)
+
+    with pytest.raises(CodecTimeout):
+        service.encode_with_stats('late', timeout=0.05)
+    assert service.encode_with_stats('next', timeout=5)['encoded_text'] == 'greedy:next'
+
+    assert encoder.batches == [(['next'], GREEDY, False)]
@@ -0,0 +1,60 @@
+"""Round trips through the compact format, checked against the classic text format"""
+
+import pytest
+
+from compact_format import decode_compact
+from decoder import BotSpeakDecoder
+from encoder import BotSpeakEncoder
+from phrase_matcher import OPTIMAL
+
+encoder = BotSpeakEncoder()
+decoder = BotSpeakDecoder()
+
+TEXTS = [
+    # Punctuation
+    "Hello, how are you today? Thank you.",
+    "Wait... what?! (Really) -- yes; no: maybe.",
+    # Contractions
+    "I'm sure it's fine, isn't it? We'll see, won't we.",
+    # Literals, including delimiters, escapes and non-ASCII
+    "Zyxwvut qwerty! The café is naïve; sure_thing ~tilde# #hash|pipe.",
+    "Send 50% of the budget to ops@example",
+    # Several sentences
+    "I need help with the project. Thank you very much! See you tomorrow? Good night.",
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip_matches_classic(text):
+    compact = encoder.encode_compact(text)
+    assert compact.isascii()
+    assert decoder.decode_compact(compact) == decoder.decode_codes(encoder.encode_text(text))
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip_matches_classic_optimal(text):
+    compact = encoder.encode_compact(text, mode=OPTIMAL)
+    assert decoder.decode_compact(compact) == decoder.decode_codes(encoder.encode_text(text, mode=OPTIMAL))
+
+
+def test_sentence_breaks():
+    assert encoder.encode_compact("Hello, how are you today? Thank you.") == "237244190|242"
+    assert encoder.encode_compact("Thank you. Thank you. Thank you.").count('|') == 2
+
+
+def test_literal_that_looks_like_a_code_stays_literal():
+    # The classic format cannot tell the literal "100" from code 100
+    compact = encoder.encode_compact("Zyxwvut 100")
+    assert compact == "~zyxwvut~~100~"
+    assert decoder.decode_compact(compact) == "Zyxwvut 100."
+
+
+def test_empty_text():
+    assert encoder.encode_compact("") == ""
+    assert decoder.decode_compact("") == decoder.decode_codes("")
+
+
+@pytest.mark.parametrize('encoded', ["~open", "12", "1x2", "!"])
+def test_malformed_input_raises(encoded):
+    with pytest.raises(ValueError):
+        decode_compact(decoder.dictionary, encoded)
@@ -0,0 +1,25 @@
+"""DatabaseManager hands each thread its own session"""
+
+import threading
+
+
+def test_threads_get_their_own_session(database):
+    sessions = {}
+    totals = {}
+
+    def record(name):
+        sessions[name] = database.get_session()
+        totals[name] = database.get_dictionary_stats()['total_entries']
+        sessions[name, 'again'] = database.get_session()
+        database.close_session()
+
+    threads = [threading.Thread(target=record, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sessions['a'] is sessions['a', 'again']
+    assert sessions['a'] is not sessions['b']
+    assert database.get_session() not in sessions.values()
+    assert totals['a'] == totals['b'] > 0
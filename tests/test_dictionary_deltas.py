@@ -0,0 +1,91 @@
+"""Dictionary deltas leave the codecs exactly as a full rebuild would"""
+
+import random
+
+import pytest
+
+from botspeak_dict import reverse_collisions
+
+# Trie entries live under the None key of each node (see phrase_matcher)
+_ENTRY = None
+
+
+def trie_entries(matcher):
+    """{phrase: (text, code)} for every entry in a matcher's trie"""
+    entries = {}
+    stack = [((), matcher.snapshot()['root'])]
+    while stack:
+        path, node = stack.pop()
+        for word, child in node.items():
+            if word is _ENTRY:
+                entries[' '.join(path)] = child
+            else:
+                stack.append((path + (word,), child))
+    return entries
+
+
+def assert_matches_rebuild(encoder, decoder):
+    from db_encoder import DatabaseEncoder
+    from db_decoder import DatabaseDecoder
+    fresh_encoder = DatabaseEncoder()
+    fresh_decoder = DatabaseDecoder()
+
+    assert encoder.dictionary == fresh_encoder.dictionary
+    assert encoder.reverse_dictionary == fresh_encoder.reverse_dictionary
+    assert encoder.code_ids == fresh_encoder.code_ids
+    assert encoder._state.phrase_keys == fresh_encoder._state.phrase_keys
+    assert trie_entries(encoder.phrase_matcher) == trie_entries(fresh_encoder.phrase_matcher)
+    assert decoder.dictionary == fresh_decoder.dictionary
+    assert decoder._state.id_table == fresh_decoder._state.id_table
+
+
+def random_change(rng, manager, encoder, added):
+    """Apply one random admin change through db_manager and return it"""
+    codes = list(encoder.dictionary)
+    texts = list(encoder.dictionary.values())
+    action = rng.random()
+    if action < 0.3:
+        code = f"Q{len(added):04d}"
+        added.append(code)
+        return manager.add_dictionary_entry(code, rng.choice(texts + ['brand new phrase']))
+    if action < 0.8:
+        # Reuse texts, change their case or contract them, so texts and trie keys collide
+        text = rng.choice(texts)
+        text = rng.choice((text, text.upper(), text.title(), "I'm " + text, 'i am ' + text,
+                           f"{text} {rng.choice(texts)}"))
+        return manager.update_dictionary_entry(rng.choice(codes), text)
+    return manager.deactivate_dictionary_entry(rng.choice(codes))
+
+
+def test_random_deltas_match_full_rebuild(database):
+    from db_encoder import DatabaseEncoder
+    from db_decoder import DatabaseDecoder
+
+    rng = random.Random(15)
+    # Usage counts decide ties between equally long codes
+    database.increment_code_frequencies({code: rng.randint(1, 5)
+                                         for collision in reverse_collisions
+                                         for code in collision['codes']})
+    encoder = DatabaseEncoder()
+    decoder = DatabaseDecoder()
+    added = []
+
+    for _ in range(6):
+        changes = [random_change(rng, database, encoder, added) for _ in range(rng.randint(1, 10))]
+        encoder.apply_dictionary_changes(changes)
+        decoder.apply_dictionary_changes(changes)
+        assert_matches_rebuild(encoder, decoder)
+
+    assert encoder.get_version_info()['deltas'] > 0
+
+
+def test_delta_changes_encoding(database):
+    from db_encoder import DatabaseEncoder
+
+    encoder = DatabaseEncoder()
+    code = database.add_dictionary_entry('QX1', 'zyxwvut qwerty')['code']
+    encoder.apply_dictionary_changes([{'code': code, 'old_text': None, 'new_text': 'zyxwvut qwerty'}])
+    assert encoder.encode_text('Zyxwvut qwerty!') == 'QX1'
+
+    encoder.apply_dictionary_changes([database.deactivate_dictionary_entry(code)])
+    assert encoder.encode_text('Zyxwvut qwerty!') == 'zyxwvut qwerty'
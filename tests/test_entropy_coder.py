@@ -0,0 +1,119 @@
+"""Entropy-coded payloads round-trip, in this process or any other that can read the saved tables"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import entropy_coder
+from entropy_coder import EntropyTable, encode_entropy, get_entropy_table, lookup_table
+from phrase_matcher import GREEDY, OPTIMAL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXTS = [
+    "Hello, how are you? Thank you very much for the help.",
+    "Call 555-123-4567 on 2024-01-05; zyxwvut qwerty!",
+    "Café au lait, thank you. Naïve résumé!",
+    "",
+]
+
+
+@pytest.fixture
+def table_dir(tmp_path, monkeypatch):
+    """Saved tables go to tmp_path, and this process starts with none in memory"""
+    monkeypatch.setenv('BOTSPEAK_ENTROPY_TABLES', str(tmp_path))
+    monkeypatch.setattr(entropy_coder, '_tables', {})
+    return tmp_path
+
+
+def trained_table(encoder):
+    """A table for usage counts no default table has, as after a while in production"""
+    frequencies = {code: 1000 for code in sorted(encoder.dictionary)[:50]}
+    return get_entropy_table(encoder.dictionary, frequencies)
+
+
+@pytest.mark.parametrize('mode', [GREEDY, OPTIMAL])
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip(table_dir, codecs, text, mode):
+    encoder, decoder = codecs
+    # Both binary forms keep literals apart from codes (the text format reads "555" as a code)
+    expected = decoder.decode_binary(encoder.encode_binary(text, mode))
+
+    data = encoder.encode_binary(text, mode, entropy=True)
+
+    assert data[:2] == entropy_coder.MAGIC
+    assert decoder.decode_binary(data) == expected
+
+
+def test_tables_are_saved_by_id(table_dir, codecs):
+    encoder, _ = codecs
+    table = trained_table(encoder)
+
+    path = table_dir / f"{table.table_id:08x}.bht"
+    assert path.read_bytes() == table.signature
+    assert EntropyTable.from_signature(path.read_bytes()).codes == table.codes
+
+
+def test_fresh_process_decodes_with_saved_table(table_dir, codecs):
+    encoder, decoder = codecs
+    text = TEXTS[0]
+    table = trained_table(encoder)
+    # The other process would build the untrained table itself, so it needs the saved one
+    assert table.table_id != get_entropy_table(encoder.dictionary).table_id
+    data = encode_entropy(encoder, table, text, GREEDY)
+
+    script = ("import sys; from decoder import BotSpeakDecoder; "
+              "print(BotSpeakDecoder().decode_binary(bytes.fromhex(sys.argv[1])))")
+    result = subprocess.run([sys.executable, '-c', script, data.hex()], cwd=ROOT, capture_output=True,
+                            text=True, env={**os.environ, 'BOTSPEAK_ENTROPY_TABLES': str(table_dir)})
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == decoder.decode_codes(encoder.encode_text(text))
+
+
+def test_unknown_table_raises(table_dir, codecs, monkeypatch):
+    encoder, decoder = codecs
+    table = trained_table(encoder)
+    data = encode_entropy(encoder, table, TEXTS[0], GREEDY)
+
+    # Another process, without this one's tables or their files
+    monkeypatch.setattr(entropy_coder, '_tables', {})
+    (table_dir / f"{table.table_id:08x}.bht").unlink()
+    with pytest.raises(ValueError, match='Unknown entropy table'):
+        decoder.decode_binary(data)
+
+
+def test_corrupt_saved_table_is_rejected(table_dir, codecs, monkeypatch):
+    encoder, _ = codecs
+    table = trained_table(encoder)
+    path = table_dir / f"{table.table_id:08x}.bht"
+    signature = bytearray(path.read_bytes())
+    signature[2] += 1
+    path.write_bytes(bytes(signature))
+
+    monkeypatch.setattr(entropy_coder, '_tables', {})
+    assert lookup_table(table.table_id) is None
+
+
+def test_saving_can_be_disabled(codecs, monkeypatch):
+    encoder, _ = codecs
+    monkeypatch.setenv('BOTSPEAK_ENTROPY_TABLES', '')
+    monkeypatch.setattr(entropy_coder, '_tables', {})
+
+    table = trained_table(encoder)
+
+    assert lookup_table(table.table_id) is table
+    assert not os.path.exists(os.path.join(entropy_coder.DEFAULT_TABLE_DIR, f"{table.table_id:08x}.bht"))
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'', 'bad header'),
+    (b'BS\x01\x00\x00\x00\x00', 'bad header'),
+    (b'BH\x09\x00\x00\x00\x00', 'version'),
+])
+def test_bad_header_raises(codecs, data, message):
+    _, decoder = codecs
+    with pytest.raises(ValueError, match=message):
+        entropy_coder.decode_entropy(decoder.id_table, data)
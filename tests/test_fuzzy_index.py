@@ -0,0 +1,67 @@
+"""Misspelled unknown words are corrected to the closest dictionary word, real words never are"""
+
+import pytest
+
+from fuzzy_index import edit_distance
+
+
+@pytest.mark.parametrize('a, b, limit, distance', [
+    ('the', 'the', 1, 0),
+    ('teh', 'the', 1, 1),
+    ('meetign', 'meeting', 1, 1),
+    ('thnak', 'thank', 1, 1),
+    ('helo', 'hello', 1, 1),
+    ('hellp', 'hello', 1, 1),
+    ('abcd', 'badc', 1, None),
+    ('abcd', 'badc', 2, 2),
+    ('short', 'shortest', 2, None),
+])
+def test_edit_distance(a, b, limit, distance):
+    assert edit_distance(a, b, limit) == distance
+    assert edit_distance(b, a, limit) == distance
+
+
+@pytest.mark.parametrize('typo, text', [
+    ('thnak you', 'thank you'),
+    ('teh', 'the'),
+    ('meetign', 'meeting'),
+])
+def test_typos_encode_like_the_word(codecs, typo, text):
+    encoder, _ = codecs
+    corrections = []
+
+    encoded = encoder.encode_text(typo, fuzzy=True, corrections=corrections)
+
+    assert encoded == encoder.encode_text(text)
+    assert encoder.encode_text(typo) != encoded
+    assert [(c['original'], c['corrected'], c['distance']) for c in corrections] == [
+        (typo.split()[0], text.split()[0], 1)]
+
+
+@pytest.mark.parametrize('text', [
+    'the meeting', 'days', 'people', 'helped', 'te', 'qzxwv', 'abc123', 'Café',
+])
+def test_real_short_and_unmatched_words_are_kept(codecs, text):
+    encoder, _ = codecs
+    corrections = []
+
+    assert encoder.encode_text(text, fuzzy=True, corrections=corrections) == encoder.encode_text(text)
+    assert corrections == []
+
+
+def test_corrections_are_not_served_from_the_plain_cache(codecs):
+    encoder, decoder = codecs
+    text = "Thnak you for teh help."
+    plain = encoder.encode_text(text)
+
+    assert decoder.decode_codes(encoder.encode_text(text, fuzzy=True)) == "Thank you for the help."
+    assert encoder.encode_text(text) == plain
+
+
+def test_database_encoder_corrects(database):
+    from db_encoder import DatabaseEncoder
+    encoder = DatabaseEncoder()
+    corrections = []
+
+    assert encoder.encode_text("thnak you", fuzzy=True, corrections=corrections) == encoder.encode_text("thank you")
+    assert corrections[0]['corrected'] == 'thank'
@@ -0,0 +1,82 @@
+"""Pattern entities become one typed token each and decode back to the exact original text"""
+
+import pytest
+
+from pattern_codecs import PATTERN_PREFIX, PatternCodec, decode_pattern, iter_pattern_sentences, \
+    register_pattern_codec
+
+ENTITIES = [
+    ('2024-01-15T10:30:00Z', 't'),
+    ('2024-01-15 10:30:00.123+02:00', 't'),
+    ('2024-01-15', 'd'),
+    ('550e8400-e29b-41d4-a716-446655440000', 'u'),
+    ('550E8400-E29B-41D4-A716-446655440000', 'u'),
+    ('https://www.example.com/docs', 'h'),
+    ('http://Example.com/Path?a=1&b=2', 'h'),
+    ('John.Doe@Example.COM', 'e'),
+    ('192.168.0.1', 'i'),
+    ('1234567890', 'n'),
+    ('3.14', 'n'),
+    ('3.140', 'n'),
+    ('007', 'n'),
+    ('0.000001', 'n'),
+]
+
+
+def pattern_tokens(text):
+    return [word for words in iter_pattern_sentences(text) for word in words if word[0] == PATTERN_PREFIX]
+
+
+@pytest.mark.parametrize('entity, letter', ENTITIES)
+def test_entity_round_trip(codecs, entity, letter):
+    encoder, decoder = codecs
+    text = f"Please see {entity} today."
+
+    [token] = pattern_tokens(text)
+    encoded = encoder.encode_text(text, patterns=True)
+
+    assert token[1] == letter
+    assert decode_pattern(token) == entity
+    assert token in encoded.split()
+    assert decoder.decode_codes(encoded) == f"Please see {entity} today."
+
+
+def test_trailing_punctuation_stays_outside_urls():
+    [token] = pattern_tokens("Read https://example.com/docs. Then reply.")
+    assert decode_pattern(token) == 'https://example.com/docs'
+
+
+@pytest.mark.parametrize('text', ["Call me at 12 or 7", "version2024-01-15", "abc123", "no entities here"])
+def test_non_entities_are_left_to_the_lexer(text):
+    assert pattern_tokens(text) == []
+
+
+@pytest.mark.parametrize('token', ['^', '^n', '^zabc', '^t!!', '^dzzzzzzzz', '^n_12a', '^n1.zz', 'n123'])
+def test_invalid_tokens_decode_to_none(token):
+    assert decode_pattern(token) is None
+
+
+def test_taken_letter_is_rejected():
+    with pytest.raises(ValueError):
+        register_pattern_codec(PatternCodec('other', 'n', r'\d+', str, str))
+
+
+@pytest.mark.parametrize('first, second', [
+    ("Mail A@B.com", "mail a@b.com"),
+    ("Open https://Example.com/A", "open https://example.com/a"),
+])
+def test_cache_keys_on_raw_text(codecs, first, second):
+    # The plain cache key folds case, which pattern payloads keep
+    encoder, decoder = codecs
+    encoded = encoder.encode_text(first, patterns=True)
+
+    assert encoder.encode_text(second, patterns=True) != encoded
+    assert decoder.decode_codes(encoder.encode_text(second, patterns=True)).endswith(second.split()[1] + '.')
+
+
+def test_database_encoder_cache_keys_on_raw_text(database):
+    from db_encoder import DatabaseEncoder
+    encoder = DatabaseEncoder()
+
+    assert encoder.encode_text("Mail A@B.com", patterns=True) == 'mail ^eA@B.com'
+    assert encoder.encode_text("mail a@b.com", patterns=True) == 'mail ^ea@b.com'
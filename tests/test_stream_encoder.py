@@ -0,0 +1,60 @@
+"""Incremental tokenizing and streaming give exactly the whole-text output"""
+
+import random
+
+import pytest
+
+from encoder import BotSpeakEncoder
+from phrase_matcher import IncrementalTokenizer
+from text_lexer import normalize_words
+
+encoder = BotSpeakEncoder()
+
+# Words of multi-word phrases make long partial trie walks likely
+PHRASE_WORDS = sorted({word for text in encoder.reverse_dictionary if ' ' in text
+                       for word in normalize_words(text)})
+OTHER_WORDS = ['zyxwvut', 'qwerty', '42', "o'clock", 'the', 'a', 'you']
+
+
+def random_words(rng, count):
+    return [rng.choice(PHRASE_WORDS) if rng.random() < 0.8 else rng.choice(OTHER_WORDS)
+            for _ in range(count)]
+
+
+def random_chunks(rng, text):
+    chunks = []
+    i = 0
+    while i < len(text):
+        size = rng.choice((1, 1, 2, 3, 5, 8, 40))
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_tokenizer_matches_tokenize(seed):
+    rng = random.Random(seed)
+    matcher = encoder.phrase_matcher
+    for _ in range(150):
+        words = random_words(rng, rng.randint(1, 12))
+        tokenizer = IncrementalTokenizer(matcher)
+        tokens = []
+        for word in words:
+            tokenizer.push(word, tokens)
+        tokenizer.flush(tokens)
+        assert tokens == matcher.tokenize(words), words
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_stream_matches_encode_text(seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        sentences = [' '.join(random_words(rng, rng.randint(1, 10))) + rng.choice('.!?,')
+                     for _ in range(rng.randint(1, 4))]
+        text = ' '.join(sentences)
+        chunks = random_chunks(rng, text)
+
+        stream = encoder.open_stream()
+        encoded = ''.join(stream.feed(chunk) for chunk in chunks) + stream.finish()
+        assert encoded == encoder.encode_text(text), chunks
+        assert ''.join(encoder.encode_stream(chunks)) == encoded
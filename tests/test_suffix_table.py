@@ -0,0 +1,67 @@
+"""Suffix codes spell every inflected form back exactly and are never longer than the word"""
+
+import pytest
+
+from botspeak_dict import botspeak_dict
+from suffix_table import SUFFIX_MARK, SuffixTable, decode_suffixed
+
+
+@pytest.fixture(scope='module')
+def table():
+    return SuffixTable(botspeak_dict)
+
+
+def test_every_form_decodes_back(table):
+    assert len(table) > 0
+    for form, token in table._tokens.items():
+        assert decode_suffixed(token, botspeak_dict) == form
+        assert len(token) <= len(form)
+
+
+@pytest.mark.parametrize('word, base, marker', [
+    ('helped', 'help', 'd'), ('working', 'work', 'g'), ('decides', 'decide', 's'),
+])
+def test_inflections_use_the_base_code(table, word, base, marker):
+    base_code, _, token_marker = table._tokens[word].rpartition(SUFFIX_MARK)
+    assert botspeak_dict[base_code] == base
+    assert token_marker == marker
+
+
+@pytest.mark.parametrize('token', ['plain', '159~', '159~x', 'ZZZZ~s', '~s'])
+def test_other_tokens_are_not_suffixed(token):
+    assert decode_suffixed(token, botspeak_dict) is None
+
+
+@pytest.mark.parametrize('text', [
+    "He helped, working and decides.",
+    "The biggest meetings ended quickly.",
+    "Nothing inflected here, thank you.",
+])
+def test_round_trip_matches_plain_encoding(codecs, text):
+    encoder, decoder = codecs
+    encoded = encoder.encode_text(text, suffixes=True)
+
+    assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
+    assert len(encoded) <= len(encoder.encode_text(text))
+
+
+def test_combined_with_backrefs(codecs):
+    encoder, decoder = codecs
+    text = "Kubernetes helped. Kubernetes helped again."
+
+    encoded = encoder.encode_text(text, suffixes=True, backrefs=True)
+
+    assert SUFFIX_MARK in encoded
+    assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
+
+
+def test_database_codecs_round_trip(database):
+    from db_encoder import DatabaseEncoder
+    from db_decoder import DatabaseDecoder
+    encoder, decoder = DatabaseEncoder(), DatabaseDecoder()
+    text = "He helped, working and decides."
+
+    encoded = encoder.encode_text(text, suffixes=True)
+
+    assert SUFFIX_MARK in encoded
+    assert decoder.decode_codes(encoded) == decoder.decode_codes(encoder.encode_text(text))
@@ -0,0 +1,65 @@
+"""Binary wire format round trips, rejects bad payloads and is only served to clients that prefer it"""
+
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+import wire_format
+from wire_format import MIME_TYPE, prefers_binary
+
+TEXTS = [
+    "Hello, how are you? Thank you very much for the help.",
+    "Zyxwvut qwerty zyxwvut. Call 555-123-4567!",
+    "Café au lait, thank you.",
+    "",
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_round_trip(codecs, text):
+    encoder, decoder = codecs
+    encoded_sentences = []
+
+    data = wire_format.encode_binary(encoder, text, 'greedy', encoded_sentences)
+
+    assert data[:3] == b'BS\x01'
+    assert decoder.decode_binary(data) == decoder.decode_ids(*encoder.encode_to_ids(text).values())
+    assert ' | '.join(encoded_sentences) == encoder.encode_text(text)
+
+
+def test_literals_keep_digits_and_case_apart_from_codes(codecs):
+    encoder, decoder = codecs
+    # In the text format "555" would read as a code; in binary it stays a literal
+    assert decoder.decode_binary(encoder.encode_binary("Call 555 now")).startswith("Call 555")
+
+
+@pytest.mark.parametrize('data, message', [
+    (b'', 'bad magic'),
+    (b'XX\x01', 'bad magic'),
+    (b'BS', 'version'),
+    (b'BS\x02', 'version'),
+    (b'BS\x01\x80', 'Truncated'),
+    (b'BS\x01\x01\x05ab', 'Truncated'),
+    (b'BS\x01\x01', 'Truncated'),
+    (b'BS\x01\xa0\x9c\x01', 'Invalid code ID'),
+])
+def test_bad_payloads_raise(codecs, data, message):
+    _, decoder = codecs
+    with pytest.raises(ValueError, match=message):
+        decoder.decode_binary(data)
+
+
+@pytest.mark.parametrize('header, binary', [
+    (MIME_TYPE, True),
+    (f'application/json;q=0.5, {MIME_TYPE}', True),
+    (f'{MIME_TYPE};q=0.9, application/json;q=0.8', True),
+    ('application/json', False),
+    ('*/*', False),
+    ('', False),
+    (f'application/json, {MIME_TYPE}', False),
+    (f'{MIME_TYPE}, application/json', False),
+    (f'{MIME_TYPE};q=0.5, */*', False),
+    (f'{MIME_TYPE};q=0', False),
+])
+def test_prefers_binary_only_when_weighted_higher(header, binary):
+    assert prefers_binary(parse_accept_header(header, MIMEAccept)) is binary
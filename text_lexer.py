@@ -0,0 +1,165 @@
+"""
+BotSpeak Text Lexer Module
+Single-pass normalization of raw text into sentence-delimited word streams
+"""
+
+import re
+
+# Marker yielded between sentences by iter_tokens()
+SENTENCE_BREAK = None
+
+# Contraction expansions, already split into words
+CONTRACTIONS = {
+    "don't": ("do", "not"),
+    "won't": ("will", "not"),
+    "can't": ("cannot",),
+    "n't": ("not",),
+    "'re": ("are",),
+    "'ve": ("have",),
+    "'ll": ("will",),
+    "'d": ("would",),
+    "'m": ("am",),
+    "'s": ("is",),
+}
+
+# One alternation covering everything the encoder cares about: sentence
+# punctuation, contractions and words. A word stops short of a trailing
+# "n't" so that "isn't" lexes as "is" + "n't". Any other character is a
+# separator and is skipped by the scan.
+_TOKEN_RE = re.compile(
+    r"[.!?]+"
+    r"|don't|won't|can't|n't|'(?:re|ve|ll|d|m|s)"
+    r"|\w+?(?=n't)|\w+"
+)
+
+_BREAK_CHARS = frozenset('.!?')
+
+# The same lexer over ASCII bytes, where \w matches exactly what it matches
+# in ASCII str text; lowering is a translate() of A-Z only
+_BYTES_TOKEN_RE = re.compile(_TOKEN_RE.pattern.encode('ascii'))
+_BYTES_CONTRACTIONS = {
+    contraction.encode('ascii'): tuple(word.encode('ascii') for word in expansion)
+    for contraction, expansion in CONTRACTIONS.items()
+}
+_BYTES_BREAK_CHARS = frozenset(b'.!?')
+_ASCII_LOWER = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz')
+
+# Trailing run of a chunk that a later chunk may still extend
+_OPEN_TAIL_RE = re.compile(r"[^\s.!?]*\Z")
+
+
+def iter_tokens(text):
+    """Yield normalized words and SENTENCE_BREAK markers for a document"""
+    contractions = CONTRACTIONS
+    break_chars = _BREAK_CHARS
+
+    for token in _TOKEN_RE.findall(text.lower()):
+        expansion = contractions.get(token)
+        if expansion is not None:
+            yield from expansion
+        elif token[0] in break_chars:
+            yield SENTENCE_BREAK
+        else:
+            yield token
+
+
+def iter_sentences(text):
+    """Yield the normalized word list of each non-empty sentence in text"""
+    contractions = CONTRACTIONS
+    break_chars = _BREAK_CHARS
+    words = []
+
+    for token in _TOKEN_RE.findall(text.lower()):
+        expansion = contractions.get(token)
+        if expansion is not None:
+            words.extend(expansion)
+        elif token[0] in break_chars:
+            if words:
+                yield words
+                words = []
+        else:
+            words.append(token)
+
+    if words:
+        yield words
+
+
+def iter_sentences_bytes(data):
+    """iter_sentences() for ASCII bytes, yielding lists of bytes words
+
+    Non-ASCII input must take the str path: bytes patterns and lowering only know ASCII.
+    """
+    contractions = _BYTES_CONTRACTIONS
+    break_chars = _BYTES_BREAK_CHARS
+    words = []
+
+    for token in _BYTES_TOKEN_RE.findall(data.translate(_ASCII_LOWER)):
+        expansion = contractions.get(token)
+        if expansion is not None:
+            words.extend(expansion)
+        elif token[0] in break_chars:
+            if words:
+                yield words
+                words = []
+        else:
+            words.append(token)
+
+    if words:
+        yield words
+
+
+class ChunkLexer:
+    """Incremental lexer for text that arrives in arbitrary chunks
+
+    Chunks may split words, contractions or sentences anywhere. Only the text
+    after the last whitespace or sentence punctuation seen so far is held
+    back, so memory stays bounded by the longest unbroken run of characters.
+    """
+
+    __slots__ = ('_pending',)
+
+    def __init__(self):
+        self._pending = ''
+
+    def feed(self, chunk):
+        """Lex a chunk, returning the tokens it completes"""
+        if not chunk:
+            return []
+
+        # Nothing can span whitespace or sentence punctuation, so text up to
+        # the last such character lexes exactly as it would in one piece.
+        # Held-back text has no such character, so only the new chunk is scanned.
+        cut = _OPEN_TAIL_RE.search(chunk).start()
+
+        if not cut:
+            self._pending += chunk
+            return []
+
+        text = self._pending + chunk[:cut]
+        self._pending = chunk[cut:]
+        return list(iter_tokens(text))
+
+    def flush(self):
+        """Lex and return whatever text is still held back"""
+        text = self._pending
+        self._pending = ''
+        return list(iter_tokens(text)) if text else []
+
+
+def normalize_words(text):
+    """Return the normalized words of text, ignoring sentence boundaries"""
+    return [token for token in iter_tokens(text) if token is not SENTENCE_BREAK]
+
+
+def normalize_phrase(text):
+    """Key of a dictionary text: its words exactly as the lexer produces them from input
+
+    "I'm fine" -> "i am fine", "e-commerce" -> "e commerce"
+    """
+    return ' '.join(normalize_words(text))
+
+
+def cache_key(text):
+    """Canonical form of text: inputs with equal keys always encode identically"""
+    # Case and whitespace runs never change the token stream
+    return ' '.join(text.lower().split())
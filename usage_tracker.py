@@ -108,14 +108,16 @@ class UsageTracker:
     
     def get_usage_info(self, request):
         """Get usage information for display"""
-        rate_limit_info = self.check_rate_limit(request)
-        
+        return self.build_usage_info(self.get_monthly_usage(request))
+    
+    def build_usage_info(self, current_usage):
+        """Build usage information for display from a known usage count"""
         return {
             'is_free_user': True,
-            'monthly_usage': rate_limit_info['current_usage'],
-            'monthly_limit': rate_limit_info['monthly_limit'],
-            'remaining_this_month': rate_limit_info['remaining'],
-            'can_encode': rate_limit_info['allowed']
+            'monthly_usage': current_usage,
+            'monthly_limit': self.free_monthly_limit,
+            'remaining_this_month': max(0, self.free_monthly_limit - current_usage),
+            'can_encode': current_usage < self.free_monthly_limit
         }
 
 # Global usage tracker instance
@@ -12,6 +12,10 @@ from db_encoder import DatabaseEncoder
 from db_decoder import DatabaseDecoder
 from db_manager import get_db_manager
 from usage_tracker import get_usage_tracker
+from codec_pool import CodecPool, CodecTimeout
+from codec_service import CodecService
+from phrase_matcher import GREEDY, SEGMENTATION_MODES
+import wire_format
 from botspeak_dict import botspeak_dict, print_dictionary_stats
 import sys
 from io import StringIO
@@ -52,6 +56,14 @@ db_decoder = DatabaseDecoder()
 db_manager = get_db_manager()
 usage_tracker = get_usage_tracker()
 
+# Large requests run in worker processes instead of on the request thread
+codec_pool = CodecPool()
+# Small encode requests arriving together share one encode_many() pass and history write
+codec_service = CodecService(db_encoder)
+
+# Maximum number of texts accepted by /api/encode/batch
+MAX_BATCH_SIZE = 1000
+
 # Get domain for Stripe redirects
 # Auth helper functions
 def hash_password(password):
@@ -93,6 +105,29 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def is_admin(request):
+    """True if the request carries the operator token (BOTSPEAK_ADMIN_TOKEN); unset disables admin routes"""
+    admin_token = os.getenv('BOTSPEAK_ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(admin_token) and bool(supplied) and secrets.compare_digest(supplied, admin_token)
+
+def admin_required(f):
+    """Decorator to restrict a route to operators; user accounts never qualify"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin(request):
+            return jsonify({'success': False, 'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def get_result_cache_stats():
+    """Hit/miss/eviction metrics for the codec result caches and sentence memo"""
+    return {
+        'encoder': db_encoder.result_cache.get_stats(),
+        'encoder_sentences': db_encoder.sentence_memo.get_stats(),
+        'decoder': db_decoder.result_cache.get_stats()
+    }
+
 def get_domain():
     # Always use botspeak.tech as the primary domain
     return 'botspeak.tech'
@@ -148,6 +183,10 @@ def health_check():
             'dictionary_size': dictionary_size,
             'database_status': db_status,
             'database_entries': db_entries,
+            'codec_versions': {
+                'encoder': db_encoder.get_version_info(),
+                'decoder': db_decoder.get_version_info()
+            },
             'version': '1.0.0',
             'environment': 'production'
         }), 200
@@ -179,9 +218,33 @@ def api_status():
     return jsonify({
         'api': 'online',
         'service': 'BotSpeak',
+        'result_caches': get_result_cache_stats(),
+        'codec_pool': codec_pool.get_stats(),
+        'codec_service': codec_service.get_stats(),
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+def run_codec(operation, size, *args, **kwargs):
+    """Call a db_encoder/db_decoder method inline, in the codec pool if the input is large,
+    or batched with concurrent requests (encode_with_stats)"""
+    if codec_pool.should_offload(size):
+        return codec_pool.run(operation, *args, **kwargs)
+    if operation == 'encode_with_stats' and codec_service.enabled:
+        # Same deadline as pooled requests, so a stalled batch cannot hold the thread
+        return codec_service.encode_with_stats(*args, timeout=codec_pool.timeout, **kwargs)
+    codec = db_encoder if operation.startswith('encode') else db_decoder
+    return getattr(codec, operation)(*args, **kwargs)
+
+def timeout_response(error):
+    return jsonify({
+        'success': False,
+        'error': str(error)
+    }), 504
+
+def wants_binary(req):
+    """True if the client prefers the binary BotSpeak wire format to JSON (see wire_format.prefers_binary)"""
+    return wire_format.prefers_binary(req.accept_mimetypes)
+
 @app.route('/api/encode', methods=['POST'])
 def api_encode():
     """API endpoint to encode text"""
@@ -201,6 +264,7 @@ def api_encode():
         
         data = request.get_json()
         text = data.get('text', '').strip()
+        mode = data.get('mode', GREEDY)
         
         if not text:
             return jsonify({
@@ -208,7 +272,29 @@ def api_encode():
                 'error': 'No text provided'
             }), 400
         
-        result = db_encoder.encode_with_stats(text)
+        if mode not in SEGMENTATION_MODES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown mode; expected one of {', '.join(SEGMENTATION_MODES)}"
+            }), 400
+        
+        if wants_binary(request):
+            # Compact binary body; statistics travel in headers
+            result = run_codec('encode_binary_with_stats', len(text), text, mode=mode,
+                               entropy=bool(data.get('entropy', False)))
+            usage_tracker.increment_usage(request)
+            
+            response = make_response(result['encoded_data'])
+            response.headers['Content-Type'] = wire_format.MIME_TYPE
+            response.headers['X-BotSpeak-Original-Length'] = str(result['statistics']['original_length'])
+            response.headers['X-BotSpeak-Compression-Ratio'] = str(result['statistics']['compression_ratio'])
+            return response
+        
+        result = run_codec('encode_with_stats', len(text), text, mode=mode,
+                           backrefs=bool(data.get('backrefs', False)),
+                           patterns=bool(data.get('patterns', False)),
+                           fuzzy=bool(data.get('fuzzy', False)),
+                           suffixes=bool(data.get('suffixes', False)))
         
         # Increment usage count
         usage_tracker.increment_usage(request)
@@ -219,14 +305,96 @@ def api_encode():
         # Get updated usage info
         updated_usage = usage_tracker.get_usage_info(request)
         
-        return jsonify({
+        response = {
             'success': True,
             'original_text': result['original_text'],
             'encoded_text': result['encoded_text'],
             'statistics': result['statistics'],
             'usage_info': updated_usage
+        }
+        if 'corrections' in result:
+            # Words replaced by their closest dictionary word
+            response['corrections'] = result['corrections']
+        return jsonify(response)
+    
+    except CodecTimeout as e:
+        return timeout_response(e)
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/encode/batch', methods=['POST'])
+def api_encode_batch():
+    """API endpoint to encode many texts in one request"""
+    try:
+        import time
+        start_time = time.time()
+        
+        data = request.get_json(silent=True) or {}
+        texts = data.get('texts')
+        
+        if not isinstance(texts, list) or not texts:
+            return jsonify({
+                'success': False,
+                'error': 'No texts provided'
+            }), 400
+        
+        if len(texts) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f"Batch too large: at most {MAX_BATCH_SIZE} texts per request"
+            }), 400
+        
+        if not all(isinstance(text, str) for text in texts):
+            return jsonify({
+                'success': False,
+                'error': 'All texts must be strings'
+            }), 400
+        
+        mode = data.get('mode', GREEDY)
+        if mode not in SEGMENTATION_MODES:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown mode; expected one of {', '.join(SEGMENTATION_MODES)}"
+            }), 400
+        
+        texts = [text.strip() for text in texts]
+        
+        # Check usage limits once for the whole batch
+        usage_info = usage_tracker.check_rate_limit(request)
+        if usage_info['remaining'] < len(texts):
+            return jsonify({
+                'success': False,
+                'error': f"Batch of {len(texts)} encodings exceeds the {usage_info['remaining']} remaining in your monthly limit of {usage_info['monthly_limit']}. Upgrade to a paid plan for unlimited usage.",
+                'usage_exceeded': True,
+                'usage_info': usage_info
+            }), 429
+        
+        results = run_codec('encode_many', sum(len(text) for text in texts), texts, mode=mode,
+                            backrefs=bool(data.get('backrefs', False)),
+                            patterns=bool(data.get('patterns', False)),
+                            fuzzy=bool(data.get('fuzzy', False)),
+                            suffixes=bool(data.get('suffixes', False)))
+        
+        # Charge usage once for the whole batch
+        current_usage = usage_tracker.increment_usage(request, count=len(texts))
+        
+        end_time = time.time()
+        print(f"Batch encoding of {len(texts)} texts took {end_time - start_time:.3f} seconds")
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'statistics': db_encoder.get_batch_stats(results),
+            'usage_info': usage_tracker.build_usage_info(current_usage)
         })
     
+    except CodecTimeout as e:
+        return timeout_response(e)
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -237,6 +405,28 @@ def api_encode():
 def api_decode():
     """API endpoint to decode BotSpeak codes"""
     try:
+        if request.mimetype == wire_format.MIME_TYPE:
+            payload = request.get_data()
+            if not payload:
+                return jsonify({
+                    'success': False,
+                    'error': 'No data provided'
+                }), 400
+            
+            try:
+                decoded_text = run_codec('decode_binary', len(payload), payload)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e)
+                }), 400
+            
+            return jsonify({
+                'success': True,
+                'decoded_text': decoded_text,
+                'encoded_bytes': len(payload)
+            })
+        
         data = request.get_json()
         codes = data.get('codes', '').strip()
         
@@ -246,7 +436,7 @@ def api_decode():
                 'error': 'No codes provided'
             }), 400
         
-        result = db_decoder.decode_with_validation(codes)
+        result = run_codec('decode_with_validation', len(codes), codes)
         
         return jsonify({
             'success': result['success'],
@@ -257,6 +447,9 @@ def api_decode():
             'unknown_codes': result['unknown_codes']
         })
     
+    except CodecTimeout as e:
+        return timeout_response(e)
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -428,6 +621,9 @@ def api_db_system_health():
     """API endpoint to get system health information"""
     try:
         health = db_manager.get_system_health()
+        health['result_caches'] = get_result_cache_stats()
+        health['codec_pool'] = codec_pool.get_stats()
+        health['codec_service'] = codec_service.get_stats()
         
         return jsonify({
             'success': True,
@@ -440,6 +636,110 @@ def api_db_system_health():
             'error': str(e)
         }), 500
 
+@app.route('/api/db/refresh-dictionary', methods=['POST'])
+@admin_required
+def api_db_refresh_dictionary():
+    """API endpoint to rebuild the codecs from the database in the background"""
+    try:
+        # Requests keep using the current version until each rebuild is published
+        db_encoder.refresh_dictionary(background=True)
+        db_decoder.refresh_dictionary(background=True)
+        codec_pool.invalidate()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Dictionary refresh started',
+            'current_versions': {
+                'encoder': db_encoder.get_version_info(),
+                'decoder': db_decoder.get_version_info()
+            }
+        }), 202
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def apply_dictionary_change(change, status=200):
+    """Patch both codecs with one admin change and report the new versions"""
+    db_encoder.apply_dictionary_changes([change])
+    db_decoder.apply_dictionary_changes([change])
+    codec_pool.invalidate()
+    
+    return jsonify({
+        'success': True,
+        'change': change,
+        'versions': {
+            'encoder': db_encoder.get_version_info(),
+            'decoder': db_decoder.get_version_info()
+        }
+    }), status
+
+@app.route('/api/db/dictionary', methods=['POST'])
+@admin_required
+def api_db_add_dictionary_entry():
+    """API endpoint to add a dictionary entry without rebuilding the codecs"""
+    try:
+        data = request.get_json() or {}
+        change = db_manager.add_dictionary_entry(data.get('code'), data.get('text'))
+        return apply_dictionary_change(change, 201)
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/db/dictionary/<code>', methods=['PUT'])
+@admin_required
+def api_db_update_dictionary_entry(code):
+    """API endpoint to change the text of a dictionary entry"""
+    try:
+        data = request.get_json() or {}
+        change = db_manager.update_dictionary_entry(code, data.get('text'))
+        return apply_dictionary_change(change)
+    
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown code {code}'
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/db/dictionary/<code>', methods=['DELETE'])
+@admin_required
+def api_db_deactivate_dictionary_entry(code):
+    """API endpoint to deactivate a dictionary entry"""
+    try:
+        change = db_manager.deactivate_dictionary_entry(code)
+        return apply_dictionary_change(change)
+    
+    except KeyError:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown code {code}'
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/db/popular-codes')
 def api_db_popular_codes():
     """API endpoint to get most frequently used codes"""
@@ -932,6 +1232,11 @@ def get_app():
     except Exception as e:
         return f"Download error: {str(e)}", 500
 
+@app.teardown_appcontext
+def close_db_session(error):
+    """Give the request thread's database session back after each request"""
+    db_manager.close_session()
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
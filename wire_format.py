@@ -0,0 +1,118 @@
+"""
+BotSpeak Wire Format Module
+Compact, versioned binary encoding of BotSpeak output for bot-to-bot traffic
+
+Layout (version 1):
+
+    b'BS' + version byte, then a sequence of tokens, each starting with a varint:
+        0           sentence break
+        1           literal: varint byte length + UTF-8 bytes of an unknown word
+        1000+       code ID as assigned by code_ids
+
+Every dictionary code fits in a 2-byte varint, against 4 bytes for a code
+plus its separator in the text format.
+"""
+
+from code_ids import SENTENCE_BREAK_ID, join_decoded
+from phrase_matcher import is_literal
+from text_lexer import iter_sentences
+
+MIME_TYPE = 'application/x-botspeak'
+MAGIC = b'BS'
+VERSION = 1
+_HEADER = MAGIC + bytes([VERSION])
+
+_LITERAL = 1
+
+
+def prefers_binary(accept_mimetypes):
+    """True if a parsed Accept header (werkzeug MIMEAccept) prefers this format to JSON
+
+    JSON wins ties and wildcards, so only clients that name the wire
+    format with a higher weight get binary.
+    """
+    return accept_mimetypes.best_match(['application/json', MIME_TYPE]) == MIME_TYPE
+
+
+def _append_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_binary(encoder, text, mode, encoded_sentences=None):
+    """Encode text to the binary wire format
+
+    If encoded_sentences is a list, the text-format encoding of every
+    sentence is appended to it, so callers can log the usual output too.
+    """
+    out = bytearray(_HEADER)
+    code_ids = encoder.code_ids
+    first = True
+
+    for words in iter_sentences(text):
+        if not first:
+            out.append(SENTENCE_BREAK_ID)
+        first = False
+
+        tokens = encoder._tokenize_words(words, mode)
+        for token in tokens:
+            code_id = None if is_literal(token) else code_ids.get(token[1])
+            if code_id is None:
+                data = token[1].encode('utf-8')
+                out.append(_LITERAL)
+                _append_varint(out, len(data))
+                out += data
+            else:
+                _append_varint(out, code_id)
+
+        if encoded_sentences is not None:
+            encoded_sentences.append(' '.join([token[1] for token in tokens]))
+
+    return bytes(out)
+
+
+def decode_binary(id_table, data):
+    """Decode wire-format bytes to text, formatted like decode_codes()
+
+    Raises ValueError for data that is not valid BotSpeak binary.
+    """
+    if data[:2] != MAGIC:
+        raise ValueError("Not BotSpeak binary data (bad magic)")
+    if len(data) < 3 or data[2] != VERSION:
+        raise ValueError(f"Unsupported BotSpeak binary version; expected {VERSION}")
+
+    parts = []
+    table_size = len(id_table)
+    end = len(data)
+    i = 3
+
+    while i < end:
+        value, i = _read_varint(data, i, end)
+        if value == _LITERAL:
+            length, i = _read_varint(data, i, end)
+            if i + length > end:
+                raise ValueError("Truncated BotSpeak binary data")
+            parts.append(bytes(data[i:i + length]).decode('utf-8'))
+            i += length
+        elif value < table_size:
+            parts.append(id_table[value])
+        else:
+            raise ValueError(f"Invalid code ID {value} in BotSpeak binary data")
+
+    return join_decoded(parts)
+
+
+def _read_varint(data, i, end):
+    value = 0
+    shift = 0
+    while True:
+        if i >= end:
+            raise ValueError("Truncated BotSpeak binary data")
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, i
+        shift += 7